@@ -1,5 +1,130 @@
+import os
+import time
+
+import pandas as pd
 import streamlit as st
 
+from app_pages.what_if import describe_scenario, load_cost_engine, scenario_controls
+from task_allocator import TaskAllocator
+
+# Reintentos automáticos de un trabajo de ingesta fallido
+MAX_JOB_ATTEMPTS = 3
+# Segundos entre refrescos de la página mientras haya trabajos en cola o en curso
+JOB_POLL_SECONDS = float(os.getenv("INGESTION_POLL_SECONDS", "2"))
+
+
+def show_ingestion_jobs(uploaded_files, pdf_preprocessor, db):
+    """Encola los PDFs subidos para el worker y muestra su progreso por archivo y página.
+
+    Devuelve True mientras quede algún trabajo en cola o en curso.
+    """
+    files = {}
+    for file in uploaded_files:
+        content = file.getvalue()
+        files[pdf_preprocessor.content_hash(content)] = (file.name, content)
+
+    jobs = {job["file_hash"]: job for job in db.get_jobs(list(files))}
+    for file_hash, (file_name, content) in files.items():
+        job = jobs.get(file_hash)
+        if job is None or (job["status"] == "error" and job["attempts"] < MAX_JOB_ATTEMPTS):
+            db.enqueue_job(file_name, file_hash, content)
+    jobs = {job["file_hash"]: job for job in db.get_jobs(list(files))}
+
+    pending = False
+    for file_hash, (file_name, _) in files.items():
+        job = jobs[file_hash]
+        total = job["pages_total"] or 0
+        done = job["pages_done"] or 0
+        st.progress(min(done / total, 1.0) if total else 0.0,
+                    text=f"{file_name}: {job['status']} ({done}/{total or '?'} páginas)")
+        if job["status"] == "done" and job["result"]:
+            with st.expander(f"Resultados de {file_name}"):
+                st.text(job["result"])
+        elif job["status"] == "error":
+            st.error(f"{file_name}: {job['error']}")
+        if job["status"] in ("queued", "running"):
+            pending = True
+
+    if pending:
+        st.caption(f"El progreso se actualiza cada {JOB_POLL_SECONDS:g} s.")
+    return pending
+
+
+def load_planning(project_file, pdf_preprocessor, llm_classifier, db, session_state):
+    """Planificación estructurada del documento, extraída una sola vez por contenido y guardada.
+
+    Devuelve {"hash", "planning"} o, si no se pudo estructurar, {"hash", "text"} con el texto.
+    """
+    content = project_file.getvalue()
+    file_hash = pdf_preprocessor.content_hash(content)
+    # Cada rerun de Streamlit reutiliza lo ya cargado en la sesión, sin volver a leer el PDF
+    loaded = session_state.setdefault("planning_documents", {})
+    if file_hash in loaded:
+        return loaded[file_hash]
+
+    planning = db.get_planning(file_hash)
+    if planning is None:
+        with st.spinner("Extrayendo la planificación del documento..."):
+            text = pdf_preprocessor.extract_text_from_pdf(content)
+            try:
+                planning = llm_classifier.extract_planning(text)
+            except Exception as e:
+                st.warning(f"No se pudo estructurar la planificación ({e}); se usará el texto del documento.")
+                loaded[file_hash] = {"hash": file_hash, "text": text}
+                return loaded[file_hash]
+        db.save_planning(file_hash, project_file.name, planning)
+    loaded[file_hash] = {"hash": file_hash, "planning": planning}
+    return loaded[file_hash]
+
+
+def show_allocation(rows, planning=None, planning_key="manual"):
+    """Fases del proyecto editables y su asignación a coste mínimo, calculada en local.
+
+    Con un documento de planificación las fases (y las horas ya asignadas a cada persona)
+    se rellenan a partir de él.
+    """
+    planned = {phase.get("fase"): phase for phase in (planning or {}).get("fases", []) if phase.get("fase")}
+    initial = pd.DataFrame({
+        "fase": pd.Series(list(planned), dtype=str),
+        "horas": pd.Series([phase.get("horas") for phase in planned.values()], dtype=float),
+        "year": pd.Series([phase.get("year") for phase in planned.values()], dtype="Int64"),
+    })
+    phases_df = st.data_editor(
+        initial,
+        num_rows="dynamic",
+        key=f"allocation_phases_{planning_key}",
+        column_config={
+            "fase": st.column_config.TextColumn("Fase"),
+            "horas": st.column_config.NumberColumn("Horas", min_value=0.0),
+            "year": st.column_config.NumberColumn("Año (vacío = último)", format="%d"),
+        },
+    )
+    dedication = st.slider("Dedicación máxima al proyecto (% de las horas de convenio)", 5, 100, 100, step=5)
+
+    phases = [
+        {
+            "fase": row["fase"],
+            "horas": float(row["horas"]),
+            "year": None if pd.isna(row["year"]) else int(row["year"]),
+            "asignaciones": planned.get(row["fase"], {}).get("participantes") or [],
+        }
+        for row in phases_df.to_dict("records")
+        if isinstance(row["fase"], str) and row["fase"].strip() and not pd.isna(row["horas"])
+    ]
+    if not phases:
+        return None
+
+    start = time.perf_counter()
+    allocation = TaskAllocator(dedication=dedication / 100).allocate(phases, rows)
+    elapsed = time.perf_counter() - start
+    if allocation["asignacion"]:
+        st.dataframe(pd.DataFrame(allocation["asignacion"]))
+    st.caption(f"Coste total: {allocation['coste_total']:,.2f} € · calculado en {elapsed * 1000:.1f} ms")
+    for warning in allocation["advertencias"]:
+        st.warning(warning)
+    return allocation
+
+
 def show(chatbot, pdf_preprocessor, llm_classifier, db, session_state):
     st.title("Chat con el sistema")
 
@@ -12,7 +137,11 @@ def show(chatbot, pdf_preprocessor, llm_classifier, db, session_state):
     st.markdown("### 📎 Subida de documentos laborales (Modelo 190, RNT, 10T...)")
     uploaded_files = st.file_uploader("Puedes subir documentos PDF laborales", type="pdf", accept_multiple_files=True)
 
-    if uploaded_files:
+    jobs_pending = False
+    if uploaded_files and os.getenv("INGESTION_MODE", "inline") == "queue":
+        # El procesamiento corre en ingestion_worker.py; aquí solo se encola y se consulta el progreso
+        jobs_pending = show_ingestion_jobs(uploaded_files, pdf_preprocessor, db)
+    elif uploaded_files:
         resultados = chatbot.process_uploaded_files(uploaded_files, pdf_preprocessor, llm_classifier, db)
         if not resultados:
             st.warning("No se encontraron resultados en los documentos subidos.")
@@ -32,9 +161,30 @@ def show(chatbot, pdf_preprocessor, llm_classifier, db, session_state):
     project_file = st.file_uploader("Opcional: sube un documento de planificación (memoria técnica, etc.)", type="pdf", key="planificacion")
 
     pdf_context_text = ""
+    planning, planning_key = None, "manual"
     if project_file:
-        pdf_context_text = pdf_preprocessor.extract_text_from_pdf(project_file)
+        loaded = load_planning(project_file, pdf_preprocessor, llm_classifier, db, session_state)
+        planning, planning_key = loaded.get("planning"), loaded["hash"]
+        pdf_context_text = loaded.get("text", "")
         st.success(f"Documento '{project_file.name}' cargado para contextualizar futuras consultas.")
+        if planning:
+            with st.expander(f"Planificación extraída: {len(planning['fases'])} fases"):
+                st.json(planning, expanded=False)
+
+    # ========= C. Simulación de costes =========
+    with st.expander("🔮 Simulación de costes (¿y si...?) para las respuestas del chat"):
+        engine = load_cost_engine(db)
+        cargas, horas_convenio = scenario_controls(engine, key="chat")
+        scenario = describe_scenario(cargas, horas_convenio)
+        if scenario:
+            st.caption("Las respuestas usarán el coste/hora recalculado con estos supuestos.")
+
+    # Filas de coste/hora (del escenario si lo hay) para la asignación y el contexto del chat
+    rows = engine.scenario_rows(cargas, horas_convenio) if scenario else db.get_workers_data()
+
+    # ========= D. Asignación de tareas (cálculo local; el LLM solo la explica) =========
+    with st.expander("📊 Asignación de tareas a coste mínimo"):
+        allocation = show_allocation(rows, planning, planning_key)
 
     # ========= Entrada del usuario =========
     prompt = st.chat_input("Escribe tu consulta aquí...")
@@ -43,15 +193,31 @@ def show(chatbot, pdf_preprocessor, llm_classifier, db, session_state):
         with st.chat_message("user"):
             st.markdown(prompt)
 
-        # Preparar contexto combinado
-        context = db.get_all_workers()
-        if pdf_context_text:
-            context = {
-                "worker_data": context,
-                "documento_proyecto": pdf_context_text  # Limitar longitud si es necesario
-            }
+        # Preparar contexto: solo los trabajadores/empresas/años relevantes, dentro del presupuesto de tokens.
+        # Escenario y asignación llegan ya calculados: el LLM no rehace las cuentas
+        context = chatbot.build_context(prompt, rows, pdf_context_text, scenario=scenario, allocation=allocation,
+                                        planning=planning)
 
-        response = chatbot.get_response(prompt, context=context)
-        session_state.messages.append({"role": "assistant", "content": response})
         with st.chat_message("assistant"):
-            st.markdown(response)
+            # Respuesta en streaming: se pinta a medida que llegan los tokens
+            placeholder = st.empty()
+            response = ""
+            for fragment in chatbot.get_response_stream(prompt, context=context):
+                response += fragment
+                placeholder.markdown(response + "▌")
+            placeholder.markdown(response)
+
+            usage = chatbot.last_usage
+            ttft = usage.get("time_to_first_token")
+            st.caption(
+                f"Contexto: {usage.get('rows_sent', 0)} filas, {usage.get('context_tokens', 0)} tokens · "
+                f"Prompt enviado: {usage.get('prompt_tokens', usage.get('prompt_tokens_estimated', 0))} tokens · "
+                f"Primer token: {f'{ttft:.2f}s' if ttft is not None else '-'} · "
+                f"Total: {usage.get('generation_time', 0):.2f}s"
+            )
+        session_state.messages.append({"role": "assistant", "content": response})
+
+    # Con trabajos pendientes la página se vuelve a ejecutar sola, ya pintada entera
+    if jobs_pending:
+        time.sleep(JOB_POLL_SECONDS)
+        st.rerun()
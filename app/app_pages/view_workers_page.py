@@ -1,6 +1,51 @@
+import os
+import tempfile
+
 import streamlit as st
 import pandas as pd
 
+from app_pages.what_if import load_cost_engine, scenario_controls
+from exporter import EXPORT_FORMATS, EXPORTS, export_filename, export_table
+
+PAGE_SIZES = [25, 50, 100, 250]
+
+
+def show_export(db, company_id, year):
+    """Exporta la tabla con los filtros de empresa y año a un fichero temporal y lo ofrece para descargar."""
+    table_column, format_column = st.columns(2)
+    table = table_column.selectbox("Tabla", list(EXPORTS))
+    fmt = format_column.selectbox("Formato", EXPORT_FORMATS)
+    if st.button("Preparar exportación"):
+        # El fichero se escribe en disco por bloques; la exportación anterior se borra
+        previous = st.session_state.pop("workers_export", None)
+        if previous and os.path.exists(previous["path"]):
+            os.remove(previous["path"])
+        progress = st.empty()
+        rows = None
+        f = tempfile.NamedTemporaryFile(suffix=f".{fmt}", delete=False)
+        try:
+            with f:
+                rows = export_table(db, table, fmt, f, company_id=company_id, year=year,
+                                    progress=lambda written: progress.caption(f"{written} filas..."))
+        except Exception as e:
+            # Falta de dependencia, error de la base de datos o del escritor: mensaje, no traza
+            st.error(f"No se pudo exportar {table}: {e}")
+        finally:
+            if rows is None:
+                os.remove(f.name)
+        if rows is None:
+            return
+        progress.caption(f"{rows} filas exportadas.")
+        st.session_state.workers_export = {"path": f.name, "name": export_filename(table, fmt, company_id, year)}
+
+    export = st.session_state.get("workers_export")
+    if export and os.path.exists(export["path"]):
+        st.caption("La descarga desde la página carga el fichero completo en memoria; "
+                   "para tablas grandes use `python app/export_data.py`.")
+        with open(export["path"], "rb") as f:
+            st.download_button(f"⬇️ Descargar {export['name']}", f, file_name=export["name"])
+
+
 def show(db):
     """
     Display the View Workers page
@@ -9,15 +54,60 @@ def show(db):
         db (Database): Database instance
     """
     st.title("Worker Information")
-    
-    workers = db.get_workers_data()
-    
-    if workers:
-        
-        df = pd.DataFrame(workers)
-        st.dataframe(df)
 
-        # contingencias_comunes = workers.get("contingencias_comunes", [])
-        # st.dataframe(contingencias_comunes)
-    else:
+    filters = db.get_worker_filters()
+    if not filters["years"]:
         st.info("No workers found in the database. Please upload documents first.")
+        return
+
+    # Filtros y paginación en el servidor: solo se lee la página visible
+    company_column, year_column, name_column, size_column = st.columns([3, 1, 2, 1])
+    companies = filters["companies"]
+    company_id = company_column.selectbox(
+        "Empresa", [None] + list(companies),
+        format_func=lambda company: "Todas" if company is None else f"{companies[company]} ({company})",
+    )
+    year = year_column.selectbox("Año", [None] + filters["years"], format_func=lambda y: "Todos" if y is None else y)
+    name_prefix = name_column.text_input("Nombre empieza por", placeholder="GARCIA")
+    page_size = size_column.selectbox("Filas", PAGE_SIZES, index=1)
+
+    # Pila de cursores de las páginas visitadas; se reinicia al cambiar los filtros
+    filter_key = (company_id, year, name_prefix.strip().lower(), page_size)
+    if st.session_state.get("workers_filter_key") != filter_key:
+        st.session_state.workers_filter_key = filter_key
+        st.session_state.workers_cursors = [None]
+    cursors = st.session_state.workers_cursors
+
+    page = db.get_workers_page(company_id, year, name_prefix, after=cursors[-1], limit=page_size)
+    total = db.count_workers(company_id, year, name_prefix)
+
+    if page["rows"]:
+        st.dataframe(pd.DataFrame(page["rows"]), use_container_width=True)
+    else:
+        st.info("Ningún trabajador coincide con los filtros.")
+
+    first = (len(cursors) - 1) * page_size
+    previous_column, info_column, next_column = st.columns([1, 3, 1])
+    info_column.caption(f"Filas {first + 1 if page['rows'] else 0}-{first + len(page['rows'])} de {total}")
+    if previous_column.button("⬅️ Anterior", disabled=len(cursors) == 1):
+        cursors.pop()
+        st.rerun()
+    if next_column.button("Siguiente ➡️", disabled=page["next"] is None):
+        cursors.append(page["next"])
+        st.rerun()
+
+    with st.expander("⬇️ Exportar (CSV, Parquet o Excel)"):
+        show_export(db, company_id, year)
+
+    with st.expander("🔮 Simulación de costes (¿y si...?)"):
+        engine = load_cost_engine(db)
+        cargas, horas_convenio = scenario_controls(engine, key="view_workers")
+        if cargas or horas_convenio:
+            result = engine.scenario(cargas, horas_convenio)
+            if company_id:
+                result = result[result["company_id"] == company_id]
+            if year:
+                result = result[result["year"] == year]
+            st.dataframe(result)
+        else:
+            st.caption("Cambia algún porcentaje o las horas de convenio para ver el coste/hora simulado.")
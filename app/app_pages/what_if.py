@@ -0,0 +1,46 @@
+# what_if.py
+"""Controles de simulación de costes compartidos por las páginas de chat y de trabajadores."""
+from typing import Any, Dict, Optional, Tuple
+
+import streamlit as st
+
+from cost_engine import CostEngine
+
+
+@st.cache_resource(max_entries=2)
+def _cost_engine(_db, version: int) -> CostEngine:
+    return CostEngine.from_database(_db)
+
+
+def load_cost_engine(db) -> CostEngine:
+    """One columnar copy of worker_costs per process, reloaded when ingestion changes the data."""
+    return _cost_engine(db, db.data_version())
+
+
+def scenario_controls(engine: CostEngine, key: str) -> Tuple[Optional[Dict[str, float]], Optional[Dict[int, float]]]:
+    """Inputs for the what-if assumptions; returns (cargas_sociales, horas_convenio) overrides or None."""
+    cargas = {}
+    columns = st.columns(len(engine.cargas_sociales) or 1)
+    for column, (concepto, porcentaje) in zip(columns, engine.cargas_sociales.items()):
+        value = column.number_input(f"{concepto} (%)", min_value=0.0, max_value=100.0, value=porcentaje,
+                                    step=0.1, format="%.2f", key=f"{key}_carga_{concepto}")
+        if round(value, 2) != round(porcentaje, 2):
+            cargas[concepto] = value
+
+    hours_column, years_column = st.columns(2)
+    horas = hours_column.number_input("Horas de convenio anuales (0 = sin cambios)", min_value=0.0, value=0.0,
+                                      step=10.0, key=f"{key}_horas")
+    years = years_column.multiselect("Años a los que se aplican las horas", engine.years, default=engine.years,
+                                     key=f"{key}_horas_years")
+    horas_convenio = {year: horas for year in years} if horas and years else None
+    return cargas or None, horas_convenio
+
+
+def describe_scenario(cargas: Optional[Dict[str, float]], horas_convenio: Optional[Dict[int, float]]) -> Dict[str, Any]:
+    """Assumptions of a scenario, as sent to the chat context."""
+    scenario: Dict[str, Any] = {}
+    if cargas:
+        scenario["cargas_sociales_pct"] = cargas
+    if horas_convenio:
+        scenario["horas_convenio_anuales_por_año"] = horas_convenio
+    return scenario
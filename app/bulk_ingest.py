@@ -0,0 +1,159 @@
+# bulk_ingest.py
+"""Subida masiva por carpetas: ingesta todos los PDFs de un árbol de directorios.
+
+Uso: python app/bulk_ingest.py CARPETA [--processes N] [--manifest RUTA] [--no-recursive]
+
+El parseo de PDFs corre en un pool de procesos; la clasificación, extracción y
+guardado reutilizan ingestion.ingest_file. Cada archivo terminado se anota en un
+manifiesto JSONL, de modo que una ejecución interrumpida continúa donde se quedó.
+"""
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from typing import Dict, Any
+
+from database import Database
+from ingestion import ingest_file, parse_file, local_share_message
+from llm_classifier import LLMClassifier
+from metrics import metrics, profile
+from pdf_preprocessor import PDFProcessor
+
+MANIFEST_NAME = ".ingest_manifest.jsonl"
+
+
+def load_manifest(path: str) -> Dict[str, Dict[str, Any]]:
+    """Last entry per file path; a truncated final line (interrupted write) is ignored."""
+    entries = {}
+    if not os.path.exists(path):
+        return entries
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            entries[entry["path"]] = entry
+    return entries
+
+
+def append_manifest(path: str, entry: Dict[str, Any]):
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def file_signature(path: str) -> Dict[str, Any]:
+    stat = os.stat(path)
+    return {"size": stat.st_size, "mtime": stat.st_mtime}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ingesta masiva de PDFs desde una carpeta")
+    parser.add_argument("directory", help="Carpeta raíz con los PDFs")
+    parser.add_argument("--processes", type=int, default=os.cpu_count() or 1, help="Procesos para parsear PDFs")
+    parser.add_argument("--manifest", help=f"Manifiesto de progreso (por defecto CARPETA/{MANIFEST_NAME})")
+    parser.add_argument("--no-recursive", action="store_true", help="No entrar en subcarpetas")
+    parser.add_argument("--metrics-file", help="Escribir las métricas en formato Prometheus al terminar")
+    parser.add_argument("--profile", metavar="RUTA", help="Perfilar la ejecución con cProfile y guardar el resultado")
+    args = parser.parse_args()
+
+    if args.profile:
+        with profile(args.profile):
+            run(args)
+    else:
+        run(args)
+
+
+def run(args):
+
+    manifest_path = args.manifest or os.path.join(args.directory, MANIFEST_NAME)
+    manifest = load_manifest(manifest_path)
+
+    pdf_processor = PDFProcessor()
+    paths = pdf_processor.find_pdfs(args.directory, recursive=not args.no_recursive)
+    # Reanudar: se saltan los archivos ya terminados que no han cambiado desde entonces
+    todo = []
+    for path in paths:
+        entry = manifest.get(path)
+        if entry and entry.get("status") == "done" and entry.get("signature") == file_signature(path):
+            continue
+        todo.append(path)
+    print(f"{len(paths)} PDFs encontrados, {len(paths) - len(todo)} ya procesados, {len(todo)} pendientes.")
+    if not todo:
+        return
+
+    db = Database()
+    db.create_tables()
+    llm_classifier = LLMClassifier(api_key=os.getenv('OPENAI_API_KEY'))
+    stats_before = llm_classifier.extraction_stats()
+
+    start = time.perf_counter()
+    totals = {"docs": 0, "pages": 0, "errors": 0, "unsupported": 0}
+    with ProcessPoolExecutor(max_workers=args.processes) as executor:
+        queue = iter(todo)
+        # Ventana acotada de parseos en vuelo para no acumular documentos en memoria
+        in_flight = {}
+        for path in queue:
+            in_flight[executor.submit(parse_file, path)] = path
+            if len(in_flight) >= 2 * args.processes:
+                break
+
+        while in_flight:
+            finished, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in finished:
+                path = in_flight.pop(future)
+                next_path = next(queue, None)
+                if next_path is not None:
+                    in_flight[executor.submit(parse_file, next_path)] = next_path
+
+                doc_start = time.perf_counter()
+                pages, error = 0, None
+                try:
+                    parsed = future.result()
+                    pages = len(parsed["pages"])
+                    metrics.observe("pdf_parse", parsed["parse_seconds"], document=path)
+                    ingest_file(os.path.basename(path), None, pdf_processor, llm_classifier, db, parsed=parsed)
+                    status = db.get_document_status(parsed["file_hash"]) or "error"
+                except Exception as e:
+                    status, error = "error", str(e)
+
+                totals["docs"] += 1
+                totals["pages"] += pages
+                if status == "unsupported":
+                    totals["unsupported"] += 1
+                elif status != "done":
+                    totals["errors"] += 1
+                append_manifest(manifest_path, {
+                    "path": path,
+                    "status": status,
+                    "pages": pages,
+                    "seconds": round(time.perf_counter() - doc_start, 3),
+                    "signature": file_signature(path),
+                    "error": error,
+                })
+                print(f"[{totals['docs']}/{len(todo)}] {status:8} {pages:4} págs  {path}", flush=True)
+
+    elapsed = time.perf_counter() - start
+    print()
+    print(f"Documentos: {totals['docs']}  Páginas: {totals['pages']}  Con errores: {totals['errors']}  "
+          f"Tipo no reconocido: {totals['unsupported']}")
+    print(f"Tiempo: {elapsed:.1f}s  ->  {totals['pages'] / elapsed:.2f} págs/s, {totals['docs'] / elapsed:.2f} docs/s")
+    message = local_share_message(stats_before, llm_classifier.extraction_stats())
+    if message:
+        print(message)
+
+    timers = metrics.snapshot()["timers"]
+    if timers:
+        print()
+        print("Tiempo por etapa (s): " + ", ".join(
+            f"{stage}={timer['sum']:.2f}" for stage, timer in sorted(timers.items(), key=lambda item: -item[1]["sum"])
+        ))
+    if args.metrics_file:
+        metrics.write_prometheus(args.metrics_file)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,29 +1,53 @@
 # chatbot.py
-from typing import Dict, Any, List
-import openai
-import json
-import decimal
+from typing import Dict, Any, Iterator, List
 import os
-import json
-import tempfile
+import threading
+import time
 import streamlit as st
 
+from context_builder import ContextBuilder, count_tokens, to_json
+from ingestion import ingest_file, local_share_message
+from llm_client import get_client
+from metrics import metrics
+
 class ChatBot:
-    def __init__(self, api_key: str, model: str = "gpt-4"):
+    def __init__(self, api_key: str, model: str = "gpt-4", context_token_budget: int = None):
         self.model = model
-        openai.api_key = api_key
-        self.client = openai.OpenAI(api_key=openai.api_key)
-        
-
-    def get_response(self, user_input: str, context: List[Dict[str, Any]]) -> str:
-        """Generate a response using the database context."""
-
-        def decimal_default(obj):
-            if isinstance(obj, decimal.Decimal):
-                return float(obj)
-            raise TypeError
-
-        context_json = json.dumps(context, default=decimal_default, indent=2)
+        self.llm = get_client(api_key)
+        self.context_builder = ContextBuilder(
+            max_tokens=context_token_budget or int(os.getenv("CHAT_CONTEXT_TOKENS", "3000")),
+            model=model,
+        )
+        # La instancia se comparte entre sesiones (un hilo por sesión): métricas por hilo
+        self._local = threading.local()
+
+    @property
+    def last_usage(self) -> Dict[str, Any]:
+        """Tokens and timings of this session's last request."""
+        if not hasattr(self._local, "usage"):
+            self._local.usage = {}
+        return self._local.usage
+
+    @last_usage.setter
+    def last_usage(self, value: Dict[str, Any]):
+        self._local.usage = value
+
+    def build_context(self, user_input: str, workers: List[Dict[str, Any]], project_text: str = "",
+                      scenario: Dict[str, Any] = None, allocation: Dict[str, Any] = None,
+                      planning: Dict[str, Any] = None) -> Dict[str, Any]:
+        """Only the workers/companies/years the question mentions, within the token budget."""
+        built = self.context_builder.build(user_input, workers, project_text, scenario, allocation, planning)
+        self.last_usage = {
+            "context_tokens": built["tokens"],
+            "rows_sent": built["rows_sent"],
+            "rows_omitted": built["rows_omitted"],
+        }
+        return built["context"]
+
+    def _build_messages(self, user_input: str, context: List[Dict[str, Any]]) -> List[Dict[str, str]]:
+        """System prompt with the database context plus the user question."""
+
+        context_json = to_json(context)
 
         system_message = f"""
 Eres un asistente inteligente para una aplicación de asignación eficiente de tareas y cálculo de costes laborales.
@@ -78,94 +102,69 @@ Si falta información, indica qué datos faltan:
 - Un número de horas trabajadas registrado. Indica que faltan los datos del convenio colectivo.
 - Datos de RNT (base de contingencias comunes y días cotizados), indica que faltan los datos del RNT
 * Si las horas asignadas superan la disponibilidad estimada anual, emite una advertencia.
+* Los datos de coste por hora llegan como filas cuyos valores siguen el orden de "columnas".
+* La planificación del proyecto puede llegar ya estructurada en "planificacion" (fases, duración, tareas y horas por trabajador y año) en lugar del texto del documento.
+* Si el contexto incluye "escenario", los costes por hora ya están recalculados con esos supuestos: úsalos tal cual, sin rehacer las cuentas.
+* Si el contexto incluye "asignacion_calculada", la asignación y sus costes ya se han calculado a coste mínimo: no la rehagas ni recalcules importes.
+  Preséntala (tabla por trabajador y por fase, coste total), explica el criterio y destaca todas sus "advertencias" y "horas_sin_asignar" (sobreasignaciones y falta de disponibilidad).
 
 Contenido del documento a analizar:
 {context_json}
     """
 
-        response = self.client.chat.completions.create(
-            model=self.model,
-            messages=[
-                {"role": "system", "content": system_message},
-                {"role": "user", "content": user_input}
-            ]
-        )
+        self.last_usage["prompt_tokens_estimated"] = count_tokens(system_message + user_input, self.model)
+        return [
+            {"role": "system", "content": system_message},
+            {"role": "user", "content": user_input}
+        ]
+
+    def get_response(self, user_input: str, context: List[Dict[str, Any]]) -> str:
+        """Generate a response using the database context."""
+        messages = self._build_messages(user_input, context)
+        start = time.perf_counter()
+        response = self.llm.complete(model=self.model, messages=messages, stage="chat")
+        self.last_usage["generation_time"] = time.perf_counter() - start
+        metrics.observe("chat_response", self.last_usage["generation_time"])
+        if getattr(response, "usage", None) is not None:
+            self.last_usage["prompt_tokens"] = response.usage.prompt_tokens
+            self.last_usage["completion_tokens"] = response.usage.completion_tokens
+            metrics.tokens("chat", response.usage.prompt_tokens, response.usage.completion_tokens)
         return response.choices[0].message.content
 
+    def get_response_stream(self, user_input: str, context: List[Dict[str, Any]]) -> Iterator[str]:
+        """Streaming variant of get_response: yields text fragments as they arrive.
+
+        Records time_to_first_token and generation_time (seconds) in last_usage.
+        """
+        messages = self._build_messages(user_input, context)
+        start = time.perf_counter()
+        self.last_usage["time_to_first_token"] = None
+        stream = self.llm.stream(model=self.model, messages=messages, stage="chat")
+        try:
+            for chunk in stream:
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if not delta:
+                    continue
+                if self.last_usage["time_to_first_token"] is None:
+                    self.last_usage["time_to_first_token"] = time.perf_counter() - start
+                    metrics.observe("chat_first_token", self.last_usage["time_to_first_token"])
+                yield delta
+        finally:
+            self.last_usage["generation_time"] = time.perf_counter() - start
+            metrics.observe("chat_response", self.last_usage["generation_time"])
+
     def process_uploaded_files(self, uploaded_files, pdf_preprocessor, llm_classifier, db):
 
         processed = []
+        stats_before = llm_classifier.extraction_stats()
 
-        with tempfile.TemporaryDirectory() as temp_dir:
-            saved_files = []
-            for file in uploaded_files:
-                path = os.path.join(temp_dir, file.name)
-                with open(path, "wb") as f:
-                    f.write(file.getbuffer())
-                saved_files.append(path)
-
-            for file_path in saved_files:
-                full_text = pdf_preprocessor.extract_text_from_pdf(file_path)
-                pages = pdf_preprocessor.extract_text_by_page(file_path)
-                try:
-                    doc_type = llm_classifier.classify_document_type(full_text)
-                except Exception as e:
-                    processed.append(f"No se pudo clasificar el archivo {os.path.basename(file_path)}: {e}")
-                for page_num, page_text in enumerate(pages):
-                    try:
-                        structured_data = llm_classifier.extract_structured_data(text=page_text, doc_type=doc_type)
-                        if doc_type != "rnt":
-                            worker_id = pdf_preprocessor.generar_id(structured_data.get("worker_name", ""))
-                        # Insertar según el tipo
-                        if doc_type in ("modelo_190", "10t"):
-                            db.insert_worker({
-                                "worker_id": worker_id,
-                                "worker_name": structured_data["worker_name"],
-                                "percepcion_integra": structured_data["percepcion_integra"],
-                                "year": structured_data['year'],
-                                "company_id": structured_data['company_id'],
-                                "company_name": structured_data['company_name'],
-                            })
-
-                        elif doc_type == "rnt":
-                            for entry in structured_data:
-                                db.insert_contingencias_comunes({
-                                    "worker_id": entry["worker_id"],
-                                    "base_contingencias_comunes": entry["base_contingencias_comunes"],
-                                    "dias_cotizados": entry["dias_cotizados"],
-                                    "periodo": entry["periodo"],
-                                    "year": entry['year'],
-                                    "company_id": entry["company_id"],
-                                    "company_name": entry["company_name"],
-                                })
-                        elif doc_type == "convenio":
-                            convenio_inserted = False
-                            if convenio_inserted:
-                                continue
-                            if "year" in structured_data:
-                                # Use the year from structured_data if available
-                                aux_year = structured_data["year"]
-
-                            # Check if structured_data contains both "horas_convenio_anuales" and "year"
-                            if structured_data.get("horas_convenio_anuales") is not None and structured_data.get("year") is not None:
-                                db.insert_convenio({
-                                    "horas_convenio_anuales": structured_data["horas_convenio_anuales"],
-                                    "year": structured_data['year']
-                                })
-                                convenio_inserted = True
-                            
-                            if structured_data.get("horas_convenio_anuales") is not None and structured_data.get("year") is None:
-                                if aux_year is None:
-                                    continue
-                                db.insert_convenio({
-                                    "horas_convenio_anuales": structured_data["horas_convenio_anuales"],
-                                    "year": aux_year
-                                })
-
-                        processed.append(f"{os.path.basename(file_path)} página {page_num+1}")
-                    except Exception as e:
-                        # st.warning(f"Error en {os.path.basename(file_path)} página {page_num+1}: {e} - {structured_data}")
-                        continue
+        for file in uploaded_files:
+            processed.extend(ingest_file(file.name, file.getvalue(), pdf_preprocessor, llm_classifier, db))
 
-        return processed
+        message = local_share_message(stats_before, llm_classifier.extraction_stats())
+        if message:
+            processed.append(message)
 
+        return processed
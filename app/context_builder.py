@@ -0,0 +1,139 @@
+# context_builder.py
+import decimal
+import json
+import re
+import unicodedata
+from typing import Dict, Any, List, Optional
+
+try:
+    import tiktoken
+except ImportError:  # tiktoken es opcional: sin él se estima ~4 caracteres por token
+    tiktoken = None
+
+# Palabras de los nombres que no identifican a nadie
+NAME_STOPWORDS = {"de", "del", "la", "las", "los", "y", "i", "da", "san"}
+
+# Columnas enviadas al LLM, en este orden
+CONTEXT_COLUMNS = [
+    "worker_id", "worker_name", "company_id", "company_name", "year",
+    "percepcion_integra", "base_contingencias_comunes", "horas_convenio_anuales", "coste_hora",
+]
+
+
+def _normalize(text: str) -> str:
+    text = unicodedata.normalize("NFKD", str(text or ""))
+    return "".join(c for c in text if not unicodedata.combining(c)).lower()
+
+
+def _tokens(text: str) -> set:
+    return set(re.findall(r"[a-z0-9]+", _normalize(text)))
+
+
+def count_tokens(text: str, model: str = "gpt-4") -> int:
+    """Token count of a prompt fragment (exact with tiktoken, estimated otherwise)."""
+    if tiktoken is not None:
+        try:
+            encoding = tiktoken.encoding_for_model(model)
+        except KeyError:
+            encoding = tiktoken.get_encoding("cl100k_base")
+        return len(encoding.encode(text))
+    return (len(text) + 3) // 4
+
+
+def to_json(value: Any) -> str:
+    """Compact JSON; Decimals from psycopg2 become floats."""
+    def decimal_default(obj):
+        if isinstance(obj, decimal.Decimal):
+            return float(obj)
+        raise TypeError
+    return json.dumps(value, default=decimal_default, ensure_ascii=False, separators=(",", ":"))
+
+
+class ContextBuilder:
+    """Select the worker rows a question refers to and fit them into a token budget."""
+
+    def __init__(self, max_tokens: int = 3000, model: str = "gpt-4", project_share: float = 0.5):
+        self.max_tokens = max_tokens
+        self.model = model
+        # Fracción máxima del presupuesto que puede ocupar el documento de planificación
+        self.project_share = project_share
+
+    def _score(self, row: Dict[str, Any], question_tokens: set) -> int:
+        score = 0
+        if _normalize(row.get("worker_id")) in question_tokens:
+            score += 3
+        name_tokens = {t for t in _tokens(row.get("worker_name")) if len(t) > 2 and t not in NAME_STOPWORDS}
+        score += 2 * len(name_tokens & question_tokens)
+        if _normalize(row.get("company_id")) in question_tokens:
+            score += 2
+        company_tokens = {t for t in _tokens(row.get("company_name")) if len(t) > 2 and t not in {"sl", "sa", "slu"}}
+        if company_tokens and company_tokens & question_tokens:
+            score += 1
+        return score
+
+    def select_rows(self, question: str, rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Rows matching the workers/companies/years mentioned; all rows if none is mentioned."""
+        question_tokens = _tokens(question)
+        years = {int(t) for t in question_tokens if re.fullmatch(r"(19|20)\d\d", t)}
+
+        if years:
+            rows = [row for row in rows if row.get("year") in years]
+
+        scored = [(self._score(row, question_tokens), index, row) for index, row in enumerate(rows)]
+        if any(score for score, _, _ in scored):
+            scored = [item for item in scored if item[0] > 0]
+        scored.sort(key=lambda item: (-item[0], item[1]))
+        return [row for _, _, row in scored]
+
+    def build(self, question: str, rows: List[Dict[str, Any]], project_text: str = "",
+              scenario: Optional[Dict[str, Any]] = None,
+              allocation: Optional[Dict[str, Any]] = None,
+              planning: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Compact, budgeted context: {"context": dict, "tokens": int, "rows_sent": int, "rows_omitted": int}.
+
+        `scenario` describes the what-if assumptions the rows' coste_hora was computed with;
+        `allocation` is a TaskAllocator result and `planning` the structured planning document
+        (LLMClassifier.extract_planning), both sent whole since they are already compact.
+        """
+        selected = self.select_rows(question, rows)
+
+        project_text = project_text or ""
+        project_budget = int(self.max_tokens * self.project_share) if project_text else 0
+        if project_text and count_tokens(project_text, self.model) > project_budget:
+            # Recorte proporcional aproximado, ajustado después con el contador real
+            ratio = project_budget / count_tokens(project_text, self.model)
+            project_text = project_text[:int(len(project_text) * ratio)]
+            while project_text and count_tokens(project_text, self.model) > project_budget:
+                project_text = project_text[:int(len(project_text) * 0.9)]
+
+        context: Dict[str, Any] = {"columnas": CONTEXT_COLUMNS, "coste_hora": []}
+        if scenario:
+            context["escenario"] = scenario
+        if allocation:
+            context["asignacion_calculada"] = allocation
+        if planning:
+            context["planificacion"] = planning
+        if project_text:
+            context["documento_proyecto"] = project_text
+
+        used = count_tokens(to_json(context), self.model)
+        for row in selected:
+            values = [row.get(column) for column in CONTEXT_COLUMNS]
+            if row.get("coste_hora") is not None:
+                values[-1] = round(float(row["coste_hora"]), 2)
+            row_tokens = count_tokens(to_json(values), self.model) + 1
+            if used + row_tokens > self.max_tokens:
+                break
+            context["coste_hora"].append(values)
+            used += row_tokens
+
+        omitted = len(rows) - len(context["coste_hora"])
+        if len(selected) > len(context["coste_hora"]):
+            context["filas_omitidas_por_limite"] = len(selected) - len(context["coste_hora"])
+
+        return {
+            "context": context,
+            "tokens": count_tokens(to_json(context), self.model),
+            "rows_sent": len(context["coste_hora"]),
+            "rows_omitted": omitted,
+        }
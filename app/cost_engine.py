@@ -0,0 +1,104 @@
+# cost_engine.py
+"""Escenarios de coste/hora ("¿y si la IT fuera del 2,0 % o el convenio de 1.760 h?").
+
+Los agregados de worker_costs (percepción íntegra, base de contingencias anual y horas
+de convenio) se cargan una vez en arrays; cada escenario recalcula el coste/hora de toda
+la plantilla en una sola pasada vectorizada, con la misma fórmula que la base de datos:
+
+    coste_hora = (percepcion_integra + base_contingencias_comunes / 12 * porcentaje) / horas_convenio_anuales
+"""
+from numbers import Number
+from typing import Any, Dict, List, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+KEY_COLUMNS = ["worker_id", "worker_name", "company_id", "company_name", "year"]
+
+HoursOverride = Union[None, float, Dict[int, float]]
+
+
+def _floats(values) -> np.ndarray:
+    return pd.to_numeric(pd.Series(values, dtype=object), errors="coerce").to_numpy(dtype=float)
+
+
+class CostEngine:
+    """Columnar copy of the cost inputs of every worker, company and year."""
+
+    def __init__(self, rows: List[Dict[str, Any]], cargas_sociales: Dict[str, float]):
+        frame = pd.DataFrame(list(rows), columns=KEY_COLUMNS + [
+            "percepcion_integra", "base_contingencias_comunes", "porcentaje", "horas_convenio_anuales", "coste_hora",
+        ])
+        self.keys = frame[KEY_COLUMNS].reset_index(drop=True)
+        self.year = frame["year"].to_numpy(dtype=np.int64)
+        self.percepcion = _floats(frame["percepcion_integra"])
+        self.base = _floats(frame["base_contingencias_comunes"])
+        self.porcentaje = _floats(frame["porcentaje"])
+        self.horas = _floats(frame["horas_convenio_anuales"])
+        self.coste_hora = _floats(frame["coste_hora"])
+        # Porcentajes por concepto (23.60, 5.50, ...), como en la tabla cargas_sociales
+        self.cargas_sociales = {concepto: float(porcentaje) for concepto, porcentaje in cargas_sociales.items()}
+
+    @classmethod
+    def from_database(cls, db) -> "CostEngine":
+        return cls(db.get_workers_data(), db.get_cargas_sociales())
+
+    def __len__(self) -> int:
+        return len(self.year)
+
+    @property
+    def years(self) -> List[int]:
+        return sorted(set(self.year.tolist()))
+
+    def _porcentaje(self, cargas_sociales: Optional[Dict[str, float]]) -> np.ndarray:
+        """Fraction applied to the RNT base; overrides replace single concepts."""
+        if not cargas_sociales:
+            return self.porcentaje
+        total = sum(dict(self.cargas_sociales, **cargas_sociales).values()) / 100
+        return np.full(len(self), total)
+
+    def _horas(self, horas_convenio: HoursOverride) -> np.ndarray:
+        """Hours per row: unchanged, one value for every year, or {year: hours}."""
+        if horas_convenio is None:
+            return self.horas
+        if isinstance(horas_convenio, Number):
+            return np.full(len(self), float(horas_convenio))
+        overrides = pd.Series(self.year).map({int(year): float(hours) for year, hours in horas_convenio.items()})
+        overrides = overrides.to_numpy(dtype=float)
+        return np.where(np.isnan(overrides), self.horas, overrides)
+
+    @staticmethod
+    def compute(percepcion: np.ndarray, base: np.ndarray, porcentaje: np.ndarray, horas: np.ndarray) -> np.ndarray:
+        """Vectorized coste_hora; NaN where an input is missing or there are no hours (NULL in SQL)."""
+        with np.errstate(divide="ignore", invalid="ignore"):
+            coste = (percepcion + base / 12 * porcentaje) / horas
+        coste[~np.isfinite(coste)] = np.nan
+        return coste
+
+    def scenario(self, cargas_sociales: Optional[Dict[str, float]] = None,
+                 horas_convenio: HoursOverride = None) -> pd.DataFrame:
+        """Current and simulated coste_hora of every row, with the absolute and relative change."""
+        horas = self._horas(horas_convenio)
+        porcentaje = self._porcentaje(cargas_sociales)
+        simulated = self.compute(self.percepcion, self.base, porcentaje, horas)
+
+        result = self.keys.copy()
+        result["percepcion_integra"] = self.percepcion
+        result["base_contingencias_comunes"] = self.base
+        result["porcentaje"] = porcentaje
+        result["horas_convenio_anuales"] = horas
+        result["coste_hora"] = self.coste_hora
+        result["coste_hora_escenario"] = simulated
+        result["diferencia"] = simulated - self.coste_hora
+        with np.errstate(divide="ignore", invalid="ignore"):
+            result["diferencia_pct"] = np.where(self.coste_hora > 0, result["diferencia"] / self.coste_hora, np.nan)
+        return result
+
+    def scenario_rows(self, cargas_sociales: Optional[Dict[str, float]] = None,
+                      horas_convenio: HoursOverride = None) -> List[Dict[str, Any]]:
+        """Rows shaped like Database.get_workers_data with the simulated coste_hora (for the chat context)."""
+        frame = self.scenario(cargas_sociales, horas_convenio)
+        frame["coste_hora"] = frame["coste_hora_escenario"]
+        frame = frame.drop(columns=["coste_hora_escenario", "diferencia", "diferencia_pct"])
+        frame = frame.astype(object).where(frame.notna(), None)
+        return frame.to_dict("records")
@@ -1,8 +1,245 @@
 # database.py
 import psycopg2
-from psycopg2.extras import RealDictCursor
+from psycopg2.extras import Json, RealDictCursor, execute_values
+from psycopg2.pool import ThreadedConnectionPool, PoolError
+from collections import OrderedDict
+from contextlib import contextmanager
 import os
-from typing import Dict, Any, List
+import decimal
+import threading
+import time
+import uuid
+from typing import Callable, Dict, Any, Iterator, List, Optional, Tuple
+
+from metrics import metrics
+
+
+class ConnectionPool:
+    """Thread-safe PostgreSQL connection pool with health checks and usage statistics."""
+
+    def __init__(self, connection_string: str, minconn: int = 1, maxconn: int = 10,
+                 timeout: float = 30.0, health_check_interval: float = 30.0):
+        self.connection_string = connection_string
+        self.minconn = minconn
+        self.maxconn = maxconn
+        self.timeout = timeout
+        self.health_check_interval = health_check_interval
+
+        self._pool = ThreadedConnectionPool(minconn, maxconn, connection_string)
+        # ThreadedConnectionPool raises instead of waiting when exhausted,
+        # so checkouts are gated by a semaphore sized like the pool.
+        self._slots = threading.BoundedSemaphore(maxconn)
+        self._lock = threading.Lock()
+        self._last_used: Dict[int, float] = {}
+        self._stats = {
+            "checkouts": 0,
+            "in_use": 0,
+            "max_in_use": 0,
+            "wait_time_total": 0.0,
+            "wait_time_max": 0.0,
+            "timeouts": 0,
+            "health_check_failures": 0,
+        }
+
+    def _is_healthy(self, conn) -> bool:
+        """Cheap liveness check; only pings the server if the connection has been idle a while."""
+        if conn.closed:
+            return False
+        idle_since = self._last_used.get(id(conn))
+        if idle_since is not None and time.monotonic() - idle_since < self.health_check_interval:
+            return True
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    def _checkout(self):
+        conn = self._pool.getconn()
+        if not self._is_healthy(conn):
+            with self._lock:
+                self._stats["health_check_failures"] += 1
+            self._last_used.pop(id(conn), None)
+            self._pool.putconn(conn, close=True)
+            conn = self._pool.getconn()
+        return conn
+
+    @contextmanager
+    def connection(self):
+        """Check out a connection; commits on success, rolls back on error and always returns it."""
+        start = time.monotonic()
+        if not self._slots.acquire(timeout=self.timeout):
+            with self._lock:
+                self._stats["timeouts"] += 1
+            raise PoolError(f"No hay conexiones libres tras {self.timeout}s (max={self.maxconn}).")
+        waited = time.monotonic() - start
+
+        try:
+            conn = self._checkout()
+        except Exception:
+            self._slots.release()
+            raise
+
+        with self._lock:
+            self._stats["checkouts"] += 1
+            self._stats["in_use"] += 1
+            self._stats["max_in_use"] = max(self._stats["max_in_use"], self._stats["in_use"])
+            self._stats["wait_time_total"] += waited
+            self._stats["wait_time_max"] = max(self._stats["wait_time_max"], waited)
+
+        try:
+            yield conn
+            conn.commit()
+        except Exception:
+            if not conn.closed:
+                conn.rollback()
+            raise
+        finally:
+            broken = conn.closed != 0
+            if broken:
+                self._last_used.pop(id(conn), None)
+            else:
+                self._last_used[id(conn)] = time.monotonic()
+            self._pool.putconn(conn, close=broken)
+            with self._lock:
+                self._stats["in_use"] -= 1
+            self._slots.release()
+
+    def stats(self) -> Dict[str, Any]:
+        """Snapshot of pool usage, useful to size minconn/maxconn under concurrent users."""
+        with self._lock:
+            stats = dict(self._stats)
+        stats["minconn"] = self.minconn
+        stats["maxconn"] = self.maxconn
+        stats["wait_time_avg"] = stats["wait_time_total"] / stats["checkouts"] if stats["checkouts"] else 0.0
+        return stats
+
+    def close(self):
+        self._pool.closeall()
+
+
+# One pool per connection string, shared by every Database instance (and Streamlit session) in the process.
+_pools: Dict[str, ConnectionPool] = {}
+_pools_lock = threading.Lock()
+
+
+def close_pools():
+    """Close every pool of this process (e.g. before forking worker processes)."""
+    with _pools_lock:
+        for pool in _pools.values():
+            pool.close()
+        _pools.clear()
+
+
+def get_pool(connection_string: str) -> ConnectionPool:
+    """Return the process-wide pool for a connection string, creating it on first use."""
+    with _pools_lock:
+        pool = _pools.get(connection_string)
+        if pool is None:
+            pool = ConnectionPool(
+                connection_string,
+                minconn=int(os.getenv("DB_POOL_MIN", "1")),
+                maxconn=int(os.getenv("DB_POOL_MAX", "10")),
+                timeout=float(os.getenv("DB_POOL_TIMEOUT", "30")),
+            )
+            _pools[connection_string] = pool
+        return pool
+
+
+# (Salario bruto + (costes seguridad social RNT * 12 meses) * 31,4%) / horas convenio
+# {filter} restringe el recálculo a los trabajadores/años afectados; recibe el alias de tabla.
+_WORKER_COSTS_SELECT = """
+    with porcentaje_cte as (
+        select sum(porcentaje) as porcentaje from cargas_sociales
+    ),
+    -- Por trabajador, año y empresa: el orden de la clave contingencias_comunes_rnt_key
+    contingencias_comunes_cte as (
+        select worker_id, year, company_id, sum(base_contingencias_comunes) as base_contingencias_comunes
+        from contingencias_comunes
+        where {contingencias_filter}
+        group by worker_id, year, company_id
+    )
+
+    SELECT 
+        workers.worker_id, 
+        workers.year, 
+        workers.worker_name,
+        workers.company_id,
+        workers.company_name,
+        sum(percepcion_integra) as percepcion_integra,
+        max(base_contingencias_comunes) as base_contingencias_comunes,
+        max(porcentaje)/100 as porcentaje,
+        max(horas_convenio_anuales) as horas_convenio_anuales,
+        (sum(percepcion_integra) + ((max(base_contingencias_comunes)/12 )*(max(porcentaje)/100))) / max(horas_convenio_anuales)  as coste_hora
+    FROM workers
+    left join porcentaje_cte on true
+    left join convenio on workers.year = convenio.year
+    left join contingencias_comunes_cte 
+        on workers.worker_id = contingencias_comunes_cte.worker_id
+        and workers.year = contingencias_comunes_cte.year
+        and workers.company_id = contingencias_comunes_cte.company_id
+    where {workers_filter}
+    GROUP BY workers.worker_id, workers.year, workers.worker_name, workers.company_id, workers.company_name
+"""
+
+_WORKER_COSTS_COLUMNS = """
+    worker_id, year, worker_name, company_id, company_name, percepcion_integra,
+    base_contingencias_comunes, porcentaje, horas_convenio_anuales, coste_hora
+"""
+
+_WORKER_COSTS_UPSERT = """
+    ON CONFLICT (worker_id, company_id, year) DO UPDATE SET
+        worker_name = EXCLUDED.worker_name,
+        company_name = EXCLUDED.company_name,
+        percepcion_integra = EXCLUDED.percepcion_integra,
+        base_contingencias_comunes = EXCLUDED.base_contingencias_comunes,
+        porcentaje = EXCLUDED.porcentaje,
+        horas_convenio_anuales = EXCLUDED.horas_convenio_anuales,
+        coste_hora = EXCLUDED.coste_hora
+"""
+
+
+def _worker_costs_filter(table: str) -> str:
+    return f"""(
+        ({table}.worker_id, {table}.year) in (
+            select * from unnest(%(worker_ids)s::varchar[], %(worker_years)s::int[])
+        )
+        or {table}.year = any(%(years)s::int[])
+    )"""
+
+
+# Migraciones del esquema: (versión, nombre, método de Database que recibe el cursor).
+# Nunca modificar una ya publicada; añadir una nueva al final.
+MIGRATIONS = [
+    (1, "initial schema", "_migrate_initial_schema"),
+    (2, "planning documents", "_migrate_planning_documents"),
+    (3, "worker costs version and pagination indexes", "_migrate_worker_costs_pagination"),
+    (4, "contingencias comunes partitioned by year", "_migrate_contingencias_partitions"),
+    (5, "ingested pages keyed by document and page", "_migrate_ingested_pages_key"),
+    (6, "worker costs matched to rnt per company", "_migrate_worker_costs_per_company"),
+]
+MIGRATIONS_LOCK_ID = 7311901
+# Recálculos de worker_costs: un cerrojo (clave, año) por año afectado
+WORKER_COSTS_LOCK_ID = 7311902
+
+# Conexiones cuyo esquema ya se comprobó en este proceso
+_migrated = set()
+_migrated_lock = threading.Lock()
+
+# Particiones anuales de contingencias_comunes que ya existen: (conexión, año)
+_rnt_partitions = set()
+_rnt_partitions_lock = threading.Lock()
+# check_violation: entre otros, una fila sin partición para su año
+MISSING_PARTITION_PGCODE = "23514"
+
+# Resultados de lecturas por filtro, válidos mientras no cambie la versión de worker_costs.
+# Compartidos por todas las sesiones del proceso: no deben modificarse.
+QUERY_CACHE_SIZE = int(os.getenv("DB_QUERY_CACHE_SIZE", "256"))
+_query_cache: "OrderedDict[Tuple, Tuple[int, Any]]" = OrderedDict()
+_query_cache_lock = threading.Lock()
+
 
 class Database:
     def __init__(self, connection_string=None):
@@ -11,33 +248,90 @@ class Database:
             self.connection_string = f"host={os.getenv('DB_HOST')} dbname={os.getenv('DB_NAME')} user={os.getenv('DB_USER')} password={os.getenv('DB_PASSWORD')}"
         else:
             self.connection_string = connection_string
+        self.pool = get_pool(self.connection_string)
+        metrics.register_gauges("db_pool", self.pool.stats)
         
     def connect(self):
         """Establish a connection to the PostgreSQL database."""
         return psycopg2.connect(self.connection_string)
+
+    @contextmanager
+    def cursor(self, cursor_factory=None):
+        """Pooled cursor; the surrounding transaction is committed when the block exits cleanly."""
+        with self.pool.connection() as conn:
+            cur = conn.cursor(cursor_factory=cursor_factory)
+            try:
+                yield cur
+            finally:
+                cur.close()
+
+    def pool_stats(self) -> Dict[str, Any]:
+        """Connection pool statistics (checkouts, wait time, in use)."""
+        return self.pool.stats()
     
     def clean_database(self):
         """Clean the database by dropping all tables."""
-        conn = self.connect()
-        cur = conn.cursor()
-        
-        # Drop all tables
-        cur.execute("DROP TABLE IF EXISTS workers CASCADE")
-        cur.execute("DROP TABLE IF EXISTS contingencias_comunes CASCADE")
-        cur.execute("DROP TABLE IF EXISTS convenio CASCADE")
-        cur.execute("DROP TABLE IF EXISTS cargas_sociales CASCADE")
-        
-        conn.commit()
-        cur.close()
-        conn.close()
+        with self.cursor() as cur:
+            # Drop all tables
+            cur.execute("DROP TABLE IF EXISTS workers CASCADE")
+            cur.execute("DROP TABLE IF EXISTS contingencias_comunes CASCADE")
+            cur.execute("DROP TABLE IF EXISTS convenio CASCADE")
+            cur.execute("DROP TABLE IF EXISTS cargas_sociales CASCADE")
+            cur.execute("DROP TABLE IF EXISTS worker_costs CASCADE")
+            cur.execute("DROP TABLE IF EXISTS ingested_documents CASCADE")
+            cur.execute("DROP TABLE IF EXISTS ingested_pages CASCADE")
+            cur.execute("DROP TABLE IF EXISTS ingestion_jobs CASCADE")
+            cur.execute("DROP TABLE IF EXISTS planning_documents CASCADE")
+            cur.execute("DROP TABLE IF EXISTS data_versions CASCADE")
+            cur.execute("DROP TABLE IF EXISTS schema_migrations CASCADE")
+        with _migrated_lock:
+            _migrated.discard(self.connection_string)
+        self._forget_rnt_partitions()
+        with _query_cache_lock:
+            _query_cache.clear()
         print("Database cleaned successfully.")
 
     def create_tables(self):
-        """Create necessary tables if they don't exist."""
-        conn = self.connect()
-        cur = conn.cursor()
+        """Create necessary tables if they don't exist (applies pending migrations)."""
+        self.migrate()
 
-        
+    def migrate(self, target: int = None):
+        """Apply pending schema migrations, recorded in schema_migrations.
+
+        Runs at most once per process and connection string; concurrent processes
+        (Streamlit, workers) serialize on an advisory lock. `target` stops at that
+        version (benchmarks comparing schemas).
+        """
+        with _migrated_lock:
+            if self.connection_string in _migrated:
+                return
+            with self.cursor() as cur:
+                cur.execute("SELECT pg_advisory_xact_lock(%s)", (MIGRATIONS_LOCK_ID,))
+                cur.execute("""
+                    CREATE TABLE IF NOT EXISTS schema_migrations (
+                        version INT PRIMARY KEY,
+                        name VARCHAR(255) NOT NULL,
+                        applied_at TIMESTAMP NOT NULL DEFAULT now()
+                    )
+                """)
+                cur.execute("SELECT version FROM schema_migrations")
+                applied = {row[0] for row in cur.fetchall()}
+                for version, name, method in MIGRATIONS:
+                    if version in applied or (target is not None and version > target):
+                        continue
+                    getattr(self, method)(cur)
+                    cur.execute("INSERT INTO schema_migrations (version, name) VALUES (%s, %s)", (version, name))
+                    print(f"Migración {version} aplicada: {name}")
+            if target is None:
+                _migrated.add(self.connection_string)
+
+    def schema_version(self) -> int:
+        with self.cursor() as cur:
+            cur.execute("SELECT COALESCE(MAX(version), 0) FROM schema_migrations")
+            return cur.fetchone()[0]
+
+    def _migrate_initial_schema(self, cur):
+        """Migration 1: tables as created by the former create_tables()."""
         # Create workers table
         cur.execute("""
         CREATE TABLE IF NOT EXISTS workers (
@@ -82,7 +376,74 @@ class Database:
             )
         """)
 
-            # Insertar valores fijos si no existen
+        # Coste/hora materializado por trabajador, empresa y año
+        cur.execute("""
+            CREATE TABLE IF NOT EXISTS worker_costs (
+                worker_id VARCHAR(100),
+                year INT NOT NULL,
+                worker_name VARCHAR(255) NOT NULL,
+                company_id VARCHAR(100) NOT NULL,
+                company_name VARCHAR(255) NOT NULL,
+                percepcion_integra NUMERIC,
+                base_contingencias_comunes NUMERIC,
+                porcentaje NUMERIC,
+                horas_convenio_anuales NUMERIC,
+                coste_hora NUMERIC,
+                UNIQUE(worker_id, company_id, year)
+            )
+        """)
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_worker_costs_company_year ON worker_costs (company_id, year)")
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_worker_costs_year ON worker_costs (year)")
+        # Índices de apoyo para los recálculos parciales
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_workers_worker_year ON workers (worker_id, year)")
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_workers_year ON workers (year)")
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_contingencias_worker_year ON contingencias_comunes (worker_id, year)")
+
+        # Registro de documentos y páginas ya ingeridos (hash SHA-256 del contenido)
+        cur.execute("""
+            CREATE TABLE IF NOT EXISTS ingested_documents (
+                file_hash CHAR(64) PRIMARY KEY,
+                file_name VARCHAR(255) NOT NULL,
+                doc_type VARCHAR(50) NOT NULL,
+                page_count INT NOT NULL,
+                status VARCHAR(20) NOT NULL,
+                updated_at TIMESTAMP NOT NULL DEFAULT now()
+            )
+        """)
+
+        cur.execute("""
+            CREATE TABLE IF NOT EXISTS ingested_pages (
+                page_hash CHAR(64) PRIMARY KEY,
+                file_hash CHAR(64) NOT NULL,
+                page_num INT NOT NULL,
+                doc_type VARCHAR(50) NOT NULL,
+                status VARCHAR(20) NOT NULL,
+                error TEXT,
+                updated_at TIMESTAMP NOT NULL DEFAULT now()
+            )
+        """)
+
+        # Cola de ingesta en segundo plano (ver ingestion_worker.py)
+        cur.execute("""
+            CREATE TABLE IF NOT EXISTS ingestion_jobs (
+                id SERIAL PRIMARY KEY,
+                file_hash CHAR(64) UNIQUE NOT NULL,
+                file_name VARCHAR(255) NOT NULL,
+                content BYTEA,
+                status VARCHAR(20) NOT NULL DEFAULT 'queued',
+                pages_done INT NOT NULL DEFAULT 0,
+                pages_total INT,
+                result TEXT,
+                error TEXT,
+                attempts INT NOT NULL DEFAULT 0,
+                worker VARCHAR(100),
+                created_at TIMESTAMP NOT NULL DEFAULT now(),
+                updated_at TIMESTAMP NOT NULL DEFAULT now()
+            )
+        """)
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_ingestion_jobs_pending ON ingestion_jobs (id) WHERE status IN ('queued', 'running')")
+
+        # Insertar valores fijos si no existen
         cur.execute("""
             INSERT INTO cargas_sociales (concepto, porcentaje) VALUES 
             ('Contingencias comunes', 23.60),
@@ -91,128 +452,629 @@ class Database:
             ('ÍT', 1.50)
             ON CONFLICT (concepto) DO NOTHING
         """)
-        
-        conn.commit()
-        cur.close()
-        conn.close()
+
+        # Poblar la tabla materializada la primera vez (bases de datos ya existentes).
+        # Sin pasar por _refresh_worker_costs: data_versions aún no existe en esta versión
+        cur.execute("SELECT EXISTS (SELECT 1 FROM worker_costs)")
+        if not cur.fetchone()[0]:
+            self._recompute_worker_costs(cur)
     
-    def insert_worker(self, worker_data: Dict[str, Any]):
-        """Insert or update worker information."""
-        conn = self.connect()
-        cur = conn.cursor()
-        
+    def _migrate_planning_documents(self, cur):
+        """Migration 2: structured planning documents, extracted once per content hash."""
         cur.execute("""
-        INSERT INTO workers (worker_id, year, worker_name, percepcion_integra, company_id, company_name)
-        VALUES (%s, %s, %s, %s, %s, %s)
-        ON CONFLICT (worker_id, company_id, year) DO NOTHING
-        """, (
-                worker_data['worker_id'], 
-                worker_data['year'], 
-                worker_data['worker_name'], 
-                worker_data['percepcion_integra'],
-                worker_data['company_id'],
-                worker_data['company_name']
+            CREATE TABLE IF NOT EXISTS planning_documents (
+                file_hash CHAR(64) PRIMARY KEY,
+                file_name VARCHAR(255) NOT NULL,
+                planning JSONB NOT NULL,
+                created_at TIMESTAMP NOT NULL DEFAULT now()
             )
-        )
-        
-        conn.commit()
-        cur.close()
-        conn.close()
+        """)
 
-    def insert_contingencias_comunes(self, worker_data: Dict[str, Any]):
-        """Insert or update worker information."""
-        conn = self.connect()
-        cur = conn.cursor()
-        
+    def _migrate_worker_costs_pagination(self, cur):
+        """Migration 3: change counter for cached reads and indexes for keyset pagination."""
+        cur.execute("""
+            CREATE TABLE IF NOT EXISTS data_versions (
+                name VARCHAR(50) PRIMARY KEY,
+                version BIGINT NOT NULL DEFAULT 0
+            )
+        """)
+        cur.execute("INSERT INTO data_versions (name) VALUES ('worker_costs') ON CONFLICT (name) DO NOTHING")
+        # Orden de la paginación (empresa, año, trabajador); sustituye al índice (company_id, year)
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_worker_costs_keyset ON worker_costs (company_id, year, worker_id)")
+        cur.execute("DROP INDEX IF EXISTS idx_worker_costs_company_year")
+        # Búsqueda por prefijo del nombre (LIKE 'garcia%')
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_worker_costs_name_prefix "
+                    "ON worker_costs (lower(worker_name) text_pattern_ops)")
+
+    def _migrate_contingencias_partitions(self, cur):
+        """Migration 4: contingencias_comunes partitioned by year, deduplicated per worker, company and periodo.
+
+        The former seven-column unique key (with the base, days and company name) is replaced
+        by (worker_id, year, company_id, periodo), which also serves the cost aggregation by
+        worker and year. Lines of the same worker, company and month are added up, so every
+        coste_hora stays the same.
+        """
+        cur.execute("ALTER TABLE contingencias_comunes RENAME TO contingencias_comunes_v3")
+        cur.execute("DROP INDEX IF EXISTS idx_contingencias_worker_year")
+        self._create_contingencias_comunes(cur)
+        cur.execute("SELECT DISTINCT year FROM contingencias_comunes_v3")
+        for (year,) in cur.fetchall():
+            self._create_rnt_partition(cur, year)
+        cur.execute("""
+            INSERT INTO contingencias_comunes (
+                worker_id, year, base_contingencias_comunes, dias_cotizados, periodo, company_id, company_name
+            )
+            SELECT worker_id, year, sum(base_contingencias_comunes), sum(dias_cotizados), periodo,
+                   company_id, max(company_name)
+            FROM contingencias_comunes_v3
+            GROUP BY worker_id, year, company_id, periodo
+        """)
+        cur.execute("DROP TABLE contingencias_comunes_v3")
+        cur.execute("ANALYZE contingencias_comunes")
+
+    def _migrate_ingested_pages_key(self, cur):
+        """Migration 5: page registry keyed by (file_hash, page_num) instead of the page text hash.
+
+        The same text in another document (or read as another type) is no longer taken as done.
+        """
+        cur.execute("ALTER TABLE ingested_pages DROP CONSTRAINT ingested_pages_pkey")
+        cur.execute("ALTER TABLE ingested_pages ADD PRIMARY KEY (file_hash, page_num)")
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_ingested_pages_hash ON ingested_pages (page_hash)")
+
+    def _migrate_worker_costs_per_company(self, cur):
+        """Migration 6: rebuild worker_costs now that RNT bases are matched per company.
+
+        Before, each company of a worker and year got the bases of all their companies.
+        """
+        self._refresh_worker_costs(cur)
+
+    @staticmethod
+    def _create_contingencias_comunes(cur):
+        # Una fila por trabajador, año, empresa y periodo; una partición por año
         cur.execute("""
+            CREATE TABLE contingencias_comunes (
+                worker_id VARCHAR(100),
+                year INT NOT NULL,
+                base_contingencias_comunes DECIMAL(24, 4) NOT NULL,
+                dias_cotizados INT NOT NULL,
+                periodo VARCHAR(10) NOT NULL,
+                company_id VARCHAR(100) NOT NULL,
+                company_name VARCHAR(255) NOT NULL,
+                CONSTRAINT contingencias_comunes_rnt_key UNIQUE (worker_id, year, company_id, periodo)
+            ) PARTITION BY RANGE (year)
+        """)
+
+    @staticmethod
+    def _create_rnt_partition(cur, year: int):
+        year = int(year)
+        cur.execute(f"""
+            CREATE TABLE IF NOT EXISTS contingencias_comunes_{year}
+            PARTITION OF contingencias_comunes FOR VALUES FROM ({year}) TO ({year + 1})
+        """)
+
+    def ensure_rnt_partitions(self, years):
+        """Create the missing yearly partitions of contingencias_comunes.
+
+        Runs in its own short transaction, before the ingestion one, so the lock taken on
+        the parent table to attach a partition is released right away.
+        """
+        years = {int(year) for year in years if str(year).strip().isdigit()}
+        with _rnt_partitions_lock:
+            missing = sorted(year for year in years if (self.connection_string, year) not in _rnt_partitions)
+        if not missing:
+            return
+        with self.cursor() as cur:
+            cur.execute("SELECT pg_advisory_xact_lock(%s)", (MIGRATIONS_LOCK_ID,))
+            for year in missing:
+                self._create_rnt_partition(cur, year)
+        with _rnt_partitions_lock:
+            _rnt_partitions.update((self.connection_string, year) for year in missing)
+
+    def _forget_rnt_partitions(self):
+        with _rnt_partitions_lock:
+            _rnt_partitions.difference_update({key for key in _rnt_partitions if key[0] == self.connection_string})
+
+    def _write_rnt(self, years, write: Callable):
+        """Run `write(cur)` in one transaction once the partitions of `years` exist.
+
+        The partition cache lives in this process: if another one dropped the tables
+        (clean_database, benchmarks) the insert finds no partition, so the cache of this
+        connection is forgotten and the transaction retried once.
+        """
+        for attempt in range(2):
+            self.ensure_rnt_partitions(years)
+            try:
+                with self.cursor() as cur:
+                    write(cur)
+                return
+            except psycopg2.IntegrityError as e:
+                if attempt or e.pgcode != MISSING_PARTITION_PGCODE:
+                    raise
+                self._forget_rnt_partitions()
+
+    def insert_worker(self, worker_data: Dict[str, Any]):
+        """Insert or update worker information."""
+        with self.cursor() as cur:
+            self._refresh_worker_costs(cur, worker_years=self._insert_workers(cur, [worker_data]))
+
+    def insert_contingencias_comunes(self, worker_data: Dict[str, Any]):
+        """Insert worker information."""
+        def write(cur):
+            self._refresh_worker_costs(cur, worker_years=self._insert_contingencias_comunes(cur, [worker_data]))
+
+        self._write_rnt([worker_data['year']], write)
+
+    def insert_convenio(self, convenio_data: Dict[str, Any]):
+        """Insert or update convenio information."""
+        with self.cursor() as cur:
+            self._refresh_worker_costs(cur, years=self._insert_convenios(cur, [convenio_data]))
+
+    # Los _insert_* devuelven lo que realmente se insertó (sin los duplicados ignorados),
+    # que es lo único que hay que recalcular en worker_costs
+    def _insert_workers(self, cur, rows: List[Dict[str, Any]]) -> List[tuple]:
+        return execute_values(cur, """
+            INSERT INTO workers (worker_id, year, worker_name, percepcion_integra, company_id, company_name)
+            VALUES %s
+            ON CONFLICT (worker_id, company_id, year) DO NOTHING
+            RETURNING worker_id, year
+        """, [
+            (
+                row['worker_id'],
+                row['year'],
+                row['worker_name'],
+                row['percepcion_integra'],
+                row['company_id'],
+                row['company_name']
+            )
+            for row in rows
+        ], page_size=1000, fetch=True)
+
+    @staticmethod
+    def _merge_rnt_rows(rows: List[Dict[str, Any]]) -> List[tuple]:
+        """One row per (worker_id, year, company_id, periodo): the distinct lines of a month
+        in the same document are added up; repeated lines count once."""
+        merged: Dict[tuple, list] = {}
+        for worker_id, year, periodo, company_id, company_name, base, dias in sorted({
+            (
+                row['worker_id'],
+                row['year'],
+                row['periodo'],
+                row['company_id'],
+                row['company_name'],
+                decimal.Decimal(str(row['base_contingencias_comunes'])),
+                int(row['dias_cotizados'])
+            )
+            for row in rows
+        }, key=str):
+            line = merged.setdefault((worker_id, year, company_id, periodo), [decimal.Decimal(0), 0, company_name])
+            line[0] += base
+            line[1] += dias
+        return [
+            (worker_id, year, base, dias, periodo, company_id, company_name)
+            for (worker_id, year, company_id, periodo), (base, dias, company_name) in merged.items()
+        ]
+
+    def _insert_contingencias_comunes(self, cur, rows: List[Dict[str, Any]]) -> List[tuple]:
+        # El primer documento que aporta un mes de un trabajador y empresa es el que cuenta
+        return execute_values(cur, """
             INSERT INTO contingencias_comunes (
                 worker_id, year, base_contingencias_comunes, dias_cotizados,
                 periodo, company_id, company_name
-            ) VALUES (%s, %s, %s, %s, %s, %s, %s)
-            ON CONFLICT (
-                worker_id, year, periodo, base_contingencias_comunes,
-                dias_cotizados, company_id, company_name
-            ) DO NOTHING
+            ) VALUES %s
+            ON CONFLICT (worker_id, year, company_id, periodo) DO NOTHING
+            RETURNING worker_id, year
+        """, self._merge_rnt_rows(rows), page_size=1000, fetch=True)
+
+    def _insert_convenios(self, cur, rows: List[Dict[str, Any]]) -> List[int]:
+        return [year for (year,) in execute_values(cur, """
+            INSERT INTO convenio (year, horas_convenio_anuales)
+            VALUES %s
+            ON CONFLICT (year) DO NOTHING
+            RETURNING year
+        """, [(row['year'], row['horas_convenio_anuales']) for row in rows], page_size=1000, fetch=True)]
+
+    def insert_workers(self, rows: List[Dict[str, Any]]):
+        """Bulk insert of workers (multi-row VALUES, single transaction)."""
+        if not rows:
+            return
+        with self.cursor() as cur:
+            self._refresh_worker_costs(cur, worker_years=self._insert_workers(cur, rows))
+
+    def insert_contingencias_comunes_bulk(self, rows: List[Dict[str, Any]]):
+        """Bulk insert of RNT rows (multi-row VALUES, single transaction)."""
+        if not rows:
+            return
+        def write(cur):
+            self._refresh_worker_costs(cur, worker_years=self._insert_contingencias_comunes(cur, rows))
+
+        self._write_rnt([row['year'] for row in rows], write)
+
+    def insert_convenios(self, rows: List[Dict[str, Any]]):
+        """Bulk insert of convenio rows (multi-row VALUES, single transaction)."""
+        if not rows:
+            return
+        with self.cursor() as cur:
+            self._refresh_worker_costs(cur, years=self._insert_convenios(cur, rows))
+
+    def _record_document(self, cur, document: Dict[str, Any], pages: List[Dict[str, Any]]):
+        cur.execute("""
+            INSERT INTO ingested_documents (file_hash, file_name, doc_type, page_count, status)
+            VALUES (%s, %s, %s, %s, %s)
+            ON CONFLICT (file_hash) DO UPDATE SET
+                status = EXCLUDED.status,
+                doc_type = EXCLUDED.doc_type,
+                updated_at = now()
         """, (
-            worker_data['worker_id'],
-            worker_data['year'],
-            worker_data['base_contingencias_comunes'],
-            worker_data['dias_cotizados'],
-            worker_data['periodo'],
-            worker_data['company_id'],
-            worker_data['company_name']
+            document['file_hash'],
+            document['file_name'],
+            document['doc_type'],
+            document['page_count'],
+            document['status']
         ))
-        
-        conn.commit()
-        cur.close()
-        conn.close()
+        # Una fila por página, prevaleciendo 'done'
+        unique_pages: Dict[int, Dict[str, Any]] = {}
+        for page in pages or []:
+            current = unique_pages.get(page['page_num'])
+            if current is None or (current['status'] != 'done' and page['status'] == 'done'):
+                unique_pages[page['page_num']] = page
+        pages = list(unique_pages.values())
 
-    def insert_convenio(self, convenio_data: Dict[str, Any]):
-        """Insert or update convenio information."""
-        conn = self.connect()
-        cur = conn.cursor()
-        
-        cur.execute("""
-        INSERT INTO convenio (year, horas_convenio_anuales)
-        VALUES (%s, %s)
-        ON CONFLICT (year) DO NOTHING
-        """, (convenio_data['year'], convenio_data['horas_convenio_anuales'],))
-        
-        conn.commit()
-        cur.close()
-        conn.close()
+        if pages:
+            # Una página ya 'done' nunca vuelve a otro estado
+            execute_values(cur, """
+                INSERT INTO ingested_pages (page_hash, file_hash, page_num, doc_type, status, error)
+                VALUES %s
+                ON CONFLICT (file_hash, page_num) DO UPDATE SET
+                    page_hash = EXCLUDED.page_hash,
+                    status = EXCLUDED.status,
+                    error = EXCLUDED.error,
+                    updated_at = now()
+                WHERE ingested_pages.status <> 'done'
+            """, [
+                (
+                    page['page_hash'],
+                    document['file_hash'],
+                    page['page_num'],
+                    document['doc_type'],
+                    page['status'],
+                    page.get('error')
+                )
+                for page in pages
+            ], page_size=1000)
+
+    def ingest_document(self, workers: List[Dict[str, Any]] = None,
+                        contingencias_comunes: List[Dict[str, Any]] = None,
+                        convenios: List[Dict[str, Any]] = None,
+                        document: Dict[str, Any] = None,
+                        pages: List[Dict[str, Any]] = None):
+        """Insert every row extracted from one document in a single transaction.
+
+        Duplicates are ignored (ON CONFLICT DO NOTHING) exactly like the per-row inserts;
+        if any statement fails nothing from the document is committed. When `document`
+        (and its per-page `pages` statuses) is given, the fingerprint registry is updated
+        in the same transaction.
+        """
+        if not (workers or contingencias_comunes or convenios or document):
+            return
+        rows = len(workers or []) + len(contingencias_comunes or []) + len(convenios or [])
+        metrics.count("db_rows", rows, "db_ingest")
+
+        def write(cur):
+            worker_years, years = [], []
+            if workers:
+                worker_years += self._insert_workers(cur, workers)
+            if contingencias_comunes:
+                worker_years += self._insert_contingencias_comunes(cur, contingencias_comunes)
+            if convenios:
+                years += self._insert_convenios(cur, convenios)
+            self._refresh_worker_costs(cur, worker_years=worker_years, years=years)
+            if document:
+                self._record_document(cur, document, pages)
+
+        with metrics.timer("db_ingest", rows=rows):
+            self._write_rnt([row['year'] for row in (contingencias_comunes or [])], write)
+
+    def get_document_status(self, file_hash: str):
+        """Processing status of an uploaded file, or None if it was never ingested."""
+        with self.cursor() as cur:
+            cur.execute("SELECT status FROM ingested_documents WHERE file_hash = %s", (file_hash,))
+            row = cur.fetchone()
+        return row[0] if row else None
+
+    def get_done_pages(self, file_hash: str) -> set:
+        """Page numbers of a document already handled (data stored, or skipped as having none)."""
+        with self.cursor() as cur:
+            cur.execute("""
+                SELECT page_num FROM ingested_pages
+                WHERE file_hash = %s AND status IN ('done', 'skipped')
+            """, (file_hash,))
+            return {row[0] for row in cur.fetchall()}
+
+    def enqueue_job(self, file_name: str, file_hash: str, content: bytes) -> int:
+        """Queue a PDF for background ingestion; an existing job for the same file is reused
+        (and re-queued if it had failed)."""
+        with self.cursor() as cur:
+            cur.execute("""
+                INSERT INTO ingestion_jobs (file_hash, file_name, content)
+                VALUES (%s, %s, %s)
+                ON CONFLICT (file_hash) DO UPDATE SET
+                    status = 'queued',
+                    file_name = EXCLUDED.file_name,
+                    content = EXCLUDED.content,
+                    pages_done = 0,
+                    error = NULL,
+                    updated_at = now()
+                WHERE ingestion_jobs.status = 'error'
+                RETURNING id
+            """, (file_hash, file_name, psycopg2.Binary(content)))
+            row = cur.fetchone()
+            if row is None:
+                cur.execute("SELECT id FROM ingestion_jobs WHERE file_hash = %s", (file_hash,))
+                row = cur.fetchone()
+        return row[0]
+
+    def claim_job(self, worker: str, stale_after: int = 1800):
+        """Take the oldest queued job (or one whose worker stopped reporting) without
+        blocking other workers: FOR UPDATE SKIP LOCKED."""
+        with self.cursor(cursor_factory=RealDictCursor) as cur:
+            cur.execute("""
+                UPDATE ingestion_jobs SET
+                    status = 'running',
+                    attempts = attempts + 1,
+                    worker = %s,
+                    updated_at = now()
+                WHERE id = (
+                    SELECT id FROM ingestion_jobs
+                    WHERE status = 'queued'
+                       OR (status = 'running' AND updated_at < now() - make_interval(secs => %s))
+                    ORDER BY id
+                    FOR UPDATE SKIP LOCKED
+                    LIMIT 1
+                )
+                RETURNING id, file_hash, file_name, content, attempts
+            """, (worker, stale_after))
+            job = cur.fetchone()
+        if job is not None and job["content"] is not None:
+            job["content"] = bytes(job["content"])
+        return job
+
+    def update_job_progress(self, job_id: int, pages_done: int, pages_total: int):
+        """Report progress; also acts as the job's heartbeat."""
+        with self.cursor() as cur:
+            cur.execute("""
+                UPDATE ingestion_jobs SET pages_done = %s, pages_total = %s, updated_at = now()
+                WHERE id = %s
+            """, (pages_done, pages_total, job_id))
+
+    def finish_job(self, job_id: int, status: str, result: str = None, error: str = None):
+        """Close a job; the PDF bytes are dropped once it is done."""
+        with self.cursor() as cur:
+            cur.execute("""
+                UPDATE ingestion_jobs SET
+                    status = %s,
+                    result = %s,
+                    error = %s,
+                    content = CASE WHEN %s = 'done' THEN NULL ELSE content END,
+                    pages_done = CASE WHEN %s = 'done' THEN COALESCE(pages_total, pages_done) ELSE pages_done END,
+                    updated_at = now()
+                WHERE id = %s
+            """, (status, result, error, status, status, job_id))
+
+    def get_jobs(self, file_hashes: List[str]) -> List[Dict[str, Any]]:
+        """Status and progress of the jobs for the given files."""
+        if not file_hashes:
+            return []
+        with self.cursor(cursor_factory=RealDictCursor) as cur:
+            cur.execute("""
+                SELECT id, file_hash, file_name, status, pages_done, pages_total, result, error, attempts
+                FROM ingestion_jobs
+                WHERE file_hash = ANY(%s)
+                ORDER BY id
+            """, (list(file_hashes),))
+            return cur.fetchall()
+
+    def _refresh_worker_costs(self, cur, worker_years=None, years=None):
+        """Recompute worker_costs for the affected (worker_id, year) pairs and years.
+
+        Without arguments the whole table is rebuilt. Every company of an affected
+        worker/year is refreshed; each one gets the RNT bases of its own company_id.
+        With nothing affected (no rows were written) data_versions is left alone, so
+        cached reads stay valid.
+        """
+        if (worker_years is not None or years is not None) and not worker_years and not years:
+            return
+        with metrics.timer("db_refresh_costs"):
+            self._recompute_worker_costs(cur, worker_years, years)
+            # Visible junto con los datos al confirmar: invalida las lecturas cacheadas de todos los procesos
+            cur.execute("UPDATE data_versions SET version = version + 1 WHERE name = 'worker_costs'")
+
+    def _recompute_worker_costs(self, cur, worker_years=None, years=None):
+        # Dos ingestas del mismo año se recalculan una detrás de otra: la segunda espera a que
+        # la primera confirme y calcula ya con sus filas (READ COMMITTED: instantánea por sentencia).
+        # Cerrojos en orden de año para no bloquearse mutuamente
+        if worker_years is None and years is None:
+            cur.execute("SELECT pg_advisory_xact_lock(%s, year) FROM (SELECT DISTINCT year FROM workers ORDER BY year) y",
+                        (WORKER_COSTS_LOCK_ID,))
+            cur.execute("DELETE FROM worker_costs")
+            cur.execute(f"INSERT INTO worker_costs ({_WORKER_COSTS_COLUMNS}) "
+                        + _WORKER_COSTS_SELECT.format(contingencias_filter="true", workers_filter="true")
+                        + _WORKER_COSTS_UPSERT)
+            return
+
+        pairs = sorted({(worker_id, year) for worker_id, year in (worker_years or [])}, key=str)
+        params = {
+            "worker_ids": [worker_id for worker_id, _ in pairs],
+            "worker_years": [year for _, year in pairs],
+            "years": sorted(set(years or [])),
+        }
+        if not pairs and not params["years"]:
+            return
+
+        for year in sorted({int(year) for _, year in pairs} | {int(year) for year in params["years"]}):
+            cur.execute("SELECT pg_advisory_xact_lock(%s, %s)", (WORKER_COSTS_LOCK_ID, year))
+        cur.execute(f"DELETE FROM worker_costs WHERE {_worker_costs_filter('worker_costs')}", params)
+        # Por si otra transacción insertó las mismas claves fuera del cerrojo (p. ej. un año nuevo
+        # durante un recálculo completo): actualizar en lugar de fallar por unique_violation
+        cur.execute(f"INSERT INTO worker_costs ({_WORKER_COSTS_COLUMNS}) " + _WORKER_COSTS_SELECT.format(
+            contingencias_filter=_worker_costs_filter("contingencias_comunes"),
+            workers_filter=_worker_costs_filter("workers"),
+        ) + _WORKER_COSTS_UPSERT, params)
+
+    def refresh_worker_costs(self):
+        """Full rebuild of worker_costs, e.g. after editing cargas_sociales."""
+        with self.cursor() as cur:
+            self._refresh_worker_costs(cur)
+
+    def data_version(self) -> int:
+        """Counter bumped by every change to worker_costs (in any process)."""
+        with self.cursor() as cur:
+            cur.execute("SELECT version FROM data_versions WHERE name = 'worker_costs'")
+            row = cur.fetchone()
+            return row[0] if row else 0
+
+    def _cached(self, key: Tuple, loader: Callable[[], Any]) -> Any:
+        """Result of `loader` cached per key until worker_costs changes (LRU, process-wide)."""
+        version = self.data_version()
+        cache_key = (self.connection_string,) + key
+        with _query_cache_lock:
+            hit = _query_cache.get(cache_key)
+            if hit is not None and hit[0] == version:
+                _query_cache.move_to_end(cache_key)
+                metrics.count("cache_hits", 1, "db_query")
+                return hit[1]
+        metrics.count("cache_misses", 1, "db_query")
+        # Leída la versión antes que los datos: en el peor caso se guardan datos más nuevos que su versión
+        value = loader()
+        with _query_cache_lock:
+            _query_cache[cache_key] = (version, value)
+            _query_cache.move_to_end(cache_key)
+            while len(_query_cache) > QUERY_CACHE_SIZE:
+                _query_cache.popitem(last=False)
+        return value
+
+    @staticmethod
+    def _workers_filter(company_id: str = None, year: int = None, name_prefix: str = None) -> Tuple[str, List[Any]]:
+        conditions, params = [], []
+        if company_id:
+            conditions.append("company_id = %s")
+            params.append(company_id)
+        if year:
+            conditions.append("year = %s")
+            params.append(int(year))
+        if name_prefix and name_prefix.strip():
+            prefix = name_prefix.strip().lower().replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+            conditions.append("lower(worker_name) LIKE %s")
+            params.append(prefix + "%")
+        return " AND ".join(conditions) or "true", params
+
+    def get_workers_page(self, company_id: str = None, year: int = None, name_prefix: str = None,
+                         after: Optional[Tuple[str, int, str]] = None, limit: int = 50) -> Dict[str, Any]:
+        """One page of worker_costs ordered by (company_id, year, worker_id), with filters.
+
+        Keyset pagination: pass the previous page's "next" as `after`. Returns
+        {"rows": [...], "next": key of the last row or None when there are no more}.
+        """
+        def load():
+            where, params = self._workers_filter(company_id, year, name_prefix)
+            if after is not None:
+                where += " AND (company_id, year, worker_id) > (%s, %s, %s)"
+                params.extend(after)
+            with self.cursor(cursor_factory=RealDictCursor) as cur:
+                cur.execute(f"""
+                    SELECT {_WORKER_COSTS_COLUMNS}
+                    FROM worker_costs
+                    WHERE {where}
+                    ORDER BY company_id, year, worker_id
+                    LIMIT %s
+                """, params + [limit + 1])
+                rows = cur.fetchall()
+            has_more = len(rows) > limit
+            rows = rows[:limit]
+            last = rows[-1] if rows else None
+            return {
+                "rows": rows,
+                "next": (last["company_id"], last["year"], last["worker_id"]) if has_more else None,
+            }
+
+        return self._cached(("workers_page", company_id, year, name_prefix, tuple(after or ()), limit), load)
+
+    def count_workers(self, company_id: str = None, year: int = None, name_prefix: str = None) -> int:
+        def load():
+            where, params = self._workers_filter(company_id, year, name_prefix)
+            with self.cursor() as cur:
+                cur.execute(f"SELECT count(*) FROM worker_costs WHERE {where}", params)
+                return cur.fetchone()[0]
+
+        return self._cached(("count_workers", company_id, year, name_prefix), load)
+
+    def get_worker_filters(self) -> Dict[str, Any]:
+        """Companies ({company_id: company_name}) and years present in worker_costs, for the filters."""
+        def load():
+            with self.cursor() as cur:
+                cur.execute("SELECT DISTINCT ON (company_id) company_id, company_name FROM worker_costs ORDER BY company_id")
+                companies = dict(cur.fetchall())
+                cur.execute("SELECT DISTINCT year FROM worker_costs ORDER BY year DESC")
+                years = [row[0] for row in cur.fetchall()]
+            return {"companies": companies, "years": years}
+
+        return self._cached(("worker_filters",), load)
+
+    def stream_rows(self, query: str, params=None, chunk_size: int = 5000) -> Iterator[Tuple[List[str], List[tuple]]]:
+        """Run `query` on a named (server-side) cursor and yield (columns, rows) chunks.
+
+        Only `chunk_size` rows are in memory at a time, however large the result. The pooled
+        connection is held until the generator is exhausted or closed.
+        """
+        with self.pool.connection() as conn:
+            cur = conn.cursor(name=f"stream_{uuid.uuid4().hex}")
+            cur.itersize = chunk_size
+            try:
+                cur.execute(query, params)
+                while True:
+                    rows = cur.fetchmany(chunk_size)
+                    if not rows:
+                        break
+                    yield [column[0] for column in cur.description], rows
+            finally:
+                cur.close()
 
     def get_workers_data(self):
+        """Cost per hour of every worker and year, read from the materialized worker_costs table."""
+        def load():
+            with self.cursor(cursor_factory=RealDictCursor) as cur:
+                cur.execute(f"""
+                    SELECT {_WORKER_COSTS_COLUMNS}
+                    FROM worker_costs
+                    ORDER BY company_id, year, worker_id
+                """)
+                return cur.fetchall()
 
-        conn = self.connect()
-        cur = conn.cursor(cursor_factory=RealDictCursor)
-# (Salario bruto + (costes seguridad social RNT * 12 meses) * 31,4%) / horas convenio
+        return self._cached(("workers_data",), load)
 
-        cur.execute("""
-                    
-        with porcentaje_cte as (
-            select sum(porcentaje) as porcentaje from cargas_sociales
-        ),
-        contingencias_comunes_cte as (
-            select worker_id, year, sum(base_contingencias_comunes) as base_contingencias_comunes
-            from contingencias_comunes
-            group by worker_id, year
-        )
-                    
-        SELECT 
-            workers.worker_id, 
-            workers.year, 
-            workers.worker_name,
-            workers.company_id,
-            workers.company_name,
-            sum(percepcion_integra) as percepcion_integra,
-            max(base_contingencias_comunes) as base_contingencias_comunes,
-            max(porcentaje)/100 as porcentaje,
-            max(horas_convenio_anuales) as horas_convenio_anuales,
-            (sum(percepcion_integra) + ((max(base_contingencias_comunes)/12 )*(max(porcentaje)/100))) / max(horas_convenio_anuales)  as coste_hora
-        FROM workers
-        left join porcentaje_cte on true
-        left join convenio on workers.year = convenio.year
-        left join contingencias_comunes_cte 
-            on workers.worker_id = contingencias_comunes_cte.worker_id
-            and workers.year = contingencias_comunes_cte.year
-        GROUP BY workers.worker_id, workers.year, workers.worker_name, workers.company_id, workers.company_name
-        """)
-        workers = cur.fetchall()
-        cur.close()
-        conn.close()
+    def get_planning(self, file_hash: str) -> Optional[Dict[str, Any]]:
+        """Structured planning of a document already extracted, or None."""
+        with self.cursor() as cur:
+            cur.execute("SELECT planning FROM planning_documents WHERE file_hash = %s", (file_hash,))
+            row = cur.fetchone()
+            return row[0] if row else None
+
+    def save_planning(self, file_hash: str, file_name: str, planning: Dict[str, Any]):
+        with self.cursor() as cur:
+            cur.execute("""
+                INSERT INTO planning_documents (file_hash, file_name, planning)
+                VALUES (%s, %s, %s)
+                ON CONFLICT (file_hash) DO UPDATE SET planning = EXCLUDED.planning, file_name = EXCLUDED.file_name
+            """, (file_hash, file_name, Json(planning)))
 
-        return workers
+    def get_cargas_sociales(self) -> Dict[str, float]:
+        """Social security percentages by concept, e.g. {"ÍT": 1.5}."""
+        with self.cursor() as cur:
+            cur.execute("SELECT concepto, porcentaje FROM cargas_sociales ORDER BY id")
+            return {concepto: float(porcentaje) for concepto, porcentaje in cur.fetchall()}
 
     def get_all_workers(self):
         """Get list of all workers."""
-        conn = self.connect()
-        cur = conn.cursor(cursor_factory=RealDictCursor)
-        
         workers_data = self.get_workers_data()
-
-        cur.close()
-        conn.close()
         
         return {
             "coste_hora": workers_data, 
@@ -0,0 +1,40 @@
+# export_data.py
+"""Exportación de tablas a CSV, Parquet o XLSX desde la línea de comandos.
+
+Uso: python app/export_data.py {worker_costs,contingencias_comunes} --format parquet
+     [--output RUTA] [--company CIF] [--year AÑO] [--chunk-size N]
+
+Las filas se leen con un cursor de servidor y se escriben por bloques, así que la
+memoria no crece con el tamaño de la tabla.
+"""
+import argparse
+import os
+import time
+
+from database import Database
+from exporter import EXPORT_FORMATS, EXPORTS, export_filename, export_table
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Exportar tablas de la base de datos")
+    parser.add_argument("table", choices=list(EXPORTS), help="Tabla a exportar")
+    parser.add_argument("--format", choices=EXPORT_FORMATS, default="csv", help="Formato de salida")
+    parser.add_argument("--output", help="Fichero de salida (por defecto TABLA[_EMPRESA][_AÑO].FORMATO)")
+    parser.add_argument("--company", help="Solo esta empresa (company_id)")
+    parser.add_argument("--year", type=int, help="Solo este año")
+    parser.add_argument("--chunk-size", type=int, default=5000, help="Filas leídas por bloque")
+    args = parser.parse_args()
+
+    output = args.output or export_filename(args.table, args.format, args.company, args.year)
+    db = Database()
+    start = time.perf_counter()
+    with open(output, "wb") as f:
+        rows = export_table(db, args.table, args.format, f, company_id=args.company, year=args.year,
+                            chunk_size=args.chunk_size,
+                            progress=lambda written: print(f"\r{written} filas", end="", flush=True))
+    elapsed = time.perf_counter() - start
+    print(f"\r{rows} filas exportadas a {output} ({os.path.getsize(output) / 1e6:.1f} MB) en {elapsed:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
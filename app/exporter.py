@@ -0,0 +1,162 @@
+# exporter.py
+"""Exportación de las tablas de costes y del histórico de RNT a CSV, Parquet o XLSX.
+
+Las filas llegan de la base de datos por bloques (cursor de servidor) y se escriben a
+medida que llegan, con memoria acotada sea cual sea el tamaño de la tabla.
+"""
+import csv
+import decimal
+import io
+from typing import Any, BinaryIO, Callable, List, Optional, Tuple
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pyarrow es opcional: solo hace falta para Parquet
+    pa = pq = None
+
+try:
+    from openpyxl import Workbook
+except ImportError:  # openpyxl es opcional: solo hace falta para XLSX
+    Workbook = None
+
+EXPORT_FORMATS = ("csv", "parquet", "xlsx")
+# Límite de filas de una hoja de Excel (incluida la cabecera)
+XLSX_MAX_ROWS = 1_048_576
+
+# Tablas exportables: columnas (nombre, tipo) y consulta; {where} recibe los filtros
+EXPORTS = {
+    "worker_costs": {
+        "columns": [
+            ("worker_id", "string"), ("worker_name", "string"), ("company_id", "string"),
+            ("company_name", "string"), ("year", "int"), ("percepcion_integra", "float"),
+            ("base_contingencias_comunes", "float"), ("porcentaje", "float"),
+            ("horas_convenio_anuales", "float"), ("coste_hora", "float"),
+        ],
+        "query": "SELECT {columns} FROM worker_costs WHERE {where} ORDER BY company_id, year, worker_id",
+    },
+    "contingencias_comunes": {
+        "columns": [
+            ("worker_id", "string"), ("company_id", "string"), ("company_name", "string"), ("year", "int"),
+            ("periodo", "string"), ("base_contingencias_comunes", "float"), ("dias_cotizados", "int"),
+        ],
+        "query": "SELECT {columns} FROM contingencias_comunes WHERE {where} ORDER BY company_id, year, worker_id, periodo",
+    },
+}
+
+
+def export_query(table: str, company_id: str = None, year: int = None) -> Tuple[str, List[Any]]:
+    """SQL and parameters of an export, optionally filtered by company and year."""
+    if table not in EXPORTS:
+        raise ValueError(f"Tabla no exportable: {table}. Opciones: {', '.join(EXPORTS)}")
+    conditions, params = [], []
+    if company_id:
+        conditions.append("company_id = %s")
+        params.append(company_id)
+    if year:
+        conditions.append("year = %s")
+        params.append(int(year))
+    spec = EXPORTS[table]
+    query = spec["query"].format(
+        columns=", ".join(name for name, _ in spec["columns"]),
+        where=" AND ".join(conditions) or "true",
+    )
+    return query, params
+
+
+def _plain(value):
+    return float(value) if isinstance(value, decimal.Decimal) else value
+
+
+class _CsvWriter:
+    def __init__(self, output: BinaryIO, columns: List[Tuple[str, str]], table: str):
+        # utf-8 con BOM: Excel abre bien los acentos
+        self._text = io.TextIOWrapper(output, encoding="utf-8-sig", newline="")
+        self._writer = csv.writer(self._text)
+        self._writer.writerow([name for name, _ in columns])
+
+    def write(self, rows):
+        self._writer.writerows(rows)
+
+    def close(self):
+        self._text.flush()
+        # Sin cerrar el fichero de salida, que pertenece a quien llama
+        self._text.detach()
+
+
+class _ParquetWriter:
+    TYPES = {"string": "string", "int": "int64", "float": "float64"}
+
+    def __init__(self, output: BinaryIO, columns: List[Tuple[str, str]], table: str):
+        if pq is None:
+            raise RuntimeError("La exportación a Parquet necesita pyarrow (pip install pyarrow).")
+        self._names = [name for name, _ in columns]
+        self._schema = pa.schema([(name, getattr(pa, self.TYPES[kind])()) for name, kind in columns])
+        self._writer = pq.ParquetWriter(output, self._schema)
+
+    def write(self, rows):
+        # Un grupo de filas por bloque
+        data = {name: [_plain(row[index]) for row in rows] for index, name in enumerate(self._names)}
+        self._writer.write_table(pa.Table.from_pydict(data, schema=self._schema))
+
+    def close(self):
+        self._writer.close()
+
+
+class _XlsxWriter:
+    def __init__(self, output: BinaryIO, columns: List[Tuple[str, str]], table: str):
+        if Workbook is None:
+            raise RuntimeError("La exportación a XLSX necesita openpyxl (pip install openpyxl).")
+        self._output = output
+        self._header = [name for name, _ in columns]
+        self._table = table
+        # Modo de solo escritura: las filas se vuelcan a disco en vez de quedarse en memoria
+        self._workbook = Workbook(write_only=True)
+        self._sheets = 0
+        self._new_sheet()
+
+    def _new_sheet(self):
+        self._sheets += 1
+        self._sheet = self._workbook.create_sheet(self._table if self._sheets == 1 else f"{self._table}_{self._sheets}")
+        self._sheet.append(self._header)
+        self._rows = 1
+
+    def write(self, rows):
+        for row in rows:
+            if self._rows >= XLSX_MAX_ROWS:
+                self._new_sheet()
+            self._sheet.append([_plain(value) for value in row])
+            self._rows += 1
+
+    def close(self):
+        self._workbook.save(self._output)
+
+
+WRITERS = {"csv": _CsvWriter, "parquet": _ParquetWriter, "xlsx": _XlsxWriter}
+
+
+def export_table(db, table: str, fmt: str, output: BinaryIO, company_id: str = None, year: int = None,
+                 chunk_size: int = 5000, progress: Optional[Callable[[int], None]] = None) -> int:
+    """Stream `table` into `output` (a binary file) as `fmt`; returns the number of rows written.
+
+    `progress(rows_written)` is called after every chunk.
+    """
+    if fmt not in WRITERS:
+        raise ValueError(f"Formato no soportado: {fmt}. Opciones: {', '.join(EXPORT_FORMATS)}")
+    query, params = export_query(table, company_id, year)
+    writer = WRITERS[fmt](output, EXPORTS[table]["columns"], table)
+    written = 0
+    try:
+        for _, rows in db.stream_rows(query, params, chunk_size=chunk_size):
+            writer.write(rows)
+            written += len(rows)
+            if progress is not None:
+                progress(written)
+    finally:
+        writer.close()
+    return written
+
+
+def export_filename(table: str, fmt: str, company_id: str = None, year: int = None) -> str:
+    parts = [table] + [str(part) for part in (company_id, year) if part]
+    return f"{'_'.join(parts)}.{fmt}"
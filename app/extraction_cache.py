@@ -0,0 +1,132 @@
+# extraction_cache.py
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional
+
+# Los accesos de las lecturas se guardan por lotes: cada escritura serializa a los lectores
+TOUCH_BATCH = 64
+TOUCH_INTERVAL = 30.0
+
+
+class ExtractionCache:
+    """Persistent, content-addressed cache of LLM extraction results (SQLite + size-based LRU)."""
+
+    def __init__(self, path: str, max_bytes: int = 256 * 1024 * 1024):
+        self.path = path
+        self.max_bytes = max_bytes
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        # La caché se usa desde el pool de extracción concurrente
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS extraction_cache (
+                key TEXT PRIMARY KEY,
+                doc_type TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_extraction_cache_last_access ON extraction_cache (last_access)")
+        self._conn.commit()
+
+        # Último acceso de las entradas leídas aún no guardado
+        self._touched: Dict[str, float] = {}
+        self._touched_since = time.monotonic()
+        self._stats = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0}
+
+    @staticmethod
+    def normalize_text(text: str) -> str:
+        """Collapse whitespace so layout-only differences between parses hit the same entry."""
+        return re.sub(r"\s+", " ", text or "").strip()
+
+    @classmethod
+    def make_key(cls, text: str, doc_type: str, prompt_version: str, model: str) -> str:
+        digest = hashlib.sha256()
+        for part in (cls.normalize_text(text), doc_type or "", prompt_version, model):
+            digest.update(part.encode("utf-8"))
+            digest.update(b"\x00")
+        return digest.hexdigest()
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            row = self._conn.execute("SELECT payload FROM extraction_cache WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self._stats["misses"] += 1
+                return None
+            self._touched[key] = time.time()
+            if len(self._touched) >= TOUCH_BATCH or time.monotonic() - self._touched_since >= TOUCH_INTERVAL:
+                self._flush_touched()
+                self._conn.commit()
+            self._stats["hits"] += 1
+        return json.loads(row[0])
+
+    def _flush_touched(self):
+        if self._touched:
+            self._conn.executemany("UPDATE extraction_cache SET last_access = ? WHERE key = ?",
+                                   [(last_access, key) for key, last_access in self._touched.items()])
+            self._touched.clear()
+        self._touched_since = time.monotonic()
+
+    def _size_bytes(self) -> int:
+        """Bytes in use by the database file, shared by every process using it."""
+        page_count = self._conn.execute("PRAGMA page_count").fetchone()[0]
+        free_pages = self._conn.execute("PRAGMA freelist_count").fetchone()[0]
+        page_size = self._conn.execute("PRAGMA page_size").fetchone()[0]
+        return (page_count - free_pages) * page_size
+
+    def set(self, key: str, doc_type: str, value: Any):
+        payload = json.dumps(value, ensure_ascii=False)
+        size = len(payload.encode("utf-8"))
+        now = time.time()
+        with self._lock:
+            self._conn.execute("""
+                INSERT OR REPLACE INTO extraction_cache (key, doc_type, payload, size, created_at, last_access)
+                VALUES (?, ?, ?, ?, ?, ?)
+            """, (key, doc_type or "", payload, size, now, now))
+            self._stats["stores"] += 1
+            # Antes de desalojar: el orden LRU debe incluir las lecturas recientes
+            self._flush_touched()
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        """Drop least recently used entries until the database fits in max_bytes.
+
+        The size is read from the database itself, so the cap holds across the processes
+        sharing the file; the insert's write lock keeps others out meanwhile.
+        """
+        while self._size_bytes() > self.max_bytes:
+            keys = self._conn.execute(
+                "SELECT key FROM extraction_cache ORDER BY last_access LIMIT 100"
+            ).fetchall()
+            if not keys:
+                break
+            self._conn.executemany("DELETE FROM extraction_cache WHERE key = ?", keys)
+            self._stats["evictions"] += len(keys)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["entries"] = self._conn.execute("SELECT COUNT(*) FROM extraction_cache").fetchone()[0]
+            stats["bytes"] = self._size_bytes()
+        stats["max_bytes"] = self.max_bytes
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        return stats
+
+    def clear(self):
+        with self._lock:
+            self._touched.clear()
+            self._conn.execute("DELETE FROM extraction_cache")
+            self._conn.commit()
@@ -0,0 +1,216 @@
+# ingestion.py
+import time
+from typing import Callable, Dict, Any, List, Optional
+
+from metrics import metrics
+
+# Tipos cuyas filas se guardan; el resto de páginas (p. ej. IDC) se descartan sin llamar al LLM
+STORED_DOC_TYPES = ("modelo_190", "10t", "rnt", "convenio")
+
+
+def parse_file(path: str) -> Dict[str, Any]:
+    """Read and parse a PDF from disk; top-level so it can run in a process pool."""
+    from pdf_preprocessor import PDFProcessor
+
+    pdf_preprocessor = PDFProcessor()
+    start = time.perf_counter()
+    with open(path, "rb") as f:
+        content = f.read()
+    full_text, pages, words = pdf_preprocessor.parse_pdf_layout(content)
+    return {
+        "path": path,
+        # Medido en el proceso hijo: el padre lo añade a sus métricas
+        "parse_seconds": time.perf_counter() - start,
+        "file_hash": pdf_preprocessor.content_hash(content),
+        "full_text": full_text,
+        "pages": pages,
+        "words": words,
+    }
+
+
+def ingest_file(file_name: str, content: Optional[bytes], pdf_preprocessor, llm_classifier, db,
+                progress: Optional[Callable[[int, int], None]] = None,
+                parsed: Optional[Dict[str, Any]] = None) -> List[str]:
+    """Parse, classify, extract and store one PDF; returns the processing messages.
+
+    `progress(pages_done, pages_total)` is called as pages finish, so callers (the chat
+    page or a background worker) can report it. `parsed` (see parse_file) skips the
+    parsing step when it already happened elsewhere, e.g. in a process pool.
+    """
+    with metrics.timer("ingest_document", document=file_name):
+        return _ingest_file(file_name, content, pdf_preprocessor, llm_classifier, db, progress, parsed)
+
+
+def _ingest_file(file_name, content, pdf_preprocessor, llm_classifier, db, progress, parsed) -> List[str]:
+    file_hash = parsed["file_hash"] if parsed else pdf_preprocessor.content_hash(content)
+    # Streamlit re-ejecuta el script en cada interacción: no repetir lo ya ingerido
+    if db.get_document_status(file_hash) == "done":
+        return [f"{file_name} ya procesado anteriormente"]
+
+    if parsed:
+        full_text, pages, page_words = parsed["full_text"], parsed["pages"], parsed["words"]
+    else:
+        # Un único parseo en memoria: sin fichero temporal ni doble apertura del PDF
+        full_text, pages, page_words = pdf_preprocessor.parse_pdf_layout(content)
+    try:
+        doc_type = llm_classifier.classify_document_type(full_text)
+    except Exception as e:
+        return [f"No se pudo clasificar el archivo {file_name}: {e}"]
+
+    # Tipo por página (PDFs mixtos); las páginas sin datos se descartan antes del LLM
+    page_info = llm_classifier.classify_pages(pages, default_type=doc_type)
+    if doc_type == "desconocido":
+        # Ni 'done' ni páginas 'skipped': se vuelve a clasificar en la próxima subida, por si
+        # el clasificador ya reconoce el tipo (clasificar es local, no llama al LLM)
+        page_hashes = [pdf_preprocessor.content_hash(page_text) for page_text in pages]
+        document = {"file_hash": file_hash, "file_name": file_name, "doc_type": doc_type,
+                    "page_count": len(pages), "status": "unsupported"}
+        db.ingest_document(document=document, pages=[
+            {"page_num": page_num, "page_hash": page_hash, "status": "unsupported", "error": "tipo desconocido"}
+            for page_num, page_hash in enumerate(page_hashes)
+        ])
+        return [f"{file_name}: tipo de documento no reconocido, no se ha guardado nada"]
+
+    # Solo las páginas de este documento que aún no están en la base de datos llegan al LLM
+    page_hashes = [pdf_preprocessor.content_hash(page_text) for page_text in pages]
+    done_pages = db.get_done_pages(file_hash)
+    page_records = []
+    pending = []
+    for page_num, page_hash in enumerate(page_hashes):
+        if page_num in done_pages:
+            continue
+        if page_info[page_num]["skipped"]:
+            page_records.append({"page_num": page_num, "page_hash": page_hash, "status": "skipped",
+                                 "error": page_info[page_num]["reason"]})
+        elif page_info[page_num]["doc_type"] not in STORED_DOC_TYPES:
+            page_records.append({"page_num": page_num, "page_hash": page_hash, "status": "skipped",
+                                 "error": f"tipo {page_info[page_num]['doc_type']} sin datos que guardar"})
+        else:
+            pending.append(page_num)
+    # Las horas de un convenio necesitan el año, que puede estar en otra página ya hecha:
+    # si queda alguna página de convenio pendiente se vuelven a leer todas las del convenio
+    if any(page_info[page_num]["doc_type"] == "convenio" for page_num in pending):
+        pending = sorted(set(pending) | {
+            page_num for page_num in done_pages
+            if page_num < len(pages) and page_info[page_num]["doc_type"] == "convenio" and not page_info[page_num]["skipped"]
+        })
+    convenio_pages = [page_num for page_num in pending if page_info[page_num]["doc_type"] == "convenio"]
+
+    # Progreso: las páginas ya ingeridas o descartadas cuentan como hechas desde el principio
+    pages_ready = len(pages) - len(pending)
+    if progress is not None:
+        progress(pages_ready, len(pages))
+
+    # Filas del documento completo; se insertan juntas en una sola transacción
+    workers, contingencias, convenios = [], [], []
+    processed_pages = []
+    # Convenio: año y horas por página; se emparejan al final, cuando se han leído todas
+    convenio_years, convenio_hours = {}, {}
+    # Extracción concurrente; los resultados llegan ordenados por página
+    pending_types = [page_info[page_num]["doc_type"] for page_num in pending]
+    # Al LLM solo le llegan las regiones relevantes de cada página, sin la plantilla repetida
+    pending_texts = pdf_preprocessor.window_pages(
+        [pages[page_num] for page_num in pending], pending_types, all_pages=pages, page_numbers=pending,
+    )
+    results = llm_classifier.extract_pages(
+        pending_texts,
+        pending_types,
+        words=[page_words[page_num] for page_num in pending],
+        progress=(lambda completed: progress(pages_ready + completed, len(pages))) if progress is not None else None,
+        document=file_name,
+        page_numbers=pending,
+    )
+    for page_num, result in zip(pending, results):
+        page_type = page_info[page_num]["doc_type"]
+        structured_data = result["data"]
+        try:
+            if result["error"] is not None:
+                raise result["error"]
+            if page_type != "rnt":
+                worker_id = pdf_preprocessor.generar_id(structured_data.get("worker_name", ""))
+            # Acumular según el tipo
+            if page_type in ("modelo_190", "10t"):
+                workers.append({
+                    "worker_id": worker_id,
+                    "worker_name": structured_data["worker_name"],
+                    "percepcion_integra": structured_data["percepcion_integra"],
+                    "year": structured_data['year'],
+                    "company_id": structured_data['company_id'],
+                    "company_name": structured_data['company_name'],
+                })
+
+            elif page_type == "rnt":
+                for entry in structured_data:
+                    contingencias.append({
+                        "worker_id": entry["worker_id"],
+                        "base_contingencias_comunes": entry["base_contingencias_comunes"],
+                        "dias_cotizados": entry["dias_cotizados"],
+                        "periodo": entry["periodo"],
+                        "year": entry['year'],
+                        "company_id": entry["company_id"],
+                        "company_name": entry["company_name"],
+                    })
+            elif page_type == "convenio":
+                if structured_data.get("year") is not None:
+                    convenio_years[page_num] = structured_data["year"]
+                if structured_data.get("horas_convenio_anuales") is not None:
+                    convenio_hours[page_num] = structured_data["horas_convenio_anuales"]
+
+            processed_pages.append(f"{file_name} página {page_num+1}")
+            page_records.append({"page_num": page_num, "page_hash": page_hashes[page_num], "status": "done"})
+        except Exception as e:
+            # st.warning(f"Error en {file_name} página {page_num+1}: {e} - {structured_data}")
+            page_records.append({"page_num": page_num, "page_hash": page_hashes[page_num], "status": "error", "error": str(e)})
+            continue
+
+    # Cada página con horas toma el año de la página anterior más cercana que lo tenga
+    # (o, si no hay, el primero del documento). Sin año: si alguna página del convenio falló,
+    # error y se reintenta; si se leyeron todas, el documento no lo trae y reintentar no sirve
+    convenio_failed = any(record["status"] == "error" for record in page_records if record["page_num"] in convenio_pages)
+    for page_num, hours in sorted(convenio_hours.items()):
+        previous = [year_page for year_page in convenio_years if year_page <= page_num]
+        year_page = max(previous) if previous else min(convenio_years, default=None)
+        if year_page is not None:
+            convenios.append({"horas_convenio_anuales": hours, "year": convenio_years[year_page]})
+            continue
+        for record in page_records:
+            if record["page_num"] == page_num:
+                record.update(status="error" if convenio_failed else "skipped",
+                              error="No se encontró el año de vigencia del convenio")
+        processed_pages.remove(f"{file_name} página {page_num+1}")
+
+    all_done = all(record["status"] in ("done", "skipped") for record in page_records)
+    document = {
+        "file_hash": file_hash,
+        "file_name": file_name,
+        "doc_type": doc_type,
+        "page_count": len(pages),
+        "status": "done" if all_done else "partial",
+    }
+    try:
+        db.ingest_document(workers=workers, contingencias_comunes=contingencias, convenios=convenios,
+                           document=document, pages=page_records)
+    except Exception as e:
+        return [f"No se pudieron guardar los datos de {file_name}: {e}"]
+
+    metrics.event(
+        "document",
+        document=file_name,
+        doc_type=doc_type,
+        status=document["status"],
+        pages=len(pages),
+        pages_extracted=len(pending),
+        pages_skipped=sum(record["status"] == "skipped" for record in page_records),
+        pages_failed=sum(record["status"] == "error" for record in page_records),
+        rows=len(workers) + len(contingencias) + len(convenios),
+    )
+    return processed_pages
+
+
+def local_share_message(stats_before: Dict[str, Any], stats_after: Dict[str, Any]) -> Optional[str]:
+    """Share of pages resolved without the LLM between two extraction_stats() snapshots."""
+    local_pages = stats_after["local"] - stats_before["local"]
+    total_pages = local_pages + stats_after["llm"] - stats_before["llm"]
+    if not total_pages:
+        return None
+    return f"Páginas resueltas sin LLM: {local_pages}/{total_pages} ({local_pages / total_pages:.0%})"
@@ -0,0 +1,104 @@
+# ingestion_worker.py
+"""Procesa en segundo plano los PDFs encolados desde la página de chat.
+
+Uso: python app/ingestion_worker.py [--processes N] [--poll-interval S] [--once]
+Varios procesos (o contenedores) pueden vaciar la cola a la vez: cada trabajo se
+reserva con FOR UPDATE SKIP LOCKED.
+"""
+import argparse
+import multiprocessing
+import os
+import socket
+import time
+
+from database import Database, close_pools
+from ingestion import ingest_file, local_share_message
+from llm_classifier import LLMClassifier
+from metrics import metrics, start_http_server
+from pdf_preprocessor import PDFProcessor
+
+
+def run_job(job, pdf_processor, llm_classifier, db):
+    """Ingest one claimed job and record its outcome."""
+    stats_before = llm_classifier.extraction_stats()
+
+    def progress(pages_done, pages_total):
+        db.update_job_progress(job["id"], pages_done, pages_total)
+
+    try:
+        messages = ingest_file(job["file_name"], job["content"], pdf_processor, llm_classifier, db, progress=progress)
+    except Exception as e:
+        db.finish_job(job["id"], "error", error=str(e))
+        return
+
+    message = local_share_message(stats_before, llm_classifier.extraction_stats())
+    if message:
+        messages.append(message)
+    # ingest_file informa de los fallos (clasificación, guardado, páginas con error) en los
+    # mensajes: solo un documento registrado como 'done' cierra el trabajo y libera el PDF
+    status = db.get_document_status(job["file_hash"])
+    if status != "done":
+        db.finish_job(job["id"], "error", result="\n".join(messages),
+                      error=f"Documento {status or 'sin guardar'}: " + " | ".join(messages[:3]))
+        return
+    db.finish_job(job["id"], "done", result="\n".join(messages))
+
+
+def work(poll_interval: float, stale_after: int, once: bool, metrics_port: int = None):
+    """Worker loop: claim, process, repeat; sleeps while the queue is empty."""
+    db = Database()
+    pdf_processor = PDFProcessor()
+    llm_classifier = LLMClassifier(api_key=os.getenv('OPENAI_API_KEY'))
+    if metrics_port:
+        start_http_server(metrics_port)
+    worker_name = f"{socket.gethostname()}:{os.getpid()}"
+
+    while True:
+        job = db.claim_job(worker_name, stale_after=stale_after)
+        if job is None:
+            if once:
+                return
+            time.sleep(poll_interval)
+            continue
+        print(f"[{worker_name}] Procesando {job['file_name']} (trabajo {job['id']})", flush=True)
+        run_job(job, pdf_processor, llm_classifier, db)
+        if os.getenv("METRICS_FILE"):
+            # Un fichero por proceso worker
+            metrics.write_prometheus(f"{os.getenv('METRICS_FILE')}.{os.getpid()}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Worker de ingesta de documentos en segundo plano")
+    parser.add_argument("--processes", type=int, default=int(os.getenv("INGESTION_WORKERS", "1")),
+                        help="Número de procesos worker")
+    parser.add_argument("--poll-interval", type=float, default=2.0, help="Segundos entre consultas con la cola vacía")
+    parser.add_argument("--stale-after", type=int, default=1800,
+                        help="Segundos sin progreso tras los que un trabajo en curso se vuelve a reservar")
+    parser.add_argument("--once", action="store_true", help="Terminar cuando la cola esté vacía")
+    args = parser.parse_args()
+
+    Database().create_tables()
+    # Cada proceso abre su propio pool: no heredar conexiones del padre
+    close_pools()
+
+    # METRICS_PORT: el proceso i sirve sus métricas en METRICS_PORT + i
+    base_port = int(os.getenv("METRICS_PORT")) if os.getenv("METRICS_PORT") else None
+    if args.processes <= 1:
+        work(args.poll_interval, args.stale_after, args.once, base_port)
+        return
+
+    processes = [
+        multiprocessing.Process(
+            target=work,
+            args=(args.poll_interval, args.stale_after, args.once, base_port + i if base_port else None),
+        )
+        for i in range(args.processes)
+    ]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+
+
+if __name__ == "__main__":
+    main()
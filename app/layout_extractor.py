@@ -0,0 +1,193 @@
+# layout_extractor.py
+import re
+from typing import Dict, Any, List, Optional, Tuple
+
+# Importes en formato europeo o estadounidense: 24.214,44 · 24 214,44 · 24,214.44 · 24214.44
+AMOUNT_PATTERN = re.compile(r"^\d{1,3}(?:[.\s]\d{3})*(?:,\d{1,2})?$|^\d{1,3}(?:,\d{3})*(?:\.\d{1,2})?$|^\d+(?:[.,]\d{1,2})?$")
+YEAR_PATTERN = re.compile(r"^(19|20)\d{2}$")
+# CIF (letra + 7 dígitos + control), NIF (8 dígitos + letra) y NIE (X/Y/Z + 7 dígitos + letra)
+NIF_PATTERN = re.compile(r"^(?:[ABCDEFGHJNPQRSUVW]\d{7}[0-9A-J]|\d{8}[A-Z]|[XYZ]\d{7}[A-Z])$")
+
+# Etiquetas de los formularios de la AEAT, en minúsculas y sin signos
+FORM_LABELS = {
+    "modelo_190": {
+        "percepcion_integra": [("percepción", "íntegra"), ("percepcion", "integra")],
+    },
+    "10t": {
+        "percepcion_integra": [("rendimiento", "a", "integrar")],
+    },
+}
+COMMON_LABELS = {
+    "year": [("ejercicio",)],
+    # Nunca "NIF" a secas: también es la etiqueta del NIF del perceptor
+    "company_id": [("nif", "del", "declarante"), ("nif", "del", "pagador")],
+    "company_name": [("razón", "social"), ("razon", "social")],
+    "worker_name": [("apellidos", "y", "nombre", "del", "perceptor"),
+                    ("apellidos", "y", "nombre", "del", "trabajador"),
+                    ("perceptor",)],
+}
+
+# Palabras de las propias etiquetas: nunca forman parte de un nombre
+LABEL_VOCABULARY = {
+    "apellidos", "nombre", "razón", "razon", "social", "nif", "perceptor", "declarante",
+    "pagador", "trabajador", "ejercicio", "datos", "del", "o", "y",
+}
+
+REQUIRED_FIELDS = ("worker_name", "percepcion_integra", "year", "company_id", "company_name")
+
+
+def parse_european_number(value: str) -> Optional[float]:
+    """Normalize '24.214,44', '24 214,44', '24,214.44' or '24214.44' to 24214.44."""
+    value = (value or "").replace("\u00a0", " ").replace("€", "").strip()
+    if not value:
+        return None
+    value = value.replace(" ", "")
+    if "," in value and "." in value:
+        # El último separador es el decimal
+        if value.rfind(",") > value.rfind("."):
+            value = value.replace(".", "").replace(",", ".")
+        else:
+            value = value.replace(",", "")
+    elif "," in value:
+        integer, _, decimals = value.rpartition(",")
+        value = f"{integer.replace(',', '')}.{decimals}" if len(decimals) <= 2 else value.replace(",", "")
+    elif value.count(".") > 1 or re.fullmatch(r"\d{1,3}\.\d{3}", value):
+        # 1.708 o 1.234.567: puntos de miles
+        value = value.replace(".", "")
+    try:
+        return float(value)
+    except ValueError:
+        return None
+
+
+def _clean(word: str) -> str:
+    return word.strip(".,:;()[]\"'").lower()
+
+
+class LayoutExtractor:
+    """Local extraction for fixed-layout AEAT forms (Modelo 190, 10T) from word coordinates."""
+
+    def _lines(self, text: str, words: Optional[List[Tuple]]) -> List[List[Tuple[float, float, float, float, str]]]:
+        """Group words into visual lines; without coordinates each text line becomes one."""
+        if words:
+            grouped: Dict[Tuple[int, int], List] = {}
+            for x0, y0, x1, y1, word, block_no, line_no, *_ in words:
+                grouped.setdefault((block_no, line_no), []).append((x0, y0, x1, y1, word))
+            lines = [sorted(line) for line in grouped.values()]
+            lines.sort(key=lambda line: (round(line[0][1], 1), line[0][0]))
+            return lines
+
+        lines = []
+        for row, raw_line in enumerate(text.splitlines()):
+            line = []
+            for match in re.finditer(r"\S+", raw_line):
+                line.append((float(match.start()), float(row), float(match.end()), float(row + 1), match.group()))
+            if line:
+                lines.append(line)
+        return lines
+
+    def _find_label(self, lines, labels) -> Optional[Tuple[int, int]]:
+        """(line index, index of the label's last word) of the first matching label."""
+        for label in labels:
+            size = len(label)
+            for line_index, line in enumerate(lines):
+                cleaned = [_clean(word[4]) for word in line]
+                for start in range(len(cleaned) - size + 1):
+                    if tuple(cleaned[start:start + size]) == label:
+                        return line_index, start + size - 1
+        return None
+
+    def _candidates(self, lines, position, max_lines_below: int = 3):
+        """Words to the right of the label on its line, then words below it (closest first)."""
+        line_index, word_index = position
+        label_line = lines[line_index]
+        label_x0 = label_line[0][0]
+        label_x1 = label_line[word_index][2]
+        yield [word for word in label_line[word_index + 1:]]
+        for line in lines[line_index + 1:line_index + 1 + max_lines_below]:
+            # Valores debajo de la etiqueta: solapan horizontalmente con ella o empiezan a su derecha
+            yield [word for word in line if word[2] >= label_x0 and word[0] <= label_x1 + 200]
+
+    def _find_value(self, lines, labels, accept):
+        position = self._find_label(lines, labels)
+        if position is None:
+            return None
+        for words in self._candidates(lines, position):
+            value = accept([word[4] for word in words])
+            if value is not None:
+                return value
+        return None
+
+    @staticmethod
+    def _accept_amount(words: List[str]) -> Optional[float]:
+        # Los importes con separador de miles por espacio llegan partidos en varias palabras
+        for size in (3, 2, 1):
+            for start in range(len(words) - size + 1):
+                candidate = " ".join(words[start:start + size]).strip("€ ")
+                if AMOUNT_PATTERN.match(candidate) and re.search(r"[.,]\d{2}$", candidate):
+                    return parse_european_number(candidate)
+        return None
+
+    @staticmethod
+    def _accept_year(words: List[str]) -> Optional[int]:
+        for word in words:
+            word = _clean(word)
+            if YEAR_PATTERN.match(word):
+                return int(word)
+        return None
+
+    @staticmethod
+    def _accept_nif(words: List[str]) -> Optional[str]:
+        for word in words:
+            word = word.strip(".,:;()[]").upper().replace("-", "")
+            if NIF_PATTERN.match(word):
+                return word
+        return None
+
+    @staticmethod
+    def _accept_name(words: List[str]) -> Optional[str]:
+        # Nombre: palabras alfabéticas consecutivas (al menos dos), sin NIF ni importes
+        name = []
+        for word in words:
+            stripped = word.strip(":;")
+            if _clean(stripped) in LABEL_VOCABULARY:
+                if name:
+                    break
+                continue
+            if re.fullmatch(r"[A-Za-zÁÉÍÓÚÜÑáéíóúüñ'.,-]+", stripped):
+                name.append(stripped)
+            elif name:
+                break
+        name = " ".join(name).strip(" ,")
+        return name if len(name.split()) >= 2 else None
+
+    def extract(self, text: str, doc_type: str, words: Optional[List[Tuple]] = None) -> Dict[str, Any]:
+        """Best-effort extraction; fields that cannot be read are left out."""
+        lines = self._lines(text, words)
+        labels = dict(COMMON_LABELS, **FORM_LABELS.get(doc_type, {}))
+        result: Dict[str, Any] = {}
+
+        values = {
+            "percepcion_integra": self._find_value(lines, labels.get("percepcion_integra", []), self._accept_amount),
+            "year": self._find_value(lines, labels["year"], self._accept_year),
+            "company_id": self._find_value(lines, labels["company_id"], self._accept_nif),
+            "company_name": self._find_value(lines, labels["company_name"], self._accept_name),
+            "worker_name": self._find_value(lines, labels["worker_name"], self._accept_name),
+        }
+        for field, value in values.items():
+            if value is not None:
+                result[field] = value
+        return result
+
+    @staticmethod
+    def is_valid(data: Dict[str, Any]) -> bool:
+        """All required fields present and plausible; otherwise the LLM must be asked."""
+        if any(data.get(field) in (None, "") for field in REQUIRED_FIELDS):
+            return False
+        if not (1990 <= int(data["year"]) <= 2100):
+            return False
+        if not data["percepcion_integra"] > 0:
+            return False
+        if data["worker_name"].strip().lower() == data["company_name"].strip().lower():
+            return False
+        return bool(NIF_PATTERN.match(str(data["company_id"])))
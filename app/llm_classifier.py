@@ -1,31 +1,214 @@
 import re
-import openai
+import os
 import json
-from typing import Dict, Any
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, Dict, Any, List, Tuple, Union
+
+from context_builder import count_tokens
+from extraction_cache import ExtractionCache
+from layout_extractor import LayoutExtractor
+from llm_client import get_client
+from metrics import metrics
+
+# Incrementar al cambiar cualquier prompt de extracción: invalida la caché de resultados
+PROMPT_VERSION = "1"
+
+# Palabras clave por tipo de documento, en orden de prioridad. El convenio exige las tres.
+DOC_TYPE_KEYWORDS = [
+    ("modelo_190", ("modelo 190", "percepción íntegra")),
+    ("10t", ("documento 10t", "rendimiento a integrar")),
+    ("rnt", ("rnt", "base de contingencias comunes")),
+    ("idc", ("tipos de cotización", "contingencias profesionales")),
+    ("convenio", ("convenio", "jornada", "horas")),
+]
+_KEYWORD_INDEX = {
+    keyword: (priority, doc_type)
+    for priority, (doc_type, keywords) in enumerate(DOC_TYPE_KEYWORDS)
+    for keyword in keywords
+}
+# Una sola alternancia compilada: el texto se recorre una vez, sin copiarlo en minúsculas
+_KEYWORD_PATTERN = re.compile(
+    "|".join(re.escape(keyword) for keyword in sorted(_KEYWORD_INDEX, key=len, reverse=True)),
+    re.IGNORECASE,
+)
+
+# Señal mínima de que una página tiene datos que extraer; si falta, no se envía al LLM
+_AMOUNT_PATTERN = re.compile(r"\d,\d{2}\b|\d\.\d{2}\b")
+PAGE_CONTENT_MARKERS = {
+    "modelo_190": _AMOUNT_PATTERN,
+    "10t": _AMOUNT_PATTERN,
+    "rnt": _AMOUNT_PATTERN,
+    "idc": re.compile(r"total", re.IGNORECASE),
+    "convenio": re.compile(r"\bhoras?\b|jornada|vigen", re.IGNORECASE),
+}
+MIN_PAGE_CHARS = 40
+
+# Tipos que admiten varias páginas por petición y cómo se pide la respuesta en lote
+BATCHABLE_DOC_TYPES = ("modelo_190", "10t", "rnt", "convenio")
+BATCH_INSTRUCTIONS = """
+
+⚠️ MODO POR LOTES: el contenido incluye varias páginas, cada una precedida de una línea "### PÁGINA <n>".
+Procesa cada página de forma independiente y devuelve exclusivamente un array JSON con un elemento por página:
+[{"page": <n>, "data": <resultado de esa página con el formato indicado arriba>}]
+No incluyas explicaciones ni texto adicional.
+"""
+
+# Respuesta esperada por tipo en lote: (tokens por token de entrada, tokens fijos por página).
+# Cada fila de un RNT ("GAFOJ 3170,19 30", ~10 tokens) vuelve como un objeto JSON de ~60.
+BATCH_OUTPUT_TOKENS = {
+    "modelo_190": (0, 150),
+    "10t": (0, 150),
+    "rnt": (6, 20),
+    "convenio": (0, 60),
+}
+
+# Ventana de contexto (tokens) por modelo; se usa el prefijo más largo que coincida
+MODEL_CONTEXT_TOKENS = {
+    "gpt-3.5-turbo": 16385,
+    "gpt-4": 8192,
+    "gpt-4-32k": 32768,
+    "gpt-4-turbo": 128000,
+    "gpt-4o": 128000,
+}
+# Tokens reservados para la respuesta JSON de la planificación
+PLANNING_COMPLETION_TOKENS = 2000
+
+
+def model_context_tokens(model: str) -> int:
+    prefixes = [prefix for prefix in MODEL_CONTEXT_TOKENS if model.startswith(prefix)]
+    return MODEL_CONTEXT_TOKENS[max(prefixes, key=len)] if prefixes else 8192
+
 
 class LLMClassifier:
-    def __init__(self, api_key: str, model: str = "gpt-4"):
+    def __init__(self, api_key: str, model: str = "gpt-4", max_concurrency: int = None,
+                 cache: ExtractionCache = None, batch_extraction: bool = None, batch_max_tokens: int = None,
+                 batch_max_pages: int = None):
         self.model = model
-        openai.api_key = api_key
-        self.client = openai.OpenAI(api_key=openai.api_key)
+        # Número máximo de páginas enviadas al LLM a la vez
+        self.max_concurrency = max_concurrency or int(os.getenv("LLM_MAX_CONCURRENCY", "4"))
+        if cache is None and os.getenv("LLM_CACHE", "true") == "true":
+            cache = ExtractionCache(
+                os.getenv("LLM_CACHE_PATH", ".cache/llm_extraction.sqlite"),
+                max_bytes=int(os.getenv("LLM_CACHE_MAX_MB", "256")) * 1024 * 1024,
+            )
+        self.cache = cache
+        # Formularios de la AEAT de formato fijo: se leen en local y solo se recurre al LLM si falla
+        self.layout_extractor = LayoutExtractor()
+        self._stats_lock = threading.Lock()
+        self._stats = {"local": 0, "llm": 0, "llm_requests": 0}
+        # Varias páginas por petición, hasta un presupuesto de tokens de contenido
+        if batch_extraction is None:
+            batch_extraction = os.getenv("LLM_BATCH_EXTRACTION", "true") == "true"
+        self.batch_extraction = batch_extraction
+        self.batch_max_tokens = batch_max_tokens or int(os.getenv("LLM_BATCH_MAX_TOKENS", "3000"))
+        self.batch_max_pages = batch_max_pages or int(os.getenv("LLM_BATCH_MAX_PAGES", "8"))
+        metrics.register_gauges("extraction", self.extraction_stats)
+        if self.cache is not None:
+            metrics.register_gauges("llm_cache", self.cache.stats)
+        # Cliente compartido con el chat: misma cuota, reintentos y timeouts
+        self.llm = get_client(api_key)
 
     def classify_document_type(self, text: str) -> str:
-        text_lower = text.lower()
-
-        if "modelo 190" in text_lower or "percepción íntegra" in text_lower:
-            return "modelo_190"
-        elif "documento 10t" in text_lower or "rendimiento a integrar" in text_lower:
-            return "10t"
-        elif "rnt" in text_lower or "base de contingencias comunes" in text_lower:
-            return "rnt"
-        elif "tipos de cotización" in text_lower or "contingencias profesionales" in text_lower:
-            return "idc"
-        elif "convenio" in text_lower and "jornada" in text_lower and "horas" in text_lower:
-            return "convenio"
-        else:
-            return "desconocido"
-
-    def extract_structured_data(self, text: str, doc_type: str) -> Dict[str, Any]:
+        """Classify a text with a single pass over the keyword automaton.
+
+        Same precedence as before (modelo_190 > 10t > rnt > idc > convenio); scanning
+        stops as soon as no later keyword could change the result.
+        """
+        best = None
+        convenio_seen = set()
+        for match in _KEYWORD_PATTERN.finditer(text):
+            keyword = match.group().lower()
+            priority, doc_type = _KEYWORD_INDEX[keyword]
+            if doc_type == "convenio":
+                convenio_seen.add(keyword)
+                if len(convenio_seen) < len(DOC_TYPE_KEYWORDS[priority][1]):
+                    continue
+            if best is None or priority < best:
+                best = priority
+                if best == 0:
+                    break
+
+        return DOC_TYPE_KEYWORDS[best][0] if best is not None else "desconocido"
+
+    def classify_pages(self, pages: List[str], default_type: str = None) -> List[Dict[str, Any]]:
+        """Per-page type for mixed PDFs, marking pages with nothing to extract as skipped.
+
+        A page without keywords inherits the type of the previous classified page
+        (or `default_type`). Returns {"doc_type", "skipped", "reason"} per page.
+        """
+        results = []
+        current = default_type if default_type != "desconocido" else None
+        for page_text in pages:
+            if len(page_text.strip()) < MIN_PAGE_CHARS:
+                results.append({"doc_type": current or "desconocido", "skipped": True, "reason": "sin texto"})
+                continue
+
+            page_type = self.classify_document_type(page_text)
+            if page_type == "desconocido":
+                page_type = current or "desconocido"
+            else:
+                current = page_type
+
+            marker = PAGE_CONTENT_MARKERS.get(page_type)
+            if marker is None:
+                results.append({"doc_type": page_type, "skipped": True, "reason": "tipo desconocido"})
+            elif not marker.search(page_text):
+                results.append({"doc_type": page_type, "skipped": True, "reason": "sin datos"})
+            else:
+                results.append({"doc_type": page_type, "skipped": False, "reason": None})
+        return results
+
+    def extract_structured_data(self, text: str, doc_type: str, words: List[tuple] = None, **labels) -> Dict[str, Any]:
+        """Extract structured data from a page.
+
+        Modelo 190 and 10T pages are read locally from their layout first; the LLM is only
+        queried (through the cache) when a required field is missing or invalid.
+        `labels` (document, page) go to the extract_page timer.
+        """
+        with metrics.timer("extract_page", doc_type=doc_type, **labels):
+            data = self._extract_without_llm(text, doc_type, words)
+            if data is not None:
+                return data
+
+            data = self._extract_structured_data(text, doc_type)
+            self._cache_store(text, doc_type, data)
+            return data
+
+    def _extract_without_llm(self, text: str, doc_type: str, words: List[tuple] = None):
+        """Layout or cached result for a page, or None if the LLM has to be asked."""
+        if doc_type in ("modelo_190", "10t"):
+            with metrics.timer("layout_extract"):
+                data = self.layout_extractor.extract(text, doc_type, words)
+            if self.layout_extractor.is_valid(data):
+                self._count("local")
+                return data
+
+        self._count("llm")
+        if self.cache is None:
+            return None
+        cached = self.cache.get(ExtractionCache.make_key(text, doc_type, PROMPT_VERSION, self.model))
+        metrics.count("cache_hits" if cached is not None else "cache_misses", 1, "llm_cache")
+        return cached
+
+    def _cache_store(self, text: str, doc_type: str, data: Any):
+        if self.cache is not None:
+            self.cache.set(ExtractionCache.make_key(text, doc_type, PROMPT_VERSION, self.model), doc_type, data)
+
+    def _count(self, counter: str):
+        with self._stats_lock:
+            self._stats[counter] += 1
+
+    def extraction_stats(self) -> Dict[str, Any]:
+        """Pages resolved locally vs. sent to the LLM (cache hits included), and API requests made."""
+        with self._stats_lock:
+            stats = dict(self._stats)
+        total = stats["local"] + stats["llm"]
+        stats["local_share"] = stats["local"] / total if total else 0.0
+        return stats
+
+    def _extract_structured_data(self, text: str, doc_type: str) -> Dict[str, Any]:
 
         if doc_type == "modelo_190":
             return self.extract_from_modelo_190(text)
@@ -40,21 +223,216 @@ class LLMClassifier:
         else:
             raise ValueError("No se pudo clasificar el tipo de documento.")
 
+    def extract_pages(self, pages: List[str], doc_type: Union[str, List[str]], max_concurrency: int = None,
+                      words: List[List[tuple]] = None, batched: bool = None,
+                      progress: Callable[[int], None] = None, document: str = None,
+                      page_numbers: List[int] = None) -> List[Dict[str, Any]]:
+        """Extract structured data from several pages concurrently.
+
+        `doc_type` is either one type for every page or a list with one type per page;
+        `words` optionally carries each page's word coordinates for the layout extractor.
+        With `batched` (default: self.batch_extraction) several pages share one request.
+        `progress(completed)` is called from this thread as pages finish. `document` and
+        `page_numbers` (each page's number in the document) label the extract_page timings.
+        Returns one result per page, in page order: {"page", "data", "error"}.
+        A failing page only sets its own "error"; the rest keep running.
+        """
+        if not pages:
+            return []
+        doc_types = [doc_type] * len(pages) if isinstance(doc_type, str) else list(doc_type)
+        labels = [{"document": document, "page": page_numbers[index] if page_numbers else index}
+                  for index in range(len(pages))]
+        workers = min(max_concurrency or self.max_concurrency, len(pages))
+        if self.batch_extraction if batched is None else batched:
+            return self._extract_pages_batched(pages, doc_types, words, workers, progress, labels)
+        results: List[Dict[str, Any]] = [None] * len(pages)
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {
+                executor.submit(
+                    self.extract_structured_data,
+                    text=page_text,
+                    doc_type=doc_types[page_num],
+                    words=words[page_num] if words else None,
+                    **labels[page_num],
+                ): page_num
+                for page_num, page_text in enumerate(pages)
+            }
+            for completed, future in enumerate(as_completed(futures), start=1):
+                page_num = futures[future]
+                try:
+                    results[page_num] = {"page": page_num, "data": future.result(), "error": None}
+                except Exception as e:
+                    results[page_num] = {"page": page_num, "data": None, "error": e}
+                if progress is not None:
+                    progress(completed)
+
+        return results
+
+    def _extract_pages_batched(self, pages: List[str], doc_types: List[str], words, workers: int,
+                               progress: Callable[[int], None] = None,
+                               labels: List[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        labels = labels or [{"page": page_num} for page_num in range(len(pages))]
+        results: List[Dict[str, Any]] = [None] * len(pages)
+        pending: Dict[str, List[Tuple[int, str]]] = {}
+        for page_num, page_text in enumerate(pages):
+            # Solo las páginas resueltas aquí cuentan ya como extract_page; las que van al LLM
+            # tienen su muestra (una sola) cuando llega su lote
+            page_start = time.perf_counter()
+            try:
+                data = self._extract_without_llm(page_text, doc_types[page_num], words[page_num] if words else None)
+            except Exception as e:
+                metrics.observe("extract_page", time.perf_counter() - page_start, doc_type=doc_types[page_num],
+                                **labels[page_num])
+                results[page_num] = {"page": page_num, "data": None, "error": e}
+                continue
+            if data is not None:
+                metrics.observe("extract_page", time.perf_counter() - page_start, doc_type=doc_types[page_num],
+                                **labels[page_num])
+                results[page_num] = {"page": page_num, "data": data, "error": None}
+            else:
+                pending.setdefault(doc_types[page_num], []).append((page_num, page_text))
+
+        batches = [
+            (page_type, batch)
+            for page_type, items in pending.items()
+            for batch in self._pack_batches(page_type, items)
+        ]
+        completed = sum(result is not None for result in results)
+        if progress is not None:
+            progress(completed)
+        if not batches:
+            return results
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=min(workers, len(batches))) as executor:
+            futures = [executor.submit(self._run_batch, page_type, batch) for page_type, batch in batches]
+            for future in as_completed(futures):
+                # Latencia por página: lo que ha esperado hasta tener su resultado
+                elapsed = time.perf_counter() - start
+                for result in future.result():
+                    results[result["page"]] = result
+                    metrics.observe("extract_page", elapsed, doc_type=doc_types[result["page"]], **labels[result["page"]])
+                    completed += 1
+                if progress is not None:
+                    progress(completed)
+        return results
+
+    def _pack_batches(self, doc_type: str, items: List[Tuple[int, str]]) -> List[List[Tuple[int, str]]]:
+        """Consecutive pages grouped up to batch_max_tokens / batch_max_pages.
+
+        The prompt, the pages and their expected answer must also fit in the model's context;
+        a page that does not fit with others goes alone, as in the unbatched path.
+        """
+        if doc_type not in BATCHABLE_DOC_TYPES:
+            return [[item] for item in items]
+        per_token, per_page = BATCH_OUTPUT_TOKENS[doc_type]
+        prompt = getattr(self, f"_prompt_{doc_type}")("") + BATCH_INSTRUCTIONS
+        # Margen para las cabeceras "### PÁGINA <n>" y el formato de los mensajes
+        context = model_context_tokens(self.model) - count_tokens(prompt, self.model) - 100
+        batches, current, used, needed = [], [], 0, 0
+        for item in items:
+            tokens = count_tokens(item[1], self.model)
+            page_needed = tokens + tokens * per_token + per_page
+            if current and (used + tokens > self.batch_max_tokens or needed + page_needed > context
+                            or len(current) >= self.batch_max_pages):
+                batches.append(current)
+                current, used, needed = [], 0, 0
+            current.append(item)
+            used += tokens
+            needed += page_needed
+        if current:
+            batches.append(current)
+        return batches
+
+    def _run_batch(self, doc_type: str, items: List[Tuple[int, str]]) -> List[Dict[str, Any]]:
+        """Extract a batch; pages missing from a failed answer are retried in smaller batches."""
+        if len(items) == 1:
+            page_num, page_text = items[0]
+            try:
+                data = self._extract_structured_data(page_text, doc_type)
+                self._cache_store(page_text, doc_type, data)
+                return [{"page": page_num, "data": data, "error": None}]
+            except Exception as e:
+                return [{"page": page_num, "data": None, "error": e}]
+
+        try:
+            data_by_page = self._query_batch(doc_type, items)
+        except Exception:
+            data_by_page = {}
+
+        results, missing = [], []
+        for page_num, page_text in items:
+            if page_num in data_by_page:
+                self._cache_store(page_text, doc_type, data_by_page[page_num])
+                results.append({"page": page_num, "data": data_by_page[page_num], "error": None})
+            else:
+                missing.append((page_num, page_text))
+
+        if missing:
+            half = (len(missing) + 1) // 2
+            for part in (missing[:half], missing[half:]):
+                if part:
+                    results.extend(self._run_batch(doc_type, part))
+        return results
+
+    def _query_batch(self, doc_type: str, items: List[Tuple[int, str]]) -> Dict[int, Any]:
+        """One request for several pages; returns the well-formed results keyed by page index."""
+        block = "\n\n".join(f"### PÁGINA {page_num}\n{page_text}" for page_num, page_text in items)
+        prompt = getattr(self, f"_prompt_{doc_type}")(block) + BATCH_INSTRUCTIONS
+        content = self._complete(prompt)
+
+        with metrics.timer("json_parse"):
+            match = re.search(r"\[.*\]", content, re.DOTALL)
+            if not match:
+                raise ValueError("No se encontró ningún array JSON en la respuesta del modelo.")
+            parsed = json.loads(match.group())
+
+        expected = {page_num for page_num, _ in items}
+        data_by_page = {}
+        for element in parsed if isinstance(parsed, list) else []:
+            if not isinstance(element, dict):
+                continue
+            try:
+                page_num = int(element.get("page"))
+            except (TypeError, ValueError):
+                continue
+            data = element.get("data")
+            if doc_type == "rnt" and isinstance(data, dict):
+                data = data.get("trabajadores")
+            valid = isinstance(data, list) if doc_type == "rnt" else isinstance(data, dict)
+            if page_num in expected and valid:
+                data_by_page[page_num] = data
+        return data_by_page
+
+    def _complete(self, prompt: str) -> str:
+        self._count("llm_requests")
+        with metrics.timer("llm_request", model=self.model):
+            response = self.llm.complete(
+                model=self.model,
+                messages=[
+                    {"role": "system", "content": "Eres un asistente experto en analizar documentos laborales y fiscales."},
+                    {"role": "user", "content": prompt}
+                ],
+                stage="llm_extraction",
+            )
+        if getattr(response, "usage", None) is not None:
+            metrics.tokens("llm_extraction", response.usage.prompt_tokens, response.usage.completion_tokens)
+        return response.choices[0].message.content.strip()
+
     def _query_openai(self, prompt: str, doc_type: str = None) -> Dict[str, Any]:
-        response = self.client.chat.completions.create(
-            model="gpt-4",
-            messages=[
-                {"role": "system", "content": "Eres un asistente experto en analizar documentos laborales y fiscales."},
-                {"role": "user", "content": prompt}
-            ]
-        )
-        content = response.choices[0].message.content.strip()
+        content = self._complete(prompt)
         # print(content)
+        with metrics.timer("json_parse"):
+            return self._parse_json(content, doc_type)
 
-        if doc_type in ("modelo_190", "convenio", "10t"):
+    def _parse_json(self, content: str, doc_type: str = None):
+        if doc_type in ("modelo_190", "convenio", "10t", "planificacion"):
             match = re.search(r"\{.*\}", content, re.DOTALL)
         elif doc_type == "rnt":
             match = re.search(r"\[\s*\{.*?\}\s*(,\s*\{.*?\}\s*)*\]", content, re.DOTALL)
+        else:
+            match = re.search(r"\{.*\}|\[.*\]", content, re.DOTALL)
 
         if not match:
             raise ValueError(f"No se encontró ningún JSON válido en la respuesta del modelo.")
@@ -66,8 +444,79 @@ class LLMClassifier:
         except json.JSONDecodeError as e:
             raise ValueError(f"Error al parsear JSON: {e}\nContenido:\n{json_text}")
 
+    def extract_planning(self, text: str, max_tokens: int = None) -> Dict[str, Any]:
+        """Phases, durations, tasks and hours per worker and year of a planning document.
+
+        One request per document; the result is meant to be stored (Database.save_planning)
+        and reused instead of the raw text.
+        """
+        # Lo que cabe en el contexto del modelo junto al prompt y la respuesta; LLM_PLANNING_MAX_TOKENS solo lo reduce
+        fits = (model_context_tokens(self.model) - count_tokens(self._prompt_planificacion(""), self.model)
+                - PLANNING_COMPLETION_TOKENS - 100)
+        max_tokens = min(max_tokens or int(os.getenv("LLM_PLANNING_MAX_TOKENS", str(fits))), fits)
+        tokens = count_tokens(text, self.model)
+        if tokens > max_tokens:
+            # Recorte proporcional: las memorias técnicas suelen traer la planificación al principio.
+            # Aproximado; se ajusta después con el contador real
+            text = text[:int(len(text) * max_tokens / tokens)]
+            while text and count_tokens(text, self.model) > max_tokens:
+                text = text[:int(len(text) * 0.9)]
+
+        with metrics.timer("planning_extract"):
+            planning = self._query_openai(self._prompt_planificacion(text), "planificacion")
+        if not isinstance(planning, dict):
+            raise ValueError("La planificación extraída no es un objeto JSON.")
+        planning.setdefault("fases", [])
+        planning.setdefault("horas_por_trabajador", [])
+        return planning
+
+    def _prompt_planificacion(self, text: str) -> str:
+        return f"""
+Eres un asistente experto en la planificación de proyectos de I+D.
+
+Del documento de planificación (memoria técnica, plan de trabajo...) extrae:
+
+1. `"proyecto"`: el título del proyecto.
+2. `"fases"`: lista de fases o paquetes de trabajo, cada una con:
+   - `"fase"`: nombre tal como aparece (por ejemplo "Fase 1 - Análisis técnico").
+   - `"duracion_meses"`: duración estimada en meses (número) o null.
+   - `"inicio"` y `"fin"`: mes de inicio y fin en formato "AAAA-MM", o null.
+   - `"year"`: año principal de ejecución de la fase (entero) o null.
+   - `"horas"`: horas totales previstas para la fase (número) o null.
+   - `"tareas"`: lista con el nombre breve de cada tarea.
+   - `"participantes"`: lista de {{"trabajador": nombre, "year": año, "horas": horas}} con las horas asignadas a cada persona en esa fase, si constan.
+3. `"horas_por_trabajador"`: lista de {{"trabajador": nombre, "year": año, "horas": horas}} con el total de horas de cada persona por año.
+
+Normaliza los números al formato decimal estadounidense (`1.760,5` -> `1760.5`). No inventes datos: si algo no aparece, usa null o una lista vacía.
+Devuelve exclusivamente un objeto JSON válido, sin explicaciones.
+
+Ejemplo de salida esperada:
+{{
+    "proyecto": "Plataforma de mantenimiento predictivo",
+    "fases": [
+        {{
+            "fase": "Fase 1 - Análisis técnico",
+            "duracion_meses": 4,
+            "inicio": "2024-01",
+            "fin": "2024-04",
+            "year": 2024,
+            "horas": 320,
+            "tareas": ["Requisitos", "Estado del arte"],
+            "participantes": [{{"trabajador": "Jose Garcia Fontecha", "year": 2024, "horas": 120}}]
+        }}
+    ],
+    "horas_por_trabajador": [{{"trabajador": "Jose Garcia Fontecha", "year": 2024, "horas": 300}}]
+}}
+
+Contenido del documento:
+{text}
+"""
+
     def extract_from_modelo_190(self, text: str) -> Dict[str, Any]:
-        prompt = f"""
+        return self._query_openai(self._prompt_modelo_190(text), "modelo_190")
+
+    def _prompt_modelo_190(self, text: str) -> str:
+        return f"""
 Eres un asistente experto en análisis de documentos fiscales en formato PDF.
 
 Tu tarea consiste en extraer información estructurada de un documento, concretamente los siguientes campos:
@@ -96,10 +545,12 @@ Contenido del documento:
 {text}
 
 """
-        return self._query_openai(prompt, "modelo_190")
 
     def extract_from_10t(self, text: str) -> Dict[str, Any]:
-        prompt = f"""
+        return self._query_openai(self._prompt_10t(text), "10t")
+
+    def _prompt_10t(self, text: str) -> str:
+        return f"""
 Eres un asistente experto en el análisis de documentos fiscales en formato PDF.
 
 Tu tarea consiste en extraer la siguiente información de un documento fiscal (Documento 10T):
@@ -127,10 +578,12 @@ Ejemplo de salida esperada:
 Contenido del documento:
 {text}
 """
-        return self._query_openai(prompt, "10t")
 
     def extract_from_rnt(self, text: str) -> str:
-        prompt = f"""
+        return self._query_openai(self._prompt_rnt(text), "rnt")
+
+    def _prompt_rnt(self, text: str) -> str:
+        return f"""
     Eres un asistente que extrae información de documentos RNT mensuales de la Seguridad Social.
 
     Tu tarea es:
@@ -180,10 +633,12 @@ Contenido del documento:
     Contenido del documento:
     {text}
     """
-        return self._query_openai(prompt, "rnt")
 
     def extract_from_idc(self, text: str) -> Dict[str, Any]:
-        prompt = f"""
+        return self._query_openai(self._prompt_idc(text))
+
+    def _prompt_idc(self, text: str) -> str:
+        return f"""
 Eres un asistente que analiza documentos IDC.
 Busca la sección final del documento donde aparecen los tipos de cotización y extrae el valor del campo \"TOTAL\" (porcentaje total).
 Devuelve la salida en formato:
@@ -192,10 +647,12 @@ Devuelve la salida en formato:
 Contenido del documento:
 {text}
 """
-        return self._query_openai(prompt)
 
     def extract_from_convenio(self, text: str) -> Dict[str, Any]:
-        prompt = f"""
+        return self._query_openai(self._prompt_convenio(text), "convenio")
+
+    def _prompt_convenio(self, text: str) -> str:
+        return f"""
 Eres un asistente experto en la revisión de convenios laborales.
 
 Tu tarea consiste en extraer dos datos clave del documento:
@@ -221,4 +678,3 @@ Devuelve exclusivamente un objeto JSON válido con el siguiente formato:
 Contenido del documento:
 {text}
 """
-        return self._query_openai(prompt, "convenio")
\ No newline at end of file
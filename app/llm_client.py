@@ -0,0 +1,244 @@
+# llm_client.py
+"""Cliente de OpenAI compartido por LLMClassifier y ChatBot.
+
+Todas las peticiones del proceso pasan por los mismos cubos de tokens (peticiones y tokens
+por minuto), así que la ingesta concurrente y el chat se reparten la cuota sin superarla.
+Los errores transitorios (429, 5xx, timeouts y cortes de conexión) se reintentan con
+backoff exponencial con jitter, respetando Retry-After; un 429 frena a todos los hilos,
+no solo al que lo recibió.
+"""
+import email.utils
+import os
+import random
+import threading
+import time
+from typing import Any, Dict, Iterator, List, Optional
+
+import openai
+
+from context_builder import count_tokens
+from metrics import metrics
+
+RETRYABLE_STATUS = {408, 409, 429}
+
+
+class TokenBucket:
+    """Refills `per_minute` units per minute, holding at most one minute's worth.
+
+    Callers reserve what they need and sleep off the debt, so concurrent callers
+    are served in arrival order without polling.
+    """
+
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.rate = self.capacity / 60
+        self._level = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        self._level = min(self.capacity, self._level + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def reserve(self, amount: float) -> float:
+        """Take `amount` units (capped at the capacity); returns the seconds to wait before using them."""
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            self._level -= min(amount, self.capacity)
+            return max(0.0, -self._level / self.rate)
+
+    def refund(self, amount: float):
+        """Give back (or, if negative, take) units once the real usage is known."""
+        with self._lock:
+            self._refill(time.monotonic())
+            self._level = min(self.capacity, self._level + amount)
+
+    def limit(self, remaining: float):
+        """Never believe there is more left than the server reports."""
+        with self._lock:
+            self._refill(time.monotonic())
+            self._level = min(self._level, remaining)
+
+    def drain(self):
+        with self._lock:
+            self._refill(time.monotonic())
+            self._level = min(self._level, 0.0)
+
+
+def _retry_after(error: Exception) -> Optional[float]:
+    """Seconds requested by the server (retry-after-ms, retry-after in seconds or as a date)."""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    try:
+        if headers.get("retry-after-ms"):
+            return float(headers["retry-after-ms"]) / 1000
+        value = headers.get("retry-after")
+        if not value:
+            return None
+        try:
+            return float(value)
+        except ValueError:
+            return max(0.0, email.utils.parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def _retryable(error: Exception) -> bool:
+    if isinstance(error, (openai.APITimeoutError, openai.APIConnectionError, openai.RateLimitError)):
+        return True
+    status = getattr(error, "status_code", None)
+    return isinstance(error, openai.APIStatusError) and (status in RETRYABLE_STATUS or (status or 0) >= 500)
+
+
+class LLMClient:
+    """Rate-limited chat completions with retries and per-request timeouts."""
+
+    def __init__(self, api_key: str = None, requests_per_minute: float = None, tokens_per_minute: float = None,
+                 timeout: float = None, max_retries: int = None, backoff_base: float = None,
+                 backoff_max: float = None, completion_tokens: int = None):
+        # Los reintentos los gestiona esta clase: el SDK no reintenta por su cuenta
+        self.client = openai.OpenAI(api_key=api_key, max_retries=0)
+        rpm = requests_per_minute if requests_per_minute is not None else float(os.getenv("LLM_RPM", "0"))
+        tpm = tokens_per_minute if tokens_per_minute is not None else float(os.getenv("LLM_TPM", "0"))
+        # 0 = sin límite fijo: se toma el que informe el servidor (x-ratelimit-limit-*)
+        self.requests = TokenBucket(rpm) if rpm > 0 else None
+        self.tokens = TokenBucket(tpm) if tpm > 0 else None
+        self.timeout = timeout or float(os.getenv("LLM_TIMEOUT", "60"))
+        self.max_retries = max_retries if max_retries is not None else int(os.getenv("LLM_MAX_RETRIES", "5"))
+        self.backoff_base = backoff_base or float(os.getenv("LLM_BACKOFF_BASE", "1"))
+        self.backoff_max = backoff_max or float(os.getenv("LLM_BACKOFF_MAX", "60"))
+        # Tokens de respuesta supuestos al reservar; se corrige con el uso real
+        self.completion_tokens = completion_tokens or int(os.getenv("LLM_COMPLETION_TOKENS", "500"))
+        self._lock = threading.Lock()
+        self._paused_until = 0.0
+        self._stats = {"requests": 0, "retries": 0, "rate_limited": 0, "failures": 0,
+                       "throttled_seconds": 0.0, "backoff_seconds": 0.0}
+        metrics.register_gauges("llm_client", self.stats)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return dict(self._stats)
+
+    def _add(self, key: str, value: float = 1):
+        with self._lock:
+            self._stats[key] += value
+
+    def _estimate(self, model: str, messages: List[Dict[str, str]]) -> int:
+        return sum(count_tokens(message.get("content") or "", model) for message in messages) + self.completion_tokens
+
+    def _acquire(self, tokens: int, stage: str):
+        """Wait for a request slot and `tokens` of quota (and for any pause after a 429)."""
+        wait = self.requests.reserve(1) if self.requests else 0.0
+        if self.tokens:
+            wait = max(wait, self.tokens.reserve(tokens))
+        with self._lock:
+            wait = max(wait, self._paused_until - time.monotonic())
+        if wait > 0:
+            self._add("throttled_seconds", wait)
+            metrics.count("llm_throttled_seconds", wait, stage)
+            time.sleep(wait)
+
+    def _settle(self, estimated: int, used: Optional[int]):
+        if self.tokens and used is not None:
+            self.tokens.refund(estimated - used)
+
+    def _sync(self, headers):
+        """Align the buckets with the quota the server reports as left.
+
+        A bucket without a configured limit is created from the server's own limit.
+        """
+        for name in ("requests", "tokens"):
+            try:
+                with self._lock:
+                    bucket = getattr(self, name)
+                    limit = headers.get(f"x-ratelimit-limit-{name}")
+                    if bucket is None and limit is not None and float(limit) > 0:
+                        bucket = TokenBucket(float(limit))
+                        setattr(self, name, bucket)
+                remaining = headers.get(f"x-ratelimit-remaining-{name}")
+                if bucket and remaining is not None:
+                    bucket.limit(float(remaining))
+            except (TypeError, ValueError):
+                continue
+
+    def _backoff(self, attempt: int, error: Exception, stage: str) -> float:
+        # Full jitter; nunca por debajo de lo que pida el servidor
+        delay = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+        retry_after = _retry_after(error)
+        if retry_after is not None:
+            delay = max(delay, retry_after + random.uniform(0, self.backoff_base))
+        if isinstance(error, openai.RateLimitError) or getattr(error, "status_code", None) == 429:
+            # Cuota agotada: se frena a todos los hilos hasta que pase la espera
+            self._add("rate_limited")
+            metrics.count("llm_rate_limited", 1, stage)
+            for bucket in (self.requests, self.tokens):
+                if bucket:
+                    bucket.drain()
+            with self._lock:
+                self._paused_until = max(self._paused_until, time.monotonic() + delay)
+        return delay
+
+    def _create(self, stage: str, estimated: int, **kwargs):
+        """chat.completions.create with limiter, timeout and retries; returns (response, headers)."""
+        for attempt in range(self.max_retries + 1):
+            self._acquire(estimated, stage)
+            self._add("requests")
+            try:
+                raw = self.client.chat.completions.with_raw_response.create(timeout=self.timeout, **kwargs)
+                self._sync(raw.headers)
+                return raw.parse()
+            except Exception as e:
+                if not _retryable(e) or attempt == self.max_retries:
+                    self._add("failures")
+                    metrics.count("llm_failures", 1, stage)
+                    raise
+                # El intento fallido no consumió cuota: se devuelve antes de reservar de nuevo
+                if self.requests:
+                    self.requests.refund(1)
+                if self.tokens:
+                    self.tokens.refund(estimated)
+                delay = self._backoff(attempt, e, stage)
+                self._add("retries")
+                metrics.count("llm_retries", 1, stage, error=type(e).__name__, delay=round(delay, 3))
+                self._add("backoff_seconds", delay)
+                metrics.count("llm_backoff_seconds", delay, stage)
+                time.sleep(delay)
+
+    def complete(self, model: str, messages: List[Dict[str, str]], stage: str = "llm", **kwargs):
+        """Chat completion (the SDK response object)."""
+        estimated = self._estimate(model, messages)
+        response = self._create(stage, estimated, model=model, messages=messages, **kwargs)
+        usage = getattr(response, "usage", None)
+        self._settle(estimated, usage.total_tokens if usage is not None else None)
+        return response
+
+    def stream(self, model: str, messages: List[Dict[str, str]], stage: str = "llm", **kwargs) -> Iterator[Any]:
+        """Streamed chat completion, chunk by chunk.
+
+        Only opening the stream is retried: once text has been yielded a retry would repeat it.
+        """
+        estimated = self._estimate(model, messages)
+        stream = self._create(stage, estimated, model=model, messages=messages, stream=True, **kwargs)
+        text = []
+        try:
+            for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    text.append(chunk.choices[0].delta.content)
+                yield chunk
+        finally:
+            used = estimated - self.completion_tokens + count_tokens("".join(text), model)
+            self._settle(estimated, used)
+
+
+# Un cliente por clave de API y proceso: todos los hilos comparten la cuota
+_clients: Dict[Optional[str], LLMClient] = {}
+_clients_lock = threading.Lock()
+
+
+def get_client(api_key: str = None) -> LLMClient:
+    with _clients_lock:
+        client = _clients.get(api_key)
+        if client is None:
+            client = _clients[api_key] = LLMClient(api_key=api_key)
+        return client
@@ -6,6 +6,7 @@ from pdf_preprocessor import PDFProcessor
 from llm_classifier import LLMClassifier
 from database import Database
 from chatbot import ChatBot
+from metrics import start_http_server
 
 # Importación directa de los módulos de las páginas
 from app_pages.view_workers_page import show as show_view_workers_page
@@ -28,16 +29,27 @@ page = st.sidebar.radio(
         "View Workers", 
     ])
 
+@st.cache_resource
+def init_components():
+    """Created once per process and shared by every rerun and session."""
+    db = Database()
+    # Create database tables if they don't exist
+    if os.getenv('CLEAN_DB') == 'true':
+        db.clean_database()
+    db.migrate()
+
+    pdf_processor = PDFProcessor()
+    llm_classifier = LLMClassifier(api_key=os.getenv('OPENAI_API_KEY'))
+    chatbot = ChatBot(api_key=os.getenv('OPENAI_API_KEY'))
+
+    # Métricas en formato Prometheus en http://<host>:METRICS_PORT/metrics
+    if os.getenv('METRICS_PORT'):
+        start_http_server(int(os.getenv('METRICS_PORT')))
+    return db, pdf_processor, llm_classifier, chatbot
+
+
 # Initialize components
-db = Database()
-pdf_processor = PDFProcessor()
-llm_classifier = LLMClassifier(api_key=os.getenv('OPENAI_API_KEY'))
-chatbot = ChatBot(api_key=os.getenv('OPENAI_API_KEY'))
-
-# Create database tables if they don't exist
-if os.getenv('CLEAN_DB') == 'true':
-    db.clean_database()
-db.create_tables()
+db, pdf_processor, llm_classifier, chatbot = init_components()
 
 # Route to the correct page
 # if page == "Upload Documents":
@@ -0,0 +1,189 @@
+# metrics.py
+"""Instrumentación ligera del pipeline de ingesta.
+
+Tiempos, contadores y tokens por etapa, exportables como logs JSON (METRICS_LOG=true),
+texto de Prometheus (fichero o endpoint HTTP con METRICS_PORT) y perfil cProfile.
+"""
+import cProfile
+import json
+import logging
+import os
+import pstats
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, Tuple
+
+PREFIX = "tfm"
+# Muestras recientes por etapa para calcular percentiles (memoria acotada)
+MAX_SAMPLES = 10000
+QUANTILES = (0.5, 0.95)
+
+
+class Metrics:
+    """Process-wide registry of stage timers, counters and token usage."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._timers: Dict[str, Dict[str, float]] = {}
+        self._samples: Dict[str, deque] = {}
+        self._counters: Dict[Tuple[str, str], float] = {}
+        self._gauge_sources: Dict[str, Callable[[], Dict[str, Any]]] = {}
+
+        self.log_events = os.getenv("METRICS_LOG", "false") == "true"
+        self.logger = logging.getLogger("metrics")
+        if self.log_events and not self.logger.handlers:
+            handler = logging.StreamHandler()
+            handler.setFormatter(logging.Formatter("%(message)s"))
+            self.logger.addHandler(handler)
+            self.logger.setLevel(logging.INFO)
+            self.logger.propagate = False
+
+    def _log(self, event: str, **fields):
+        if self.log_events:
+            self.logger.info(json.dumps({"ts": round(time.time(), 3), "event": event, **fields},
+                                        ensure_ascii=False, default=str))
+
+    @contextmanager
+    def timer(self, stage: str, **labels):
+        """Time a block; `labels` (document, page, ...) only go to the JSON log."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - start, **labels)
+
+    def observe(self, stage: str, seconds: float, **labels):
+        with self._lock:
+            timer = self._timers.setdefault(stage, {"count": 0, "sum": 0.0, "max": 0.0})
+            timer["count"] += 1
+            timer["sum"] += seconds
+            timer["max"] = max(timer["max"], seconds)
+            self._samples.setdefault(stage, deque(maxlen=MAX_SAMPLES)).append(seconds)
+        self._log("timer", stage=stage, seconds=round(seconds, 6), **labels)
+
+    def percentile(self, stage: str, q: float) -> float:
+        """q-quantile (0..1) of the recent samples of a stage; 0.0 if there are none."""
+        with self._lock:
+            samples = sorted(self._samples.get(stage, ()))
+        if not samples:
+            return 0.0
+        return samples[min(len(samples) - 1, int(round(q * (len(samples) - 1))))]
+
+    def count(self, name: str, value: float = 1, stage: str = "", **labels):
+        with self._lock:
+            self._counters[(name, stage)] = self._counters.get((name, stage), 0) + value
+        if labels:
+            self._log("count", name=name, stage=stage, value=value, **labels)
+
+    def tokens(self, stage: str, prompt_tokens: int, completion_tokens: int, **labels):
+        self.count("tokens_prompt", prompt_tokens or 0, stage)
+        self.count("tokens_completion", completion_tokens or 0, stage)
+        self._log("tokens", stage=stage, prompt_tokens=prompt_tokens, completion_tokens=completion_tokens, **labels)
+
+    def event(self, name: str, **fields):
+        """Free-form structured event (e.g. a per-document summary)."""
+        self._log(name, **fields)
+
+    def register_gauges(self, name: str, source: Callable[[], Dict[str, Any]]):
+        """Numeric values read at export time, e.g. Database.pool_stats."""
+        with self._lock:
+            self._gauge_sources[name] = source
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            timers = {stage: dict(values) for stage, values in self._timers.items()}
+            counters = {f"{name}{'/' + stage if stage else ''}": value for (name, stage), value in self._counters.items()}
+            sources = dict(self._gauge_sources)
+        gauges = {}
+        for name, source in sources.items():
+            try:
+                gauges[name] = source()
+            except Exception as e:
+                gauges[name] = {"error": str(e)}
+        return {"timers": timers, "counters": counters, "gauges": gauges}
+
+    def prometheus_text(self) -> str:
+        """Current values in the Prometheus text exposition format."""
+        snapshot = self.snapshot()
+        lines = [
+            f"# TYPE {PREFIX}_stage_seconds summary",
+        ]
+        for stage, timer in sorted(snapshot["timers"].items()):
+            for q in QUANTILES:
+                lines.append(f'{PREFIX}_stage_seconds{{stage="{stage}",quantile="{q}"}} {self.percentile(stage, q):.6f}')
+            lines.append(f'{PREFIX}_stage_seconds_count{{stage="{stage}"}} {timer["count"]}')
+            lines.append(f'{PREFIX}_stage_seconds_sum{{stage="{stage}"}} {timer["sum"]:.6f}')
+        lines.append(f"# TYPE {PREFIX}_stage_seconds_max gauge")
+        for stage, timer in sorted(snapshot["timers"].items()):
+            lines.append(f'{PREFIX}_stage_seconds_max{{stage="{stage}"}} {timer["max"]:.6f}')
+
+        with self._lock:
+            counters = sorted(self._counters.items())
+        declared = set()
+        for (name, stage), value in counters:
+            if name not in declared:
+                lines.append(f"# TYPE {PREFIX}_{name}_total counter")
+                declared.add(name)
+            lines.append(f'{PREFIX}_{name}_total{{stage="{stage}"}} {value}')
+
+        for source, values in sorted(snapshot["gauges"].items()):
+            for key, value in sorted(values.items()):
+                if isinstance(value, (int, float)) and not isinstance(value, bool):
+                    lines.append(f"{PREFIX}_{source}_{key} {value}")
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path: str):
+        """Write the metrics file atomically (for node_exporter's textfile collector or similar)."""
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(self.prometheus_text())
+        os.replace(tmp_path, path)
+
+    def reset(self):
+        with self._lock:
+            self._timers.clear()
+            self._samples.clear()
+            self._counters.clear()
+
+
+metrics = Metrics()
+
+
+def start_http_server(port: int, host: str = "0.0.0.0") -> ThreadingHTTPServer:
+    """Serve /metrics in the Prometheus format from a daemon thread."""
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.rstrip("/") not in ("", "/metrics"):
+                self.send_response(404)
+                self.end_headers()
+                return
+            body = metrics.prometheus_text().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+@contextmanager
+def profile(path: str = None, top: int = 25):
+    """cProfile a block (e.g. one ingestion run); dumps stats to `path` and prints the top entries."""
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield profiler
+    finally:
+        profiler.disable()
+        if path:
+            profiler.dump_stats(path)
+        pstats.Stats(profiler).sort_stats("cumulative").print_stats(top)
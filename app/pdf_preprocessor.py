@@ -1,11 +1,69 @@
 # pdf_preprocessor.py
 import fitz  # PyMuPDF
+import hashlib
 import os
-from typing import List, Dict, Any
+import re
+from typing import List, Dict, Any, Optional, Tuple
+
+from context_builder import count_tokens
+from metrics import metrics
+
+# Regiones útiles de cada tipo de página: líneas ancla (con `context` líneas antes/después,
+# donde suele estar el valor), líneas de datos y líneas que se conservan siempre (`keep`).
+# El resto de la página no llega al LLM.
+WINDOW_RULES = {
+    "rnt": {
+        "anchors": re.compile(r"periodo de liquidaci|c[oó]digo de empresario|raz[oó]n social|"
+                              r"base de contingencias|\bd[ií]as\b|\bcaf\b", re.IGNORECASE),
+        # Filas de trabajadores: importes, días o el CAF de 5 letras
+        "data": re.compile(r"\d|\b[A-ZÑ]{5}\b"),
+        "context": (0, 1),
+    },
+    "modelo_190": {
+        "anchors": re.compile(r"modelo 190|ejercicio|\bnif\b|raz[oó]n social|apellidos y nombre|perceptor|"
+                              r"percepci[oó]n [ií]ntegra", re.IGNORECASE),
+        "data": re.compile(r"\d"),
+        "context": (0, 2),
+    },
+    "10t": {
+        "anchors": re.compile(r"documento 10t|ejercicio|\bnif\b|raz[oó]n social|apellidos y nombre|perceptor|"
+                              r"rendimiento a integrar", re.IGNORECASE),
+        "data": re.compile(r"\d"),
+        "context": (0, 2),
+    },
+    "convenio": {
+        # Las frases se parten en varias líneas: se conserva la anterior y la siguiente
+        "anchors": re.compile(r"\bhoras?\b|jornada|vigen", re.IGNORECASE),
+        "data": None,
+        # El año de vigencia puede quedar a varias líneas del ancla ("Artículo 3. ... vigencia." y,
+        # tres líneas más abajo, "desde el 1 de enero de 2022..."): sin él no se guarda el convenio
+        "keep": re.compile(r"\b(19|20)\d{2}\b"),
+        "context": (1, 1),
+    },
+    "idc": {
+        "anchors": re.compile(r"tipos de cotizaci|\btotal\b", re.IGNORECASE),
+        "data": re.compile(r"\d"),
+        "context": (0, 1),
+    },
+}
+# Una frase sin cifras (4+ palabras) repetida en al menos esta fracción de páginas (y en 3 o más)
+# es plantilla: cabeceras de organismo, pies legales...
+BOILERPLATE_PAGE_SHARE = 0.5
+BOILERPLATE_MIN_PAGES = 3
+BOILERPLATE_MIN_WORDS = 4
+_DIGIT = re.compile(r"\d")
+
+
+def _line_key(line: str) -> str:
+    return " ".join(line.lower().split())
+
 
 class PDFProcessor:
-    def __init__(self):
+    def __init__(self, page_windowing: bool = None):
         self.extracted_data = []
+        if page_windowing is None:
+            page_windowing = os.getenv("PDF_PAGE_WINDOWING", "true") == "true"
+        self.page_windowing = page_windowing
 
     
     def generar_id(self, nombre_completo: str) -> str:
@@ -31,32 +89,163 @@ class PDFProcessor:
 
         return id_code.upper()
 
+    def content_hash(self, content) -> str:
+        """Huella SHA-256 de un PDF (bytes) o del texto de una página (str)."""
+        if isinstance(content, str):
+            content = content.encode("utf-8")
+        return hashlib.sha256(content).hexdigest()
+
+    def _open_document(self, file_input):
+        """Abre un PDF desde ruta, bytes o archivo subido por Streamlit sin pasar por disco."""
+        if isinstance(file_input, (bytes, bytearray, memoryview)):
+            return fitz.open(stream=bytes(file_input), filetype="pdf")
+        if hasattr(file_input, "getvalue"):  # Streamlit UploadedFile / BytesIO
+            return fitz.open(stream=file_input.getvalue(), filetype="pdf")
+        if hasattr(file_input, "read"):
+            return fitz.open(stream=file_input.read(), filetype="pdf")
+        return fitz.open(file_input)
+
+    def parse_pdf(self, file_input) -> Tuple[str, List[str]]:
+        """Extrae el texto de cada página una sola vez y devuelve (texto completo, páginas)."""
+        with metrics.timer("pdf_parse"), self._open_document(file_input) as doc:
+            pages = [page.get_text() for page in doc]
+        metrics.count("pages_parsed", len(pages), "pdf_parse")
+        return "".join(pages), pages
+
+    def parse_pdf_layout(self, file_input) -> Tuple[str, List[str], List[List[Tuple]]]:
+        """Como parse_pdf, añadiendo las palabras con coordenadas de cada página.
+
+        Las palabras siguen el formato de PyMuPDF: (x0, y0, x1, y1, palabra, bloque, línea, nº palabra).
+        """
+        with metrics.timer("pdf_parse"), self._open_document(file_input) as doc:
+            pages, words = [], []
+            for page in doc:
+                # Una sola extracción por página para el texto y las palabras
+                textpage = page.get_textpage()
+                pages.append(page.get_text(textpage=textpage))
+                words.append(page.get_text("words", textpage=textpage))
+        metrics.count("pages_parsed", len(pages), "pdf_parse")
+        return "".join(pages), pages, words
+
+    def boilerplate_lines(self, pages: List[str]) -> set:
+        """Sentences without figures (headers, legal footers) repeated across pages."""
+        page_counts: Dict[str, int] = {}
+        for page_text in pages:
+            for key in {_line_key(line) for line in page_text.splitlines()}:
+                if len(key.split()) >= BOILERPLATE_MIN_WORDS and not _DIGIT.search(key):
+                    page_counts[key] = page_counts.get(key, 0) + 1
+        threshold = max(BOILERPLATE_MIN_PAGES, BOILERPLATE_PAGE_SHARE * len(pages))
+        return {key for key, count in page_counts.items() if count >= threshold}
+
+    def window_page(self, text: str, doc_type: str, boilerplate: set = frozenset(),
+                    seen: Optional[set] = None) -> str:
+        """Keep only the regions of a page relevant to `doc_type`.
+
+        Anchor lines (labels such as "Periodo de liquidación") and their values are always
+        kept; repeated labels only once per page. Data lines that are document-wide boilerplate
+        only stay on the first page that has them (tracked in `seen`). Falls back to the full
+        text when nothing relevant is found.
+        """
+        rule = WINDOW_RULES.get(doc_type)
+        if rule is None:
+            return text
+        seen = set() if seen is None else seen
+        lines = [line.strip() for line in text.splitlines() if line.strip()]
+        before, after = rule["context"]
+
+        # Motivo por el que se conserva cada línea: ancla, contexto de un ancla o dato
+        reasons = [None] * len(lines)
+        for index, line in enumerate(lines):
+            if rule["anchors"].search(line):
+                for context_index in range(max(0, index - before), min(len(lines), index + after + 1)):
+                    reasons[context_index] = reasons[context_index] or "context"
+                reasons[index] = "anchor"
+            elif rule["data"] is not None and rule["data"].search(line) and reasons[index] is None:
+                reasons[index] = "data"
+            elif rule.get("keep") is not None and rule["keep"].search(line) and reasons[index] is None:
+                reasons[index] = "keep"
+
+        windowed, page_anchors = [], set()
+        for line, reason in zip(lines, reasons):
+            if reason is None:
+                continue
+            key = _line_key(line)
+            if reason == "anchor" and not _DIGIT.search(line):
+                # Etiquetas de columna repetidas en la misma página
+                if key in page_anchors:
+                    continue
+                page_anchors.add(key)
+            elif reason == "data" and key in boilerplate:
+                # Las anclas y sus valores se mantienen en todas las páginas: cada una puede ir sola al LLM
+                if key in seen:
+                    continue
+                seen.add(key)
+            windowed.append(line)
+
+        result = "\n".join(windowed)
+        if not result or (rule["data"] is not None and not rule["data"].search(result)):
+            return text
+        return result
+
+    def window_pages(self, pages: List[str], doc_types: List[str], all_pages: List[str] = None,
+                     page_numbers: List[int] = None) -> List[str]:
+        """window_page for the pages of one document, logging the token reduction of each.
+
+        Boilerplate is detected over `all_pages` (the whole document) when given.
+        Returns the pages unchanged if windowing is disabled (PDF_PAGE_WINDOWING=false).
+        """
+        if not self.page_windowing:
+            return list(pages)
+        boilerplate = self.boilerplate_lines(all_pages if all_pages is not None else pages)
+        seen = set()
+        windowed = []
+        for index, (page_text, doc_type) in enumerate(zip(pages, doc_types)):
+            result = self.window_page(page_text, doc_type, boilerplate, seen)
+            tokens_before, tokens_after = count_tokens(page_text), count_tokens(result)
+            metrics.count("tokens_before", tokens_before, "page_window")
+            metrics.count("tokens_after", tokens_after, "page_window")
+            metrics.event(
+                "page_window",
+                page=page_numbers[index] if page_numbers else index,
+                doc_type=doc_type,
+                tokens_before=tokens_before,
+                tokens_after=tokens_after,
+                reduction=round(1 - tokens_after / tokens_before, 3) if tokens_before else 0.0,
+            )
+            windowed.append(result)
+        return windowed
+
     def extract_text_from_pdf(self, file_input):
         """Extrae texto desde un archivo PDF, ya sea ruta o archivo subido por Streamlit"""
-        if hasattr(file_input, "read"):  # Si es BytesIO (Streamlit uploader)
-            doc = fitz.open(stream=file_input.read(), filetype="pdf")
-        else:  # Si es una ruta (str)
-            doc = fitz.open(file_input)
-
-        text = ""
-        for page in doc:
-            text += page.get_text()
-        doc.close()
-        return text
+        full_text, _ = self.parse_pdf(file_input)
+        return full_text
     
     def extract_text_by_page(self, pdf_path: str) -> List[str]:
-        doc = fitz.open(pdf_path)
-        return [page.get_text() for page in doc]
+        _, pages = self.parse_pdf(pdf_path)
+        return pages
+
+    def find_pdfs(self, directory_path: str, recursive: bool = True) -> List[str]:
+        """Rutas de los PDFs de un directorio (y sus subdirectorios), en orden estable."""
+        if not recursive:
+            return sorted(
+                os.path.join(directory_path, filename)
+                for filename in os.listdir(directory_path)
+                if filename.lower().endswith('.pdf')
+            )
+        paths = []
+        for root, dirs, files in os.walk(directory_path):
+            dirs.sort()
+            paths.extend(os.path.join(root, filename) for filename in sorted(files) if filename.lower().endswith('.pdf'))
+        return paths
 
-    def process_pdf_directory(self, directory_path: str) -> List[Dict[str, Any]]:
+    def process_pdf_directory(self, directory_path: str, recursive: bool = False) -> List[Dict[str, Any]]:
         """Process all PDFs in a directory."""
         processed_files = []
-        for filename in os.listdir(directory_path):
-            if filename.endswith('.pdf'):
-                file_path = os.path.join(directory_path, filename)
-                text_content = self.extract_text_from_pdf(file_path)
-                processed_files.append({
-                    'filename': filename,
-                    'content': text_content
-                })
+        for file_path in self.find_pdfs(directory_path, recursive=recursive):
+            text_content = self.extract_text_from_pdf(file_path)
+            processed_files.append({
+                'filename': os.path.basename(file_path),
+                'path': file_path,
+                'content': text_content
+            })
         return processed_files
@@ -0,0 +1,174 @@
+# task_allocator.py
+"""Asignación local de horas de proyecto a trabajadores, a coste mínimo.
+
+Cada fase pide unas horas en un año; cada trabajador ofrece como mucho sus horas de
+convenio anuales (por la fracción de dedicación) a su coste/hora. Como el coste de una
+hora no depende de la fase, el problema lineal de coste mínimo se resuelve exactamente
+llenando primero la capacidad más barata (una vez reservadas las horas ya planificadas):
+un recorrido voraz, determinista y en milisegundos. El LLM solo explica el resultado.
+"""
+import math
+import re
+import unicodedata
+from typing import Any, Dict, List, Optional, Tuple
+
+# Las horas se redondean a esta resolución (cuartos de hora)
+HOURS_RESOLUTION = 0.25
+
+
+def _round_hours(hours: float) -> float:
+    return round(round(hours / HOURS_RESOLUTION) * HOURS_RESOLUTION, 2)
+
+
+def _name_key(name) -> frozenset:
+    """Name tokens without accents or order: "GARCÍA FONTECHA, JOSE" == "Jose Garcia Fontecha"."""
+    text = unicodedata.normalize("NFKD", str(name or ""))
+    text = "".join(c for c in text if not unicodedata.combining(c)).lower()
+    return frozenset(re.findall(r"[a-z0-9]+", text))
+
+
+def _number(value) -> Optional[float]:
+    try:
+        return float(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+class TaskAllocator:
+    """Greedy min-cost allocation of phase hours over worker availability."""
+
+    def __init__(self, dedication: float = 1.0):
+        # Fracción de las horas de convenio disponible para el proyecto
+        self.dedication = dedication
+
+    def _capacity(self, workers: List[Dict[str, Any]]) -> Tuple[Dict[int, List[Dict[str, Any]]], List[str]]:
+        """Available workers per year, cheapest first, and warnings for unusable rows."""
+        by_year: Dict[int, List[Dict[str, Any]]] = {}
+        warnings = []
+        for row in workers:
+            cost = _number(row.get("coste_hora"))
+            hours = _number(row.get("horas_convenio_anuales"))
+            name = row.get("worker_name") or row.get("worker_id")
+            if cost is None or hours is None or hours <= 0:
+                warnings.append(f"{name} ({row.get('year')}): sin coste por hora u horas de convenio, no se asigna")
+                continue
+            by_year.setdefault(int(row["year"]), []).append({
+                "worker_id": row.get("worker_id"),
+                "trabajador": name,
+                "company_id": row.get("company_id"),
+                "coste_por_hora": cost,
+                "disponibles": hours * self.dedication,
+            })
+        for candidates in by_year.values():
+            candidates.sort(key=lambda candidate: (candidate["coste_por_hora"], str(candidate["worker_id"])))
+        return by_year, warnings
+
+    @staticmethod
+    def _find(candidates: List[Dict[str, Any]], worker: str) -> Optional[Dict[str, Any]]:
+        key = _name_key(worker)
+        for candidate in candidates:
+            if key and key in (_name_key(candidate["worker_id"]), _name_key(candidate["trabajador"])):
+                return candidate
+        return None
+
+    def allocate(self, phases: List[Dict[str, Any]], workers: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Assign every phase's hours; returns the `asignacion` JSON plus totals and warnings.
+
+        `phases`: [{"fase": str, "horas": float, "year": int (optional, latest year by
+        default), "asignaciones": [{"trabajador": name or worker_id, "horas": float}] (optional)}].
+        Fixed `asignaciones` (hours already planned per worker) of every phase are reserved
+        first and only checked against availability; the rest of each phase then goes to the
+        cheapest capacity left, which keeps the fill optimal around the fixed hours.
+        `workers`: rows like Database.get_workers_data.
+        """
+        by_year, warnings = self._capacity(workers)
+        default_year = max(by_year) if by_year else None
+        assignment: List[Dict[str, Any]] = []
+        unassigned: Dict[str, float] = {}
+
+        # Una línea por fase y trabajador, aunque reciba horas fijas y libres
+        lines: Dict[Tuple[str, int], Dict[str, Any]] = {}
+
+        def assign(phase_name, candidate, hours):
+            line = lines.get((phase_name, id(candidate)))
+            if line is None:
+                line = lines[(phase_name, id(candidate))] = {
+                    "fase": phase_name,
+                    "trabajador": candidate["trabajador"],
+                    "worker_id": candidate["worker_id"],
+                    "horas_asignadas": 0.0,
+                    "coste_por_hora": round(candidate["coste_por_hora"], 2),
+                    "coste_total": 0.0,
+                }
+                assignment.append(line)
+            line["horas_asignadas"] = round(line["horas_asignadas"] + hours, 2)
+            line["coste_total"] = round(line["horas_asignadas"] * candidate["coste_por_hora"], 2)
+            candidate["disponibles"] -= hours
+
+        # 1) Horas fijas de todas las fases antes de repartir nada: si no, una fase anterior
+        #    podría ocupar con horas libres la capacidad que otra ya tenía planificada
+        plans = []
+        for phase in phases:
+            phase_name = str(phase.get("fase") or "Sin nombre")
+            pending = _number(phase.get("horas")) or 0.0
+            year = int(phase["year"]) if phase.get("year") not in (None, "") else default_year
+            candidates = by_year.get(year, [])
+            if not candidates:
+                warnings.append(f"{phase_name}: no hay trabajadores con coste para {year}")
+                if pending > 0:
+                    unassigned[phase_name] = _round_hours(pending)
+                continue
+
+            for fixed in phase.get("asignaciones") or []:
+                hours = _round_hours(_number(fixed.get("horas")) or 0.0)
+                candidate = self._find(candidates, fixed.get("trabajador", ""))
+                if candidate is None:
+                    warnings.append(f"{phase_name}: {fixed.get('trabajador')} no tiene coste por hora en {year}")
+                    continue
+                if hours > candidate["disponibles"] + 1e-9:
+                    warnings.append(
+                        f"Sobreasignación: {candidate['trabajador']} en {phase_name} ({year}) tiene {hours} h "
+                        f"planificadas y solo {max(candidate['disponibles'], 0):.2f} h disponibles"
+                    )
+                assign(phase_name, candidate, hours)
+                pending -= hours
+            plans.append((phase_name, year, candidates, pending))
+
+        # 2) Resto de cada fase: primero los trabajadores más baratos con horas libres
+        for phase_name, year, candidates, pending in plans:
+            for candidate in candidates:
+                if pending <= 0:
+                    break
+                free = math.floor(candidate["disponibles"] / HOURS_RESOLUTION) * HOURS_RESOLUTION
+                hours = _round_hours(min(pending, free))
+                if hours <= 0:
+                    continue
+                assign(phase_name, candidate, hours)
+                pending -= hours
+
+            if pending > HOURS_RESOLUTION / 2:
+                unassigned[phase_name] = _round_hours(pending)
+                warnings.append(f"Sobreasignación: a {phase_name} ({year}) le faltan {unassigned[phase_name]} h "
+                                f"por falta de disponibilidad")
+
+        # Líneas en el orden de las fases
+        order = {str(phase.get("fase") or "Sin nombre"): index for index, phase in enumerate(phases)}
+        assignment.sort(key=lambda line: order.get(line["fase"], len(order)))
+
+        return {
+            "asignacion": assignment,
+            "coste_por_fase": self._totals(assignment, "fase"),
+            "coste_por_trabajador": self._totals(assignment, "trabajador"),
+            "coste_total": round(sum(item["coste_total"] for item in assignment), 2),
+            "horas_sin_asignar": unassigned,
+            "advertencias": warnings,
+        }
+
+    @staticmethod
+    def _totals(assignment: List[Dict[str, Any]], field: str) -> List[Dict[str, Any]]:
+        totals: Dict[str, Dict[str, Any]] = {}
+        for item in assignment:
+            total = totals.setdefault(item[field], {field: item[field], "horas": 0.0, "coste_total": 0.0})
+            total["horas"] = round(total["horas"] + item["horas_asignadas"], 2)
+            total["coste_total"] = round(total["coste_total"] + item["coste_total"], 2)
+        return list(totals.values())
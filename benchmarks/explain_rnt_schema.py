@@ -0,0 +1,145 @@
+# explain_rnt_schema.py
+"""Comparación del esquema de contingencias_comunes antes y después de la migración 4.
+
+Uso:
+    python benchmarks/explain_rnt_schema.py --dsn "host=localhost dbname=tfm_bench user=postgres" --workers 20000
+
+Crea el esquema hasta la versión 3 (tabla única con la clave de siete columnas), lo llena con
+datos sintéticos (un RNT mensual por trabajador y año), mide con EXPLAIN (ANALYZE, BUFFERS) el
+recálculo de costes completo, el parcial y la inserción de un RNT nuevo, aplica la migración 4
+(particiones por año y clave por trabajador, año, empresa y periodo) y repite las medidas.
+¡Borra todas las tablas de la base indicada! Úsese con una base de pruebas.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app"))
+
+from database import Database, _WORKER_COSTS_SELECT, _worker_costs_filter
+
+
+def load_data(db: Database, workers: int, companies: int, first_year: int, last_year: int):
+    with db.cursor() as cur:
+        cur.execute("""
+            INSERT INTO workers (worker_id, year, worker_name, percepcion_integra, company_id, company_name)
+            SELECT 'W' || lpad(w::text, 7, '0'), y, 'TRABAJADOR ' || w, 18000 + (w %% 997) * 41,
+                   'B' || lpad((w %% %(companies)s)::text, 8, '0'), 'EMPRESA ' || (w %% %(companies)s)
+            FROM generate_series(1, %(workers)s) w, generate_series(%(first_year)s, %(last_year)s) y
+        """, {"workers": workers, "companies": companies, "first_year": first_year, "last_year": last_year})
+        cur.execute("""
+            INSERT INTO contingencias_comunes (
+                worker_id, year, base_contingencias_comunes, dias_cotizados, periodo, company_id, company_name
+            )
+            SELECT worker_id, year, round((1200 + random() * 2800)::numeric, 2), 30,
+                   '01-' || lpad(m::text, 2, '0') || '-' || year, company_id, company_name
+            FROM workers, generate_series(1, 12) m
+        """)
+        cur.execute("""
+            INSERT INTO convenio (year, horas_convenio_anuales)
+            SELECT y, 1760 FROM generate_series(%s, %s) y
+            ON CONFLICT (year) DO NOTHING
+        """, (first_year, last_year))
+        cur.execute("ANALYZE")
+    db.refresh_worker_costs()
+
+
+def explain(db: Database, query: str, params=None, repeat: int = 3, rollback: bool = False):
+    """Best execution time (ms) and shared buffers touched over `repeat` runs."""
+    best = None
+    for _ in range(repeat):
+        with db.pool.connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute("EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) " + query, params)
+                plan = cur.fetchone()[0][0]
+            if rollback:
+                conn.rollback()
+        result = {
+            "ms": round(plan["Execution Time"], 2),
+            "buffers": plan["Plan"].get("Shared Hit Blocks", 0) + plan["Plan"].get("Shared Read Blocks", 0),
+        }
+        if best is None or result["ms"] < best["ms"]:
+            best = result
+    return best
+
+
+def sizes(db: Database):
+    with db.cursor() as cur:
+        cur.execute("""
+            SELECT sum(pg_relation_size(relid)), sum(pg_indexes_size(relid))
+            FROM pg_partition_tree('contingencias_comunes')
+        """)
+        table, indexes = cur.fetchone()
+    return {"table_mb": round(table / 1e6, 1), "indexes_mb": round(indexes / 1e6, 1)}
+
+
+def measure(db: Database, workers: int, last_year: int, repeat: int):
+    full = _WORKER_COSTS_SELECT.format(contingencias_filter="true", workers_filter="true")
+    partial = _WORKER_COSTS_SELECT.format(
+        contingencias_filter=_worker_costs_filter("contingencias_comunes"),
+        workers_filter=_worker_costs_filter("workers"),
+    )
+    # Un documento típico: 200 trabajadores de un año
+    sample = [f"W{w:07d}" for w in range(1, workers + 1, max(workers // 200, 1))][:200]
+    params = {"worker_ids": sample, "worker_years": [last_year] * len(sample), "years": []}
+    # Un RNT nuevo de 1.000 trabajadores (se deshace al terminar)
+    insert = f"""
+        INSERT INTO contingencias_comunes (
+            worker_id, year, base_contingencias_comunes, dias_cotizados, periodo, company_id, company_name
+        )
+        SELECT 'N' || lpad(n::text, 7, '0'), {last_year}, 2500.00, 30, '01-12-{last_year}', 'B00000001', 'EMPRESA 1'
+        FROM generate_series(1, 1000) n
+        ON CONFLICT DO NOTHING
+    """
+    return dict(
+        sizes(db),
+        full_refresh=explain(db, full, repeat=repeat),
+        partial_refresh=explain(db, partial, params, repeat=repeat),
+        insert_rnt=explain(db, insert, repeat=repeat, rollback=True),
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="EXPLAIN de contingencias_comunes antes y después de la migración 4")
+    parser.add_argument("--dsn", required=True, help="Conexión a una base de pruebas (se borran todas las tablas)")
+    parser.add_argument("--workers", type=int, default=20000, help="Trabajadores por año")
+    parser.add_argument("--companies", type=int, default=50, help="Empresas")
+    parser.add_argument("--years", type=int, default=4, help="Años de histórico")
+    parser.add_argument("--repeat", type=int, default=3, help="Ejecuciones por medida (se toma la mejor)")
+    parser.add_argument("--json", metavar="RUTA", help="Guardar el informe en JSON")
+    args = parser.parse_args()
+
+    last_year = time.localtime().tm_year - 1
+    first_year = last_year - args.years + 1
+
+    db = Database(args.dsn)
+    db.clean_database()
+    db.migrate(target=3)
+    print(f"Cargando {args.workers} trabajadores x {args.years} años x 12 meses...")
+    load_data(db, args.workers, args.companies, first_year, last_year)
+    before = measure(db, args.workers, last_year, args.repeat)
+
+    start = time.perf_counter()
+    db.migrate()
+    migration_seconds = time.perf_counter() - start
+    after = measure(db, args.workers, last_year, args.repeat)
+
+    print()
+    print(f"{'':22}{'v3 (antes)':>18}{'v4 (después)':>18}")
+    print(f"{'Tabla (MB)':22}{before['table_mb']:>18}{after['table_mb']:>18}")
+    print(f"{'Índices (MB)':22}{before['indexes_mb']:>18}{after['indexes_mb']:>18}")
+    for key, label in (("full_refresh", "Recálculo completo"), ("partial_refresh", "Recálculo parcial"),
+                       ("insert_rnt", "Insertar RNT (1.000)")):
+        print(f"{label:22}{before[key]['ms']:>12} ms {before[key]['buffers']:>4}b"
+              f"{after[key]['ms']:>12} ms {after[key]['buffers']:>4}b")
+    print(f"Migración: {migration_seconds:.1f}s")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"before": before, "after": after, "migration_seconds": migration_seconds}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,223 @@
+# llm_stub.py
+"""Servidor local compatible con /v1/chat/completions de OpenAI para las pruebas de rendimiento.
+
+Responde con una latencia configurable y con datos leídos con expresiones regulares del
+texto de los PDFs sintéticos (ver synthetic_pdfs.py), tanto por página como en lote.
+
+Uso independiente: python benchmarks/llm_stub.py --port 8089 --latency-ms 800
+"""
+import argparse
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+
+CONTENT_MARKER = "Contenido del documento:"
+BATCH_MARKER = "⚠️ MODO POR LOTES"
+PAGE_MARKER = re.compile(r"^\s*### PÁGINA (\d+)\s*$", re.MULTILINE)
+
+RNT_ROW = re.compile(r"^([A-Z]{5})\s+([\d.]+,\d{2})\s+(\d{1,2})\s*$", re.MULTILINE)
+PERIODO = re.compile(r"Periodo de liquidación\s+(\d{2})/(\d{4})")
+COMPANY_ID = re.compile(r"(?:Código de empresario|NIF del declarante|NIF del pagador|NIF):\s*(\S+)")
+COMPANY_NAME = re.compile(r"(?:Razón social|razón social):\s*(.+)")
+WORKER_NAME = re.compile(r"Apellidos y nombre del perceptor:\s*(.+)")
+AMOUNT = re.compile(r"(?:Percepción íntegra|Rendimiento a integrar)\s+([\d.]+,\d{2})")
+YEAR = re.compile(r"Ejercicio\s+(\d{4})")
+HOURS = re.compile(r"(\d\.?\d{3})\s*horas")
+VALID_UNTIL = re.compile(r"hasta el 31 de diciembre de (\d{4})")
+
+
+def _number(value: str) -> float:
+    return float(value.replace(".", "").replace(",", "."))
+
+
+def _first(pattern, text: str) -> Optional[str]:
+    match = pattern.search(text)
+    return match.group(1).strip() if match else None
+
+
+def _doc_type(prompt: str) -> str:
+    if "RNT mensuales" in prompt:
+        return "rnt"
+    if "convenios laborales" in prompt:
+        return "convenio"
+    if "Documento 10T" in prompt:
+        return "10t"
+    if "documentos IDC" in prompt:
+        return "idc"
+    return "modelo_190"
+
+
+def extract(doc_type: str, text: str) -> Any:
+    """What a well-behaved model would answer for one synthetic page."""
+    if doc_type == "rnt":
+        periodo = PERIODO.search(text)
+        month, year = (periodo.group(1), int(periodo.group(2))) if periodo else ("01", None)
+        return {"trabajadores": [
+            {
+                "worker_id": caf,
+                "base_contingencias_comunes": _number(base),
+                "dias_cotizados": int(days),
+                "periodo": f"01-{month}-{year}",
+                "year": year,
+                "company_id": _first(COMPANY_ID, text),
+                "company_name": _first(COMPANY_NAME, text),
+            }
+            for caf, base, days in RNT_ROW.findall(text)
+        ]}
+    if doc_type == "convenio":
+        hours = _first(HOURS, text)
+        year = _first(VALID_UNTIL, text)
+        return {"horas_convenio_anuales": int(hours.replace(".", "")) if hours else None,
+                "year": int(year) if year else None}
+    if doc_type == "idc":
+        return {"porcentaje_total_it": 1.5}
+    name = _first(WORKER_NAME, text) or ""
+    amount = _first(AMOUNT, text)
+    year = _first(YEAR, text)
+    return {
+        "worker_name": name,
+        "percepcion_integra": _number(amount) if amount else None,
+        "year": int(year) if year else None,
+        "company_name": _first(COMPANY_NAME, text) or "no definido",
+        "company_id": _first(COMPANY_ID, text) or "no definido",
+    }
+
+
+def answer(prompt: str) -> str:
+    """Model output for an extraction prompt (single page or batch)."""
+    doc_type = _doc_type(prompt)
+    content = prompt.rsplit(CONTENT_MARKER, 1)[-1].split(BATCH_MARKER, 1)[0]
+    if BATCH_MARKER not in prompt:
+        data = extract(doc_type, content)
+        return json.dumps(data["trabajadores"] if doc_type == "rnt" else data, ensure_ascii=False)
+
+    parts = PAGE_MARKER.split(content)
+    # parts = [prefijo, n1, texto1, n2, texto2, ...]
+    pages = [{"page": int(parts[i]), "data": extract(doc_type, parts[i + 1])} for i in range(1, len(parts) - 1, 2)]
+    return json.dumps(pages, ensure_ascii=False)
+
+
+class StubServer:
+    """Threaded HTTP server answering chat completions after `latency_ms` ± `jitter_ms`.
+
+    With `rpm_limit` it behaves like a quota: past that many requests in the last minute
+    it answers 429 with Retry-After.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency_ms: float = 500, jitter_ms: float = 0,
+                 seconds_per_1k_tokens: float = 0.0, rpm_limit: int = 0):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        # Coste adicional proporcional a la longitud del prompt (peticiones en lote más lentas)
+        self.seconds_per_1k_tokens = seconds_per_1k_tokens
+        self.requests = 0
+        self.rpm_limit = rpm_limit
+        self.rejected = 0
+        self._accepted = deque()
+        self._lock = threading.Lock()
+        self.server = ThreadingHTTPServer((host, port), self._handler())
+        self.server.daemon_threads = True
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start(self) -> "StubServer":
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def _delay(self, prompt_tokens: int) -> float:
+        jitter = random.uniform(-self.jitter_ms, self.jitter_ms) if self.jitter_ms else 0.0
+        return max(0.0, (self.latency_ms + jitter) / 1000) + self.seconds_per_1k_tokens * prompt_tokens / 1000
+
+    def _admit(self) -> float:
+        """0 if the request fits in the quota, otherwise the seconds until it would."""
+        now = time.monotonic()
+        with self._lock:
+            while self._accepted and now - self._accepted[0] >= 60:
+                self._accepted.popleft()
+            if self.rpm_limit and len(self._accepted) >= self.rpm_limit:
+                self.rejected += 1
+                return 60 - (now - self._accepted[0])
+            self._accepted.append(now)
+            self.requests += 1
+            return 0.0
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                if not self.path.rstrip("/").endswith("/chat/completions"):
+                    self.send_response(404)
+                    self.end_headers()
+                    return
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                messages: List[Dict[str, str]] = body.get("messages", [])
+                prompt = messages[-1]["content"] if messages else ""
+                retry_after = stub._admit()
+                if retry_after:
+                    payload = json.dumps({"error": {"message": "Rate limit reached", "type": "requests",
+                                                    "code": "rate_limit_exceeded"}}).encode("utf-8")
+                    self.send_response(429)
+                    self.send_header("Content-Type", "application/json")
+                    self.send_header("Retry-After", f"{retry_after:.3f}")
+                    self.send_header("Content-Length", str(len(payload)))
+                    self.end_headers()
+                    self.wfile.write(payload)
+                    return
+                content = answer(prompt)
+                prompt_tokens = sum(len(m.get("content", "")) for m in messages) // 4
+                time.sleep(stub._delay(prompt_tokens))
+
+                payload = json.dumps({
+                    "id": f"chatcmpl-{uuid.uuid4().hex}",
+                    "object": "chat.completion",
+                    "created": int(time.time()),
+                    "model": body.get("model", "stub"),
+                    "choices": [{"index": 0, "finish_reason": "stop",
+                                 "message": {"role": "assistant", "content": content}}],
+                    "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": len(content) // 4,
+                              "total_tokens": prompt_tokens + len(content) // 4},
+                }, ensure_ascii=False).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Servidor local compatible con la API de OpenAI")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--latency-ms", type=float, default=500)
+    parser.add_argument("--jitter-ms", type=float, default=0)
+    args = parser.parse_args()
+
+    stub = StubServer(args.host, args.port, args.latency_ms, args.jitter_ms)
+    print(f"Escuchando en {stub.base_url} (OPENAI_BASE_URL)")
+    try:
+        stub.server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+# run_ingestion.py
+"""Prueba de rendimiento de la ingesta, sin red: PDFs sintéticos, LLM local simulado y Postgres local.
+
+Uso:
+    python benchmarks/run_ingestion.py --pages 50 --latency-ms 800 --dsn "host=localhost dbname=tfm_bench user=postgres"
+
+Los documentos pasan por ChatBot.process_uploaded_files -> ingestion.ingest_file, igual que
+en la página de chat. Al terminar muestra páginas/s, latencia por página (p50/p95),
+peticiones al LLM y el tiempo pasado en la base de datos.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+import uuid
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app"))
+
+from llm_stub import StubServer
+from synthetic_pdfs import DOC_TYPES, build_pdf, make_workers
+
+
+class UploadedPDF:
+    """Minimal stand-in for Streamlit's UploadedFile (name + getvalue)."""
+
+    def __init__(self, name: str, content: bytes):
+        self.name = name
+        self._content = content
+
+    def getvalue(self) -> bytes:
+        return self._content
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de ingesta con PDFs sintéticos y LLM simulado")
+    parser.add_argument("--pages", type=int, default=50, help="Páginas por documento")
+    parser.add_argument("--docs", type=int, default=1, help="Documentos por tipo")
+    parser.add_argument("--types", default=",".join(DOC_TYPES), help="Tipos a generar, separados por comas")
+    parser.add_argument("--workers", type=int, default=40, help="Trabajadores distintos en los documentos")
+    parser.add_argument("--rnt-rows", type=int, default=20, help="Filas por página de RNT")
+    parser.add_argument("--latency-ms", type=float, default=500, help="Latencia simulada por petición al LLM")
+    parser.add_argument("--jitter-ms", type=float, default=100, help="Variación aleatoria de la latencia")
+    parser.add_argument("--ms-per-1k-tokens", type=float, default=0, help="Latencia extra por cada 1000 tokens de prompt")
+    parser.add_argument("--concurrency", type=int, help="LLM_MAX_CONCURRENCY")
+    parser.add_argument("--no-batch", action="store_true", help="Una petición por página")
+    parser.add_argument("--stub-rpm", type=int, default=0, help="Cuota del LLM simulado: 429 pasadas N peticiones/min")
+    parser.add_argument("--rpm", type=float, help="LLM_RPM: límite de peticiones/min del cliente")
+    parser.add_argument("--dsn", default=os.getenv("BENCH_DB_DSN"),
+                        help="Conexión a Postgres (por defecto BENCH_DB_DSN o las variables DB_*)")
+    parser.add_argument("--reset", action="store_true", help="Borrar las tablas antes de empezar (¡destructivo!)")
+    parser.add_argument("--json", metavar="RUTA", help="Guardar el informe en JSON")
+    args = parser.parse_args()
+
+    # Todo en local: el cliente de OpenAI apunta al servidor simulado y sin caché de extracciones
+    stub = StubServer(latency_ms=args.latency_ms, jitter_ms=args.jitter_ms,
+                      seconds_per_1k_tokens=args.ms_per_1k_tokens / 1000, rpm_limit=args.stub_rpm).start()
+    os.environ["OPENAI_BASE_URL"] = stub.base_url
+    os.environ["LLM_CACHE"] = "false"
+    if args.concurrency:
+        os.environ["LLM_MAX_CONCURRENCY"] = str(args.concurrency)
+    if args.rpm:
+        os.environ["LLM_RPM"] = str(args.rpm)
+
+    from chatbot import ChatBot
+    from database import Database
+    from llm_classifier import LLMClassifier
+    from metrics import metrics
+    from pdf_preprocessor import PDFProcessor
+
+    db = Database(args.dsn) if args.dsn else Database()
+    if args.reset:
+        db.clean_database()
+    db.create_tables()
+    pdf_processor = PDFProcessor()
+    llm_classifier = LLMClassifier(api_key="benchmark", batch_extraction=not args.no_batch)
+    chatbot = ChatBot(api_key="benchmark")
+
+    # Etiqueta por ejecución: páginas nuevas, que no se saltan como ya ingeridas
+    tag = uuid.uuid4().hex[:8]
+    workers = make_workers(args.workers)
+    generation_start = time.perf_counter()
+    files = [
+        UploadedPDF(f"bench_{tag}_{doc_type}_{doc}.pdf",
+                    build_pdf(doc_type, args.pages, workers, rnt_rows=args.rnt_rows, tag=f"{tag}-{doc}"))
+        for doc_type in args.types.split(",")
+        for doc in range(args.docs)
+    ]
+    generation_seconds = time.perf_counter() - generation_start
+    total_pages = len(files) * args.pages
+    print(f"{len(files)} PDFs sintéticos ({total_pages} páginas) generados en {generation_seconds:.1f}s; "
+          f"LLM simulado en {stub.base_url} ({args.latency_ms:.0f}±{args.jitter_ms:.0f} ms)")
+
+    metrics.reset()
+    start = time.perf_counter()
+    processed = chatbot.process_uploaded_files(files, pdf_processor, llm_classifier, db)
+    elapsed = time.perf_counter() - start
+    stub.stop()
+
+    snapshot = metrics.snapshot()
+    timers, counters = snapshot["timers"], snapshot["counters"]
+    stage_sum = lambda stage: timers.get(stage, {}).get("sum", 0.0)
+    report = {
+        "documents": len(files),
+        "pages": total_pages,
+        "pages_processed": sum(1 for message in processed if " página " in message),
+        "seconds": round(elapsed, 3),
+        "pages_per_second": round(total_pages / elapsed, 2) if elapsed else None,
+        "page_latency_p50": round(metrics.percentile("extract_page", 0.5), 4),
+        "page_latency_p95": round(metrics.percentile("extract_page", 0.95), 4),
+        "llm_requests": stub.requests,
+        "llm_rejected": stub.rejected,
+        "llm_client": llm_classifier.llm.stats(),
+        "llm_request_p50": round(metrics.percentile("llm_request", 0.5), 4),
+        "llm_request_p95": round(metrics.percentile("llm_request", 0.95), 4),
+        "pdf_parse_seconds": round(stage_sum("pdf_parse"), 3),
+        "db_seconds": round(stage_sum("db_ingest"), 3),
+        "db_refresh_costs_seconds": round(stage_sum("db_refresh_costs"), 3),
+        "window_tokens_before": counters.get("tokens_before/page_window", 0),
+        "window_tokens_after": counters.get("tokens_after/page_window", 0),
+        "extraction": llm_classifier.extraction_stats(),
+        "batched": not args.no_batch,
+        "latency_ms": args.latency_ms,
+    }
+
+    print()
+    print(f"Páginas: {report['pages_processed']}/{total_pages}  Tiempo: {elapsed:.2f}s  ->  {report['pages_per_second']} págs/s")
+    print(f"Latencia por página: p50 {report['page_latency_p50'] * 1000:.0f} ms  p95 {report['page_latency_p95'] * 1000:.0f} ms")
+    print(f"Peticiones al LLM: {report['llm_requests']}  (p50 {report['llm_request_p50'] * 1000:.0f} ms, "
+          f"p95 {report['llm_request_p95'] * 1000:.0f} ms)")
+    client = report["llm_client"]
+    if stub.rejected or client["retries"] or client["throttled_seconds"]:
+        print(f"Cuota: {stub.rejected} rechazadas (429), {client['retries']} reintentos, "
+              f"{client['throttled_seconds']:.1f}s de espera del limitador, {client['backoff_seconds']:.1f}s de backoff")
+    print(f"Parseo PDF: {report['pdf_parse_seconds']}s  Base de datos: {report['db_seconds']}s "
+          f"(de ellos recálculo de costes {report['db_refresh_costs_seconds']}s)")
+    if report["window_tokens_before"]:
+        print(f"Tokens de página enviados: {report['window_tokens_after']}/{report['window_tokens_before']} "
+              f"({1 - report['window_tokens_after'] / report['window_tokens_before']:.0%} menos)")
+    for message in processed:
+        if " página " not in message:
+            print(message)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
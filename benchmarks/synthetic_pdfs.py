@@ -0,0 +1,118 @@
+# synthetic_pdfs.py
+"""PDFs sintéticos (Modelo 190, 10T, RNT y convenio) para las pruebas de rendimiento.
+
+Siguen las etiquetas de los documentos reales, de modo que recorren el mismo camino
+que en producción: el 190 y el 10T se leen en local (LayoutExtractor) y el RNT y el
+convenio se envían al LLM.
+"""
+import random
+from typing import Dict, List
+
+import fitz  # PyMuPDF
+
+FIRST_NAMES = ["JOSE", "ANDREA", "LUCIA", "PABLO", "MARTA", "JAVIER", "ELENA", "DAVID", "NURIA", "CARLOS"]
+SURNAMES = ["GARCIA", "FONTECHA", "SAEZ", "BENITO", "LOPEZ", "MARTIN", "RUIZ", "MORENO", "NAVARRO",
+            "TORRES", "ROMERO", "VIDAL", "IGLESIAS", "ORTEGA", "CASTRO", "MOLINA"]
+COMPANY_ID = "B24532178"
+COMPANY_NAME = "TALLERES SINTETICOS, SL"
+DOC_TYPES = ("modelo_190", "10t", "rnt", "convenio")
+
+
+def european(amount: float) -> str:
+    """24214.44 -> '24.214,44'."""
+    return f"{amount:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
+
+
+def make_workers(count: int, seed: int = 0) -> List[Dict[str, str]]:
+    """Workers with distinct two-surname names, e.g. "GARCIA FONTECHA, JOSE"."""
+    rng = random.Random(seed)
+    workers, seen = [], set()
+    while len(workers) < count:
+        name = f"{rng.choice(SURNAMES)} {rng.choice(SURNAMES)}, {rng.choice(FIRST_NAMES)}"
+        if name in seen:
+            continue
+        seen.add(name)
+        workers.append({"name": name, "salary": round(rng.uniform(18000, 60000), 2)})
+    return workers
+
+
+def _add_page(doc, lines: List[str], footer: str):
+    page = doc.new_page(width=595, height=842)
+    y = 60
+    for line in lines:
+        page.insert_text((50, y), line, fontsize=10)
+        y += 16
+    page.insert_text((50, 810), footer, fontsize=8)
+
+
+def build_pdf(doc_type: str, pages: int, workers: List[Dict[str, str]], year: int = 2023,
+              rnt_rows: int = 20, tag: str = "") -> bytes:
+    """One synthetic PDF of `doc_type` with `pages` pages.
+
+    `tag` goes into every page footer so that separate runs produce new page hashes
+    (and are not skipped as already ingested).
+    """
+    doc = fitz.open()
+    rng = random.Random(f"{doc_type}-{tag}")
+    for page_num in range(pages):
+        footer = f"Ref. {tag} {doc_type} pagina {page_num + 1} de {pages}"
+        worker = workers[page_num % len(workers)]
+
+        if doc_type == "modelo_190":
+            lines = [
+                "MODELO 190 - Certificado de retenciones e ingresos a cuenta",
+                f"Ejercicio {year}",
+                f"NIF del declarante: {COMPANY_ID}",
+                f"Apellidos y nombre o razón social: {COMPANY_NAME}",
+                f"Apellidos y nombre del perceptor: {worker['name']}",
+                f"Percepción íntegra {european(worker['salary'])}",
+                f"Retenciones practicadas {european(worker['salary'] * 0.15)}",
+            ]
+        elif doc_type == "10t":
+            lines = [
+                "Documento 10T - Certificado de retenciones",
+                f"Ejercicio {year}",
+                f"NIF del pagador: {COMPANY_ID}",
+                f"Apellidos y nombre o razón social: {COMPANY_NAME}",
+                f"Apellidos y nombre del perceptor: {worker['name']}",
+                f"Rendimiento a integrar {european(worker['salary'])}",
+            ]
+        elif doc_type == "rnt":
+            month = page_num % 12 + 1
+            lines = [
+                "Relación Nominal de Trabajadores (RNT)",
+                f"Razón social: {COMPANY_NAME}",
+                f"Código de empresario: {COMPANY_ID}",
+                f"Periodo de liquidación {month:02d}/{year}-{month:02d}/{year}",
+                "CAF    Base de contingencias comunes    Días",
+            ]
+            for row in range(min(rnt_rows, len(workers))):
+                caf = _caf(workers[(page_num * rnt_rows + row) % len(workers)]["name"])
+                lines.append(f"{caf}    {european(rng.uniform(1500, 4500))}    {rng.choice((30, 30, 30, 28, 15))}")
+        elif doc_type == "convenio":
+            lines = [f"Convenio colectivo del sector metal - Artículo {page_num + 1}"]
+            if page_num == 0:
+                lines += [
+                    f"La jornada máxima será de {european(1760)[:-3]} horas anuales de trabajo efectivo.",
+                    f"El convenio tendrá vigencia desde el 1 de enero de {year - 2} hasta el 31 de diciembre de {year}.",
+                ]
+            else:
+                lines += [
+                    "La distribución irregular de la jornada no podrá superar las nueve horas diarias.",
+                    "Las horas extraordinarias se compensarán preferentemente con descanso.",
+                ]
+        else:
+            raise ValueError(f"Tipo de documento no soportado: {doc_type}")
+
+        _add_page(doc, lines, footer)
+
+    content = doc.tobytes()
+    doc.close()
+    return content
+
+
+def _caf(name: str) -> str:
+    """Same identifier as PDFProcessor.generar_id for "APELLIDO1 APELLIDO2, NOMBRE"."""
+    surnames, first_name = map(str.strip, name.split(",", 1))
+    first, second = surnames.split()[:2]
+    return first[:2] + second[:2] + first_name[0]
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Los módulos de app/ se importan por nombre, igual que al ejecutar la aplicación
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app"))
@@ -0,0 +1,48 @@
+import pytest
+
+from layout_extractor import LayoutExtractor, parse_european_number
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("24.214,44", 24214.44),
+    ("24 214,44", 24214.44),
+    ("24 214,44 €", 24214.44),
+    ("24,214.44", 24214.44),
+    ("24214.44", 24214.44),
+    ("1.708", 1708.0),
+    ("1.234.567", 1234567.0),
+    ("3170,19", 3170.19),
+    ("", None),
+    ("no definido", None),
+])
+def test_parse_european_number(value, expected):
+    assert parse_european_number(value) == expected
+
+
+def test_accept_amount_joins_amounts_split_by_thousands_spaces():
+    assert LayoutExtractor._accept_amount(["100", "200,50"]) == 100200.5
+    assert LayoutExtractor._accept_amount(["Importe:", "1", "234", "567,89", "€"]) == 1234567.89
+
+
+def test_accept_amount_needs_decimals():
+    assert LayoutExtractor._accept_amount(["2023"]) is None
+    assert LayoutExtractor._accept_amount(["Clave", "A", "12,5"]) is None
+
+
+def test_company_id_is_not_taken_from_the_perceptor_nif():
+    text = "\n".join([
+        "Ejercicio 2023",
+        "Apellidos y nombre del perceptor GARCIA LOPEZ ANA",
+        "NIF 12345678Z",
+        "Percepción íntegra 24.214,44",
+        "Razón social EMPRESA EJEMPLO SL",
+    ])
+    data = LayoutExtractor().extract(text, "modelo_190")
+
+    assert "company_id" not in data
+    assert not LayoutExtractor.is_valid(data)
+
+
+def test_company_id_from_the_declarante_label():
+    text = "NIF del declarante B24532178\nNIF 12345678Z"
+    assert LayoutExtractor().extract(text, "modelo_190")["company_id"] == "B24532178"
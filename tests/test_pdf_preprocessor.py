@@ -0,0 +1,29 @@
+import pytest
+
+pytest.importorskip("fitz")
+
+from pdf_preprocessor import PDFProcessor
+
+
+def test_convenio_window_keeps_the_validity_year_far_from_the_anchor():
+    page = "\n".join([
+        "Artículo 3. Ámbito temporal y vigencia.",
+        "El presente convenio entrará en vigor el día siguiente",
+        "al de su publicación",
+        "en el Boletín Oficial de la Provincia y extenderá sus efectos",
+        "desde el 1 de enero de 2022 hasta el 31 de diciembre de 2024.",
+        "Artículo 4. Comisión paritaria.",
+        "Las partes acuerdan constituir una comisión",
+    ])
+    windowed = PDFProcessor(page_windowing=True).window_page(page, "convenio")
+
+    assert "desde el 1 de enero de 2022 hasta el 31 de diciembre de 2024." in windowed
+    assert "Las partes acuerdan constituir una comisión" not in windowed
+
+
+def test_convenio_window_keeps_hours_with_their_context():
+    page = "Artículo 20. Jornada.\nLa jornada máxima anual será de\n1.760 horas de trabajo efectivo.\nen cómputo anual.\nOtro texto"
+    windowed = PDFProcessor(page_windowing=True).window_page(page, "convenio")
+
+    assert "1.760 horas de trabajo efectivo." in windowed
+    assert "Otro texto" not in windowed
@@ -0,0 +1,91 @@
+import pytest
+
+from task_allocator import TaskAllocator
+
+
+def worker(worker_id, name, cost, hours=100, year=2023):
+    return {"worker_id": worker_id, "worker_name": name, "company_id": "B1", "year": year,
+            "coste_hora": cost, "horas_convenio_anuales": hours}
+
+
+def hours_by(result, field="trabajador"):
+    totals = {}
+    for line in result["asignacion"]:
+        totals[line[field]] = totals.get(line[field], 0) + line["horas_asignadas"]
+    return totals
+
+
+def test_fills_cheapest_capacity_first():
+    workers = [worker("B", "Bea", 20), worker("A", "Ana", 10), worker("C", "Carlos", 30)]
+    result = TaskAllocator().allocate([{"fase": "F1", "horas": 150}], workers)
+
+    assert hours_by(result) == {"Ana": 100, "Bea": 50}
+    assert result["coste_total"] == pytest.approx(100 * 10 + 50 * 20)
+    assert result["horas_sin_asignar"] == {}
+    assert result["advertencias"] == []
+
+
+def test_fixed_hours_are_reserved_before_earlier_phases_fill_capacity():
+    workers = [worker("A", "Ana", 10), worker("B", "Bea", 20)]
+    phases = [
+        {"fase": "F1", "horas": 100},
+        {"fase": "F2", "horas": 100, "asignaciones": [{"trabajador": "Ana", "horas": 50}]},
+    ]
+    result = TaskAllocator().allocate(phases, workers)
+
+    assert hours_by(result) == {"Ana": 100, "Bea": 100}
+    assert not any("Sobreasignación" in warning for warning in result["advertencias"])
+    # Coste mínimo dadas las 50 h fijas de Ana en F2
+    assert result["coste_total"] == pytest.approx(100 * 10 + 100 * 20)
+    f2 = {line["trabajador"]: line["horas_asignadas"] for line in result["asignacion"] if line["fase"] == "F2"}
+    assert f2["Ana"] == 50
+
+
+def test_fixed_hours_match_names_regardless_of_accents_and_order():
+    workers = [worker("GAFOJ", "GARCÍA FONTECHA, JOSE", 15)]
+    phases = [{"fase": "F1", "horas": 10, "asignaciones": [{"trabajador": "Jose Garcia Fontecha", "horas": 10}]}]
+    result = TaskAllocator().allocate(phases, workers)
+
+    assert hours_by(result) == {"GARCÍA FONTECHA, JOSE": 10}
+
+
+def test_over_allocation_is_reported():
+    workers = [worker("A", "Ana", 10, hours=100)]
+    phases = [
+        {"fase": "F1", "horas": 80, "asignaciones": [{"trabajador": "Ana", "horas": 80}]},
+        {"fase": "F2", "horas": 60, "asignaciones": [{"trabajador": "Ana", "horas": 60}]},
+        {"fase": "F3", "horas": 30},
+    ]
+    result = TaskAllocator().allocate(phases, workers)
+
+    assert any("Sobreasignación: Ana en F2" in warning for warning in result["advertencias"])
+    assert result["horas_sin_asignar"] == {"F3": 30}
+
+
+def test_missing_cost_and_missing_year_are_warned_and_left_unassigned():
+    workers = [worker("A", "Ana", None), worker("B", "Bea", 20, year=2022)]
+    phases = [{"fase": "F1", "horas": 10, "year": 2023}, {"fase": "F2", "horas": 5}]
+    result = TaskAllocator().allocate(phases, workers)
+
+    assert any("Ana" in warning and "sin coste" in warning for warning in result["advertencias"])
+    assert any("F1: no hay trabajadores con coste para 2023" in w for w in result["advertencias"])
+    assert result["horas_sin_asignar"] == {"F1": 10}
+    # Sin año, la fase va al último año con costes
+    assert hours_by(result) == {"Bea": 5}
+
+
+def test_dedication_limits_available_hours():
+    workers = [worker("A", "Ana", 10, hours=1000), worker("B", "Bea", 20, hours=1000)]
+    result = TaskAllocator(dedication=0.25).allocate([{"fase": "F1", "horas": 400}], workers)
+
+    assert hours_by(result) == {"Ana": 250, "Bea": 150}
+
+
+def test_hours_are_rounded_to_quarters_without_exceeding_capacity():
+    workers = [worker("A", "Ana", 10, hours=100.1), worker("B", "Bea", 20)]
+    result = TaskAllocator(dedication=0.333).allocate([{"fase": "F1", "horas": 40}], workers)
+
+    ana = hours_by(result)["Ana"]
+    assert ana <= 100.1 * 0.333
+    assert ana % 0.25 == 0
+    assert sum(hours_by(result).values()) == pytest.approx(40)